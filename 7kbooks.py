@@ -1,18 +1,281 @@
 #Program to analyse data set
 #The dataset is called 7kBooks and the original version can be found at the following location:
 #https://www.kaggle.com/dylanjcastillo/7k-books-with-metadata
-print("This program performs analysis on a dataset of books")
-print("The dataset is called 7kBooks and the original version can be found at the following location:")
-print("https://www.kaggle.com/dylanjcastillo/7k-books-with-metadata")
-print()
 
-import matplotlib.pyplot as plt
-from math import sqrt
+import numpy as np
+from array import array
+import csv
+import hashlib
+import heapq
+import importlib.metadata
+import inspect
+import io
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property, partial, wraps
+from itertools import islice, repeat
+from math import ceil, floor, inf, isfinite, isnan, log, nan, pi, sqrt
+from types import MappingProxyType
 
+#the environment variables that turn on profiling without the --profile option
+PROFILE_ENVIRONMENT_VARIABLE = "BOOKS_PROFILE"
+PROFILE_TRACE_ENVIRONMENT_VARIABLE = "BOOKS_PROFILE_TRACE"
+
+#the most calls kept for the JSON trace, after this only the totals for each stage are updated
+PROFILE_EVENT_LIMIT = 10_000
+
+class StageProfiler:
+    """
+    A class to record the time, calls and memory of each stage of the analysis when profiling is turned on
+
+    Timing only uses the clocks so it is cheap enough to leave on. Memory tracing with tracemalloc
+    slows down every allocation so it is only used when asked for. The times of a stage include any
+    stages it calls.
+
+    Attributes
+    ----------
+    enabled : bool
+        True when stages are being recorded.
+    trace_memory : bool
+        True when the peak memory of each stage is recorded as well.
+    stages : dict
+        For each stage name, the number of calls, wall seconds, CPU seconds and peak bytes.
+    events : list
+        One [name, start, wall seconds] entry per call, up to PROFILE_EVENT_LIMIT.
+
+    """
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.stages = {}
+        self.events = []
+        self.started = time.perf_counter()
+        self.memory_stack = []
+
+    def enable(self, trace_memory=False):
+        """
+        A function to start recording stages
+
+        Parameters
+        ----------
+        trace_memory : bool
+            True to record the peak memory of each stage as well.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.enabled = True
+        self.started = time.perf_counter()
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def enable_from_environment(self):
+        """
+        A function to start recording stages if BOOKS_PROFILE is set to 1, time or memory
+
+        Returns
+        -------
+        None.
+
+        """
+        setting = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE, "").lower()
+        if setting in ("1", "time", "memory"):
+            self.enable(trace_memory=setting == "memory")
+
+    def run_stage(self, name, function, args, kwargs):
+        """
+        A function to call a function and record it as one call of a stage
+
+        Parameters
+        ----------
+        name : string
+            The name of the stage.
+        function : function
+            The function to call.
+        args : tuple
+            The positional arguments for the function.
+        kwargs : dict
+            The keyword arguments for the function.
+
+        Returns
+        -------
+        result : any
+            The value returned by the function.
+
+        """
+        if self.trace_memory:
+            #the peak is reset for each stage, so keep the highest one seen by the stage this one is inside
+            current, peak = tracemalloc.get_traced_memory()
+            if self.memory_stack:
+                self.memory_stack[-1][1] = max(self.memory_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self.memory_stack.append([current, current])
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.process_time() - cpu_start
+            stage = self.stages.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_bytes": None})
+            stage["calls"] += 1
+            stage["wall_seconds"] += wall_seconds
+            stage["cpu_seconds"] += cpu_seconds
+            if self.trace_memory:
+                start_memory, peak = self.memory_stack.pop()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                if self.memory_stack:
+                    self.memory_stack[-1][1] = max(self.memory_stack[-1][1], peak)
+                stage["peak_bytes"] = max(stage["peak_bytes"] or 0, peak - start_memory)
+            if len(self.events) < PROFILE_EVENT_LIMIT:
+                self.events.append([name, wall_start - self.started, wall_seconds])
+
+    def summary(self):
+        """
+        A function to get the recorded stages, slowest first
+
+        Returns
+        -------
+        summary : dict
+            The total wall seconds since profiling started and the totals for each stage.
+
+        """
+        stages = dict(sorted(self.stages.items(), key=lambda item: item[1]["wall_seconds"], reverse=True))
+
+        return {"total_wall_seconds": time.perf_counter() - self.started, "trace_memory": self.trace_memory, "stages": stages}
+
+    def print_summary(self, file=None):
+        """
+        A function to print a table of the recorded stages
+
+        Parameters
+        ----------
+        file : file
+            Where to print the table, by default standard error so it is kept apart from the results.
+
+        Returns
+        -------
+        None.
+
+        """
+        file = sys.stderr if file is None else file
+        summary = self.summary()
+        print(f"{'Stage':>30}{'Calls':>8}{'Wall s':>10}{'CPU s':>10}{'Peak MB':>10}", file=file)
+        for name, stage in summary["stages"].items():
+            peak = f"{stage['peak_bytes'] / 2 ** 20:.2f}" if stage["peak_bytes"] is not None else "-"
+            print(f"{name:>30}{stage['calls']:>8}{stage['wall_seconds']:>10.4f}{stage['cpu_seconds']:>10.4f}{peak:>10}", file=file)
+        print(f"Total time: {summary['total_wall_seconds']:.2f} seconds", file=file)
+
+    def save_trace(self, filename):
+        """
+        A function to save the summary and each call as JSON that can also be opened in a trace viewer such as Perfetto
+
+        Parameters
+        ----------
+        filename : string
+            The file location to save the trace to.
+
+        Returns
+        -------
+        None.
+
+        """
+        trace = self.summary()
+        #complete events in the Chrome trace format with times in microseconds
+        trace["traceEvents"] = [{"name": name, "ph": "X", "ts": start * 1e6, "dur": seconds * 1e6, "pid": os.getpid(), "tid": 0}
+                                for name, start, seconds in self.events]
+        with open(filename, "w", encoding="utf8") as trace_file:
+            json.dump(trace, trace_file, indent=2)
+
+#the profiler shared by every stage, off unless turned on by --profile or BOOKS_PROFILE
+PROFILER = StageProfiler()
+
+def profile_stage(function):
+    """
+    A decorator to record each call of a function as a stage when profiling is turned on
+
+    Parameters
+    ----------
+    function : function
+        The function to record.
+
+    Returns
+    -------
+    wrapper : function
+        A function that calls the original and records it, costing one check when profiling is off.
+
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled:
+            return function(*args, **kwargs)
+        return PROFILER.run_stage(function.__qualname__, function, args, kwargs)
+
+    return wrapper
+
+def read_book_rows(filename):
+    """
+    A generator to read the 7kBooks.csv file one line at a time and split each line into its columns
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+
+    Yields
+    ------
+    columns : list
+        The twelve columns for one book in string format.
+
+    """
+    with open(filename, encoding="utf8") as books:
+        #ignore the first line with the column titles
+        books.readline()
+        for line in books:
+            yield line.split(",")
+
+def clean_book_rows(rows):
+    """
+    A generator to clean and convert each row of book information exactly once
+
+    Parameters
+    ----------
+    rows : iterable
+        The split columns for each book as produced by read_book_rows.
+
+    Yields
+    ------
+    book : tuple
+        The title and page number strings followed by the page number, published year,
+        average rating and number of ratings processed to remove empty values.
+
+    """
+    for isbn13, isbn10, title, subtitle, authors, categories, thumbnail, description, year, average_rating, pages, ratings in rows:
+        #strip \n from end of last column
+        ratings = ratings.strip()
+        #convert empty numbers to zero and empty years to unknown
+        yield (title, pages, float(pages or 0), year or "Unknown",
+               float(average_rating or 0), float(ratings or 0))
+
+@profile_stage
 def get_data(filename):
     """
     A function to open the 7KBooks.csv file and generate lists/dictionaries for analysis
 
+    Each row is read, cleaned and converted once so the time taken grows linearly with the size of the file.
+
     Parameters
     ----------
     filename : string
@@ -33,981 +296,5653 @@ def get_data(filename):
 
     """
     #create empty lists and dictionaries to populate
-    page_numbers_list = []
+    processed_page_numbers = []
     year_list = []
-    average_rating_list = []
-    number_of_ratings_list = []
+    processed_average_rating = []
+    processed_number_of_ratings = []
     title_and_page_num = {}
     
-    #open the file
-    with open(filename, encoding="utf8") as books:
-        #ignore the first line with the column titles
-        books.readline()
-        #read in each other line and split into columns
-        for line in books:
-            isbn13, isbn10, title, subtitle, authors, categories, thumbnail, description, year, average_rating, pages, ratings= line.split(",")
-            page_numbers_list.append(pages)
-            average_rating_list.append(average_rating)
-            
-            #strip \n from end of last column
-            number_of_ratings_list.append(ratings.strip())
-            year_list.append(year)
-            
-            #convert any items in pages that are empty to zero
-            convert_blank_to_zero(page_numbers_list)
-            convert_blank_to_zero(average_rating_list)
-            convert_blank_to_zero(number_of_ratings_list)
-            
-            #convert field in list to be unknown if the year is missing
-            for i in range(len(page_numbers_list)):
-                    if year_list[i] == '':
-                        year_list[i] = "Unknown"
-            
-            #convert the items in the list to floats so calculations can be done on them
-            processed_page_numbers = convert_list_of_strings_to_floats(page_numbers_list)
-            processed_average_rating = convert_list_of_strings_to_floats(average_rating_list)
-            processed_number_of_ratings = convert_list_of_strings_to_floats(number_of_ratings_list)
-            
-            #change + to commas in title and processed_pages dictionary
-            if title not in title_and_page_num:
-                if "+" not in title: 
-                    title_and_page_num[title] = pages
-                else:
-                    edited_title = title.replace("+", ",")
-                    title_and_page_num[edited_title] = pages
+    #read, clean and convert each line of the file in a single pass
+    for title, pages, page_number, year, average_rating, number_of_ratings in clean_book_rows(read_book_rows(filename)):
+        processed_page_numbers.append(page_number)
+        year_list.append(year)
+        processed_average_rating.append(average_rating)
+        processed_number_of_ratings.append(number_of_ratings)
+        
+        #change + to commas in title and processed_pages dictionary
+        if title not in title_and_page_num:
+            if "+" not in title: 
+                title_and_page_num[title] = pages
+            else:
+                edited_title = title.replace("+", ",")
+                title_and_page_num[edited_title] = pages
     
     return processed_page_numbers, year_list, processed_average_rating, processed_number_of_ratings, title_and_page_num
-    
-def get_top_ten_longest_books(dict_of_title_and_pages):
+
+def parse_book_columns(rows, title_lookup=None):
     """
-    A function to get the top ten books with the most pages
- 
+    A function to convert rows of book information into typed numpy columns and missing value masks
+
     Parameters
     ----------
-    dict_of_title_and_pages : dict
-        A dictionary of title and page numbers in key value pairs.
+    rows : iterable
+        The split columns for each book as produced by read_book_rows.
+    title_lookup : dict
+        A dictionary of titles and their codes to add new titles to, or None to skip the titles.
 
     Returns
     -------
-    top_ten: list
-        A list of the top ten book titles and their page lengths
+    columns : dict
+        The pages, years, average_ratings and number_of_ratings columns with zero for empty values, a
+        boolean mask for each named with _missing on the end, and title_codes if a title_lookup was given.
 
     """
-    #create a copy of the dictionary and sort it by page number
-    dict_copy = dict_of_title_and_pages.copy()
-    #sort the copy
-    sorted_dict = {k: v for k, v in sorted(dict_copy.items(), key=lambda x: x[1], reverse=True)}
-    
-    #get the top ten items in the sorted list
-    top_ten = dict(list(sorted_dict.items())[0:10])
-    
-    return top_ten
+    #build compact arrays while streaming so no per-book Python objects are kept
+    pages = array("i")
+    years = array("i")
+    average_ratings = array("d")
+    number_of_ratings = array("i")
+    title_codes = array("i")
 
-def get_books_with_same_number_pages_as_mean(list_of_page_numbers, dict_of_title_and_pages):
+    for row in rows:
+        year, average_rating, page_number, ratings = row[8], row[9], row[10], row[11].strip()
+        #use -1 and nan to mark empty values so the masks can be built in one step afterwards
+        pages.append(int(page_number) if page_number else -1)
+        years.append(int(year) if year else -1)
+        average_ratings.append(float(average_rating) if average_rating else nan)
+        number_of_ratings.append(int(ratings) if ratings else -1)
+        if title_lookup is not None:
+            title_codes.append(title_lookup.setdefault(row[2].replace("+", ","), len(title_lookup)))
+
+    columns = {"pages": np.frombuffer(pages, dtype=np.int32).copy(),
+               "years": np.frombuffer(years, dtype=np.int32).copy(),
+               "average_ratings": np.frombuffer(average_ratings, dtype=np.float64).copy(),
+               "number_of_ratings": np.frombuffer(number_of_ratings, dtype=np.int32).copy()}
+    for name, column in list(columns.items()):
+        columns[name + "_missing"] = np.isnan(column) if column.dtype.kind == "f" else column == -1
+        column[columns[name + "_missing"]] = 0
+    if title_lookup is not None:
+        columns["title_codes"] = np.frombuffer(title_codes, dtype=np.int32)
+
+    return columns
+
+def read_book_column_chunks(filename, chunk_rows):
     """
-    A function to display the book titles that have the same number of pages as the mean
+    A generator to read the numeric columns of a csv file a fixed number of rows at a time
 
     Parameters
     ----------
-    list_of_page_numbers : listDict
-        A list of book page numbers
-    dict_of_title_and_pages : dict
-        A dictionaty of titles and page numbers in key value pairs.
+    filename : string
+        A file location containing book information.
+    chunk_rows : int
+        The most rows to hold in memory at once.
 
-    Returns
-    -------
-    None.
+    Yields
+    ------
+    columns : dict
+        The columns for the next chunk of rows as returned by parse_book_columns.
 
     """
-    #create a copy of the dictionary
-    dict_copy = dict_of_title_and_pages.copy()
-    
-    #get the mean value of page numbers converted to int for whole number of pages
-    mean_value = int(round(calculate_mean(list_of_page_numbers),0))
-    
-    print(f"    {' Pages':>5}{'Title':>10}")
-    for title, pages in dict_copy.items():
-        if pages == mean_value:
-            print("   - ", pages, "   ", title)
-        else:
-            continue
+    rows = read_book_rows(filename)
+    while True:
+        columns = parse_book_columns(islice(rows, chunk_rows))
+        if len(columns["pages"]) == 0:
+            return
+        yield columns
 
-    
-def get_total_number_of_records_in_list(list_of_records):
+class BookTable:
     """
-    A function to get the total number of records in a list
-    
-    Parameters
+    A class to hold the book information as typed columns instead of parallel lists of Python objects
+
+    Missing values are stored as zero, matching get_data, and are also flagged in a boolean mask per column.
+    Titles are dictionary-encoded: each book holds a code pointing into a list of unique titles.
+
+    Attributes
     ----------
-    list_of_records : list
-        A list of records
+    pages : numpy.ndarray
+        The number of pages per book as int32.
+    years : numpy.ndarray
+        The published year per book as int32.
+    average_ratings : numpy.ndarray
+        The average rating per book as float64.
+    number_of_ratings : numpy.ndarray
+        The number of ratings per book as int32.
+    pages_missing, years_missing, average_ratings_missing, number_of_ratings_missing : numpy.ndarray
+        Boolean masks that are True where the value was empty in the file.
+    title_codes : numpy.ndarray
+        The position of each book's title in titles as int32.
+    titles : list
+        The unique book titles with + changed to commas, in the order they first appear.
 
-    Returns
-    -------
-    number_of_records : int
-        The number of records in the list.
+    """
+    def __init__(self, pages, years, average_ratings, number_of_ratings, title_codes, titles,
+                 pages_missing=None, years_missing=None, average_ratings_missing=None, number_of_ratings_missing=None):
+        self.pages = np.asarray(pages, dtype=np.int32)
+        self.years = np.asarray(years, dtype=np.int32)
+        self.average_ratings = np.asarray(average_ratings, dtype=np.float64)
+        self.number_of_ratings = np.asarray(number_of_ratings, dtype=np.int32)
+        self.title_codes = np.asarray(title_codes, dtype=np.int32)
+        #a list of titles is shared rather than copied so a selection of rows does not copy every title
+        self.titles = titles if isinstance(titles, list) else list(titles)
+
+        #when no masks are given treat zero as missing, the same as get_number_of_items_with_missing_information
+        self.pages_missing = self.pages == 0 if pages_missing is None else np.asarray(pages_missing, dtype=bool)
+        self.years_missing = self.years == 0 if years_missing is None else np.asarray(years_missing, dtype=bool)
+        self.average_ratings_missing = self.average_ratings == 0 if average_ratings_missing is None else np.asarray(average_ratings_missing, dtype=bool)
+        self.number_of_ratings_missing = self.number_of_ratings == 0 if number_of_ratings_missing is None else np.asarray(number_of_ratings_missing, dtype=bool)
+        self.column_indexes = {}
+
+    @classmethod
+    @profile_stage
+    def from_csv(cls, filename):
+        """
+        A function to read the 7kBooks.csv file straight into typed columns
+
+        Parameters
+        ----------
+        filename : string
+            A file location containing book information.
 
+        Returns
+        -------
+        book_table : BookTable
+            The books in the file.
+
+        """
+        title_lookup = {}
+        columns = parse_book_columns(read_book_rows(filename), title_lookup)
+
+        return cls(titles=title_lookup, **columns)
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def nbytes(self):
+        """
+        The number of bytes used by the numeric columns, masks and title codes
+        """
+        return sum(column.nbytes for column in (self.pages, self.years, self.average_ratings, self.number_of_ratings,
+                                                self.title_codes, self.pages_missing, self.years_missing,
+                                                self.average_ratings_missing, self.number_of_ratings_missing))
+
+    def get_title(self, row):
+        """
+        A function to get the title of the book in a row, for example a row returned by top_k
+
+        Parameters
+        ----------
+        row : int
+            The position of the book in the table.
+
+        Returns
+        -------
+        title : string
+            The title of the book.
+
+        """
+        return self.titles[self.title_codes[row]]
+
+    def title_page_dict(self):
+        """
+        A function to get the title and page number dictionary returned by get_data with the pages as ints
+
+        Returns
+        -------
+        title_and_page_num : dict
+            A dictionary containing a book title and the number of pages in the first book with that title.
+
+        """
+        #codes are given out in the order titles first appear so the first row of each code lines up with titles
+        first_rows = np.unique(self.title_codes, return_index=True)[1]
+        if len(first_rows) == len(self.titles):
+            return dict(zip(self.titles, self.pages[first_rows].tolist()))
+
+        #a selection of rows may not hold every title, so look each one up in the order it first appears
+        first_rows.sort()
+        titles = self.titles
+        return {titles[code]: pages for code, pages in zip(self.title_codes[first_rows].tolist(), self.pages[first_rows].tolist())}
+
+    def get_longest_titles(self, k=10):
+        """
+        A function to get the same titles and pages as get_top_ten_longest_books(title_page_dict()) without building the dictionary
+
+        Parameters
+        ----------
+        k : int
+            The number of titles to get.
+
+        Returns
+        -------
+        longest_titles : dict
+            The k titles whose first book has the most pages and those pages, longest first.
+
+        """
+        first_rows = np.unique(self.title_codes, return_index=True)[1]
+        #keep the order titles first appear so ties are broken the same way as in the dictionary
+        first_rows.sort()
+
+        return {self.titles[self.title_codes[first_rows[position]]]: pages for position, pages in top_k(self.pages[first_rows], k)}
+
+    def select(self, rows):
+        """
+        A function to get a table of some of the books, for example the rows returned by BookFilter.get_rows
+
+        The list of titles is shared with this table, and a slice of rows gives views of the columns
+        rather than copies.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray or slice
+            The rows to keep, in the order to keep them.
+
+        Returns
+        -------
+        book_table : BookTable
+            A table of the selected books.
+
+        """
+        return BookTable(self.pages[rows], self.years[rows], self.average_ratings[rows], self.number_of_ratings[rows],
+                         self.title_codes[rows], self.titles, self.pages_missing[rows], self.years_missing[rows],
+                         self.average_ratings_missing[rows], self.number_of_ratings_missing[rows])
+
+    def get_column_index(self, column):
+        """
+        A function to get the ColumnIndex of one of the FILTER_COLUMNS, building it the first time it is asked for
+
+        Parameters
+        ----------
+        column : string
+            The name of the column.
+
+        Returns
+        -------
+        column_index : ColumnIndex
+            The index of the column.
+
+        """
+        if column not in self.column_indexes:
+            self.column_indexes[column] = ColumnIndex(getattr(self, column), getattr(self, column + "_missing"))
+
+        return self.column_indexes[column]
+
+#the columns of a BookTable that books can be filtered by
+FILTER_COLUMNS = ("pages", "years", "average_ratings", "number_of_ratings")
+
+#a sorted index is used for a range when it holds less than this share of the books, otherwise a mask is quicker
+INDEX_SELECTIVITY = 0.05
+
+class ColumnIndex:
     """
-    number_of_records = len(list_of_records)
-    
-    return round(number_of_records, 0)
+    A class to find the rows of books with a value of one numeric column inside a range
+
+    The rows are kept sorted by value, leaving out empty values, so the rows in a range sit together
+    and are found with two binary searches whatever the size of the range.
+
+    Attributes
+    ----------
+    rows_by_value : numpy.ndarray
+        The rows with a value, sorted by value and then by row.
+    sorted_values : numpy.ndarray
+        The value of each row in rows_by_value.
 
-def get_max_value(list_of_records):
     """
-    A function to get the maximum value in a list of records
-    
+    def __init__(self, column, missing):
+        rows = np.flatnonzero(~np.asarray(missing))
+        self.rows_by_value = rows[np.argsort(column[rows], kind="stable")]
+        self.sorted_values = column[self.rows_by_value]
+
+    def __len__(self):
+        return len(self.rows_by_value)
+
+    def get_positions(self, lowest=None, highest=None):
+        """
+        A function to find where the values inside a range start and end in sorted_values
+
+        Parameters
+        ----------
+        lowest : float
+            The lowest value, included in the range, or None for no lower limit.
+        highest : float
+            The highest value, included in the range, or None for no upper limit.
+
+        Returns
+        -------
+        start : int
+            The position of the first value in the range.
+        end : int
+            The position after the last value in the range.
+
+        """
+        #search with values of the column's own type, as a float would make numpy convert the whole column first
+        if self.sorted_values.dtype.kind == "i":
+            #a limit past the end of the type, such as an infinity, keeps every value or none of them
+            limits = np.iinfo(self.sorted_values.dtype)
+            if (lowest is not None and lowest > limits.max) or (highest is not None and highest < limits.min):
+                return 0, 0
+            lowest = None if lowest is None or lowest <= limits.min else self.sorted_values.dtype.type(ceil(lowest))
+            highest = None if highest is None or highest >= limits.max else self.sorted_values.dtype.type(floor(highest))
+        start = 0 if lowest is None else int(np.searchsorted(self.sorted_values, lowest, side="left"))
+        end = len(self.sorted_values) if highest is None else int(np.searchsorted(self.sorted_values, highest, side="right"))
+
+        return start, max(start, end)
+
+    def find_range(self, lowest=None, highest=None):
+        """
+        A function to find the rows of the books with a value inside a range
+
+        Parameters
+        ----------
+        lowest : float
+            The lowest value, included in the range, or None for no lower limit.
+        highest : float
+            The highest value, included in the range, or None for no upper limit.
+
+        Returns
+        -------
+        rows : numpy.ndarray
+            The matching rows in file order.
+
+        """
+        start, end = self.get_positions(lowest, highest)
+
+        return np.sort(self.rows_by_value[start:end])
+
+class BookFilter:
+    """
+    A class to pick out the books with values of the numeric columns inside ranges, such as books
+    published from 1990 to 2000 with at least 100 ratings
+
+    Filters are combined with where or &, and a book must be inside every range to be kept. Books with
+    an empty value are never inside a range on that column.
+
+    Attributes
+    ----------
+    ranges : dict
+        Each column in FILTER_COLUMNS and its (lowest, highest) values, with None for no limit.
+
+    """
+    def __init__(self, ranges=None):
+        self.ranges = {}
+        for column, (lowest, highest) in (ranges or {}).items():
+            self.add_range(column, lowest, highest)
+
+    def add_range(self, column, lowest, highest):
+        """
+        A function to narrow the filter to values of a column inside a range
+
+        Parameters
+        ----------
+        column : string
+            One of FILTER_COLUMNS.
+        lowest : float
+            The lowest value, included in the range, or None for no lower limit.
+        highest : float
+            The highest value, included in the range, or None for no upper limit.
+
+        Returns
+        -------
+        None.
+
+        """
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"unknown column {column!r}, choose from " + ", ".join(FILTER_COLUMNS))
+        if any(limit is not None and isnan(limit) for limit in (lowest, highest)):
+            raise ValueError(f"the range for {column!r} does not have numbers for its limits")
+        #a second range on the same column keeps only the values inside both
+        old_lowest, old_highest = self.ranges.get(column, (None, None))
+        if old_lowest is not None:
+            lowest = old_lowest if lowest is None else max(lowest, old_lowest)
+        if old_highest is not None:
+            highest = old_highest if highest is None else min(highest, old_highest)
+        self.ranges[column] = (lowest, highest)
+
+    def where(self, column, lowest=None, highest=None):
+        """
+        A function to get a new filter that also needs a column to be inside a range
+
+        Parameters
+        ----------
+        column : string
+            One of FILTER_COLUMNS.
+        lowest : float
+            The lowest value, included in the range, or None for no lower limit.
+        highest : float
+            The highest value, included in the range, or None for no upper limit.
+
+        Returns
+        -------
+        book_filter : BookFilter
+            The combined filter.
+
+        """
+        book_filter = BookFilter(self.ranges)
+        book_filter.add_range(column, lowest, highest)
+
+        return book_filter
+
+    def __and__(self, other):
+        book_filter = BookFilter(self.ranges)
+        for column, (lowest, highest) in other.ranges.items():
+            book_filter.add_range(column, lowest, highest)
+
+        return book_filter
+
+    def get_mask(self, book_table, rows=None):
+        """
+        A function to work out which books are inside every range as a boolean mask, one vectorised step per range
+
+        Parameters
+        ----------
+        book_table : BookTable
+            The books to filter.
+        rows : numpy.ndarray
+            Only check these rows, or None for every row.
+
+        Returns
+        -------
+        mask : numpy.ndarray
+            True for each book (or each of rows) inside every range.
+
+        """
+        mask = np.ones(len(book_table) if rows is None else len(rows), dtype=bool)
+        for column, (lowest, highest) in self.ranges.items():
+            values = getattr(book_table, column)
+            missing = getattr(book_table, column + "_missing")
+            if rows is not None:
+                values = values[rows]
+                missing = missing[rows]
+            mask &= ~missing
+            if lowest is not None:
+                mask &= values >= lowest
+            if highest is not None:
+                mask &= values <= highest
+
+        return mask
+
+    def get_rows(self, book_table, use_indexes=False):
+        """
+        A function to find the rows of the books inside every range
+
+        With use_indexes the range holding the fewest books is looked up in a sorted ColumnIndex of its
+        column and only those rows are checked against the other ranges, which is much quicker than a mask
+        for a narrow range. The indexes are built the first time they are used and kept with the table, so
+        this is worth it when the same table is filtered many times.
+
+        Parameters
+        ----------
+        book_table : BookTable
+            The books to filter.
+        use_indexes : bool
+            True to use sorted indexes for narrow ranges.
+
+        Returns
+        -------
+        rows : numpy.ndarray
+            The matching rows in file order.
+
+        """
+        if use_indexes and self.ranges:
+            #the index finds how many books are in each range with two binary searches
+            sizes = {}
+            for column, (lowest, highest) in self.ranges.items():
+                start, end = book_table.get_column_index(column).get_positions(lowest, highest)
+                sizes[column] = end - start
+            column = min(sizes, key=sizes.get)
+            if sizes[column] < INDEX_SELECTIVITY * len(book_table):
+                rows = book_table.get_column_index(column).find_range(*self.ranges[column])
+                return rows[self.get_mask(book_table, rows)]
+
+        return np.flatnonzero(self.get_mask(book_table))
+
+    def apply(self, book_table, use_indexes=False):
+        """
+        A function to get a table of the books inside every range, so any calculate_ or get_ function can be run over it
+
+        Parameters
+        ----------
+        book_table : BookTable
+            The books to filter.
+        use_indexes : bool
+            True to use sorted indexes for narrow ranges, see get_rows.
+
+        Returns
+        -------
+        book_table : BookTable
+            The matching books, or the same table if the filter has no ranges.
+
+        """
+        if not self.ranges:
+            return book_table
+
+        return book_table.select(self.get_rows(book_table, use_indexes))
+
+def parse_book_filter(text):
+    """
+    A function to read a filter written as comma separated column=lowest:highest ranges
+
+    For example years=1990:2000,number_of_ratings=100:,pages=200:400 where either end can be left out.
+
     Parameters
     ----------
-    list_of_records : list
-        a list of records
+    text : string
+        The ranges to filter by.
 
     Returns
     -------
-    max_value: int
-        The maximum value for a record in the list.
+    book_filter : BookFilter
+        The filter.
 
     """
-    max_value = max(list_of_records)
-    
-    return int(max_value)
-    
-def get_fewest_pages_excluding_zero(list_of_records):
+    book_filter = BookFilter()
+    for condition in text.split(","):
+        if not condition.strip():
+            continue
+        column, separator, value_range = condition.partition("=")
+        lowest, colon, highest = value_range.partition(":")
+        if not separator or not colon:
+            raise ValueError(f"{condition.strip()!r} is not in the form column=lowest:highest")
+        try:
+            lowest = float(lowest) if lowest.strip() else None
+            highest = float(highest) if highest.strip() else None
+        except ValueError:
+            raise ValueError(f"{condition.strip()!r} does not have numbers for the range") from None
+        book_filter.add_range(column.strip(), lowest, highest)
+
+    return book_filter
+
+#the first bytes of a BookTable cache file, changed whenever the layout changes
+BOOK_CACHE_MAGIC = b"7KBOOKS1"
+
+#the columns kept in a BookTable cache file in the order they are written
+BOOK_CACHE_COLUMNS = ("pages", "years", "average_ratings", "number_of_ratings", "title_codes",
+                      "pages_missing", "years_missing", "average_ratings_missing", "number_of_ratings_missing")
+
+def get_file_fingerprint(filename, saved_fingerprint=None):
     """
-    A function to get the smallest number of pages in a book excluding zero
-    
+    A function to get the size, modification time and content hash of a file
+
+    Hashing reads every byte of the file, so when the size and modification time are the same as in a
+    saved fingerprint the file is taken to be unchanged and the saved fingerprint is returned instead.
+
     Parameters
     ----------
-    list_of_records : list
-        A list of pages per book
+    filename : string
+        A file location.
+    saved_fingerprint : dict
+        A fingerprint saved earlier for the same file, or None to always hash the file.
 
     Returns
     -------
-    fewest_pages : int
-        The fewest pages for a record not including zero.
+    fingerprint : dict
+        The "size", "mtime_ns" and blake2b "hash" of the file.
 
     """
-    fewest_pages = 9999
-    #loop through the list
-    for i in list_of_records:  
-        #ignore values in the list with zero
-        if i == 0:
-            continue
-        elif i < fewest_pages:
-            #if the value is less than fewest_pages the value is the new lowest value
-            fewest_pages = i
-            
-    return int(fewest_pages)
+    file_stats = os.stat(filename)
+    if (saved_fingerprint is not None and saved_fingerprint.get("size") == file_stats.st_size
+            and saved_fingerprint.get("mtime_ns") == file_stats.st_mtime_ns):
+        return saved_fingerprint
+    with open(filename, "rb") as file:
+        content_hash = hashlib.file_digest(file, "blake2b").hexdigest()
 
-def get_most_recent_year(list_of_years):
+    return {"size": file_stats.st_size, "mtime_ns": file_stats.st_mtime_ns, "hash": content_hash}
+
+def read_saved_fingerprint(filename, magic):
     """
-    A function that takes a list of years and returns the most recent year
+    A function to get the fingerprint saved in the header of a file written by write_column_file
 
     Parameters
     ----------
-    list_of_years : list
-        A list of years.
+    filename : string
+        The file location of the columns.
+    magic : bytes
+        The eight bytes the file must start with.
 
     Returns
     -------
-    most_recent_year: int
+    fingerprint : dict
+        The saved fingerprint, or None if there is no file or it is damaged.
+
+    """
+    try:
+        header, columns = read_column_file(filename, magic)
+        return header["fingerprint"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def get_cache_filename(filename):
+    """
+    A function to get the location of the BookTable cache kept next to a csv file
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+
+    Returns
+    -------
+    cache_filename : string
+        The file location of the cache.
+
+    """
+    return os.fspath(filename) + ".cache"
+
+def write_column_file(filename, magic, header, columns):
+    """
+    A function to save numpy columns to a binary file that can be memory-mapped when it is read
+
+    The file holds the magic bytes, the length of a JSON header, the header itself and then each
+    column as raw bytes starting on a 64 byte boundary. The file is written to a temporary name and
+    renamed so a half written file is never read.
+
+    Parameters
+    ----------
+    filename : string
+        The file location to save the columns to.
+    magic : bytes
+        Eight bytes that identify the kind of file and its layout.
+    header : dict
+        Information to save with the columns, which must be possible to write as JSON.
+    columns : dict
+        The names and numpy arrays to save.
+
+    Returns
+    -------
+    None.
+
+    """
+    #work out where each column starts relative to the start of the data
+    header = dict(header, columns={})
+    offset = 0
+    for name, column in columns.items():
+        header["columns"][name] = [column.dtype.str, offset, column.nbytes]
+        offset += -(-column.nbytes // 64) * 64
+    header_bytes = json.dumps(header).encode("utf8")
+    data_start = -(-(16 + len(header_bytes)) // 64) * 64
+
+    temporary_filename = filename + ".tmp"
+    with open(temporary_filename, "wb") as column_file:
+        column_file.write(magic)
+        column_file.write(len(header_bytes).to_bytes(8, "little"))
+        column_file.write(header_bytes)
+        for name, column in columns.items():
+            column_file.seek(data_start + header["columns"][name][1])
+            column_file.write(np.ascontiguousarray(column).tobytes())
+    os.replace(temporary_filename, filename)
+
+def read_column_file(filename, magic):
+    """
+    A function to memory-map a file saved by write_column_file
+
+    Parameters
+    ----------
+    filename : string
+        The file location of the columns.
+    magic : bytes
+        The eight bytes the file must start with.
+
+    Returns
+    -------
+    header : dict
+        The information saved with the columns.
+    columns : dict
+        Each column as a read-only numpy view into the mapped file so nothing is copied.
+
+    Raises
+    ------
+    ValueError
+        If the file does not start with the magic bytes.
+
+    """
+    file_bytes = np.memmap(filename, dtype=np.uint8, mode="r")
+    if bytes(file_bytes[:8]) != magic:
+        raise ValueError(f"{filename} is not the expected kind of file")
+    header_length = int.from_bytes(bytes(file_bytes[8:16]), "little")
+    header = json.loads(bytes(file_bytes[16:16 + header_length]))
+
+    data_start = -(-(16 + header_length) // 64) * 64
+    columns = {}
+    for name, (dtype, offset, nbytes) in header.pop("columns").items():
+        start = data_start + offset
+        columns[name] = np.asarray(file_bytes[start:start + nbytes].view(dtype))
+
+    return header, columns
+
+def save_book_table_cache(book_table, cache_filename, fingerprint):
+    """
+    A function to save a BookTable to a binary cache file that can be memory-mapped when loaded
+
+    The columns are written by write_column_file. The titles are stored as one UTF-8 block
+    separated by new lines.
+
+    Parameters
+    ----------
+    book_table : BookTable
+        The books to save.
+    cache_filename : string
+        The file location to save the cache to.
+    fingerprint : dict
+        The fingerprint of the csv file the books were read from.
+
+    Returns
+    -------
+    None.
+
+    """
+    columns = {name: getattr(book_table, name) for name in BOOK_CACHE_COLUMNS}
+    columns["titles"] = np.frombuffer("\n".join(book_table.titles).encode("utf8"), dtype=np.uint8)
+    header = {"fingerprint": fingerprint, "rows": len(book_table), "titles": len(book_table.titles)}
+    write_column_file(cache_filename, BOOK_CACHE_MAGIC, header, columns)
+
+def read_book_table_cache(cache_filename, fingerprint):
+    """
+    A function to memory-map a BookTable cache file if it matches the fingerprint of the csv file
+
+    Parameters
+    ----------
+    cache_filename : string
+        The file location of the cache.
+    fingerprint : dict
+        The fingerprint of the csv file the books should have been read from.
+
+    Returns
+    -------
+    book_table : BookTable
+        The books in the cache, or None if there is no cache or it is out of date or damaged.
+
+    """
+    if not os.path.exists(cache_filename):
+        return None
+    try:
+        header, columns = read_column_file(cache_filename, BOOK_CACHE_MAGIC)
+        if header["fingerprint"] != fingerprint:
+            return None
+        title_bytes = bytes(columns.pop("titles"))
+        titles = title_bytes.decode("utf8").split("\n") if header["titles"] else []
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return BookTable(titles=titles, **columns)
+
+@profile_stage
+def load_book_table(filename, use_cache=True):
+    """
+    A function to load the books in a csv file, using the binary cache next to it when it is up to date
+
+    The cache is keyed by the size, modification time and content hash of the csv file and is
+    rebuilt automatically when any of them change. The csv file is only hashed when its size or
+    modification time differ from the ones saved in the cache, so loading from the cache does not
+    read the csv file at all.
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    use_cache : bool
+        False to always read the csv file and leave the cache alone.
+
+    Returns
+    -------
+    book_table : BookTable
+        The books in the file.
+
+    """
+    if not use_cache:
+        return BookTable.from_csv(filename)
+
+    cache_filename = get_cache_filename(filename)
+    fingerprint = get_file_fingerprint(filename, read_saved_fingerprint(cache_filename, BOOK_CACHE_MAGIC))
+    book_table = read_book_table_cache(cache_filename, fingerprint)
+    if book_table is None:
+        book_table = BookTable.from_csv(filename)
+        try:
+            save_book_table_cache(book_table, cache_filename, fingerprint)
+        except OSError:
+            #the cache only saves time so carry on without it, for example in a read-only folder
+            pass
+
+    return book_table
+
+def normalize_title(title):
+    """
+    A function to get the key a title is looked up by, ignoring case and extra spaces
+
+    Parameters
+    ----------
+    title : string
+        A book title.
+
+    Returns
+    -------
+    key : string
+        The title in lower case with runs of spaces changed to one space.
+
+    """
+    return " ".join(title.casefold().split())
+
+class TitleIndex:
+    """
+    A class to find the rows of books by exact title, by title ignoring case, or by the start of a title
+
+    The normalized titles are kept in a sorted list so a title or the start of one is found with a
+    binary search, and the rows of each title are kept grouped together so finding them costs the
+    same however many books there are.
+
+    Attributes
+    ----------
+    titles : list
+        The unique titles, in the same order as BookTable.titles.
+    sorted_keys : list
+        The normalized titles in sorted order.
+    sorted_title_codes : list
+        The position in titles of each key in sorted_keys.
+
+    """
+    def __init__(self, titles, title_codes):
+        self.titles = list(titles)
+        self.title_code_lookup = {title: code for code, title in enumerate(self.titles)}
+        keys = [normalize_title(title) for title in self.titles]
+        self.sorted_title_codes = sorted(range(len(keys)), key=keys.__getitem__)
+        self.sorted_keys = [keys[code] for code in self.sorted_title_codes]
+
+        #sort the rows by title code and remember where each title's rows start
+        title_codes = np.asarray(title_codes)
+        self.rows_by_title = np.argsort(title_codes, kind="stable")
+        self.title_starts = np.searchsorted(title_codes[self.rows_by_title], np.arange(len(self.titles) + 1))
+
+    @classmethod
+    def from_book_table(cls, book_table):
+        """
+        A function to index the titles of the books in a BookTable
+
+        Parameters
+        ----------
+        book_table : BookTable
+            The books to index.
+
+        Returns
+        -------
+        title_index : TitleIndex
+            The index of the titles.
+
+        """
+        return cls(book_table.titles, book_table.title_codes)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def get_rows(self, title_code):
+        """
+        A function to get the rows of every book with a title
+
+        Parameters
+        ----------
+        title_code : int
+            The position of the title in titles.
+
+        Returns
+        -------
+        rows : list
+            The rows in the BookTable, in file order.
+
+        """
+        return self.rows_by_title[self.title_starts[title_code]:self.title_starts[title_code + 1]].tolist()
+
+    def find(self, title, case_sensitive=False):
+        """
+        A function to find the rows of the books with a title
+
+        Parameters
+        ----------
+        title : string
+            The title to find, with commas rather than +.
+        case_sensitive : bool
+            True to only match the title exactly, otherwise case and extra spaces are ignored.
+
+        Returns
+        -------
+        rows : list
+            The rows in the BookTable of the matching books, in file order.
+
+        """
+        if case_sensitive:
+            title_code = self.title_code_lookup.get(title)
+            return [] if title_code is None else self.get_rows(title_code)
+
+        key = normalize_title(title)
+        start = bisect_left(self.sorted_keys, key)
+        end = bisect_right(self.sorted_keys, key, lo=start)
+
+        return sorted(row for title_code in self.sorted_title_codes[start:end] for row in self.get_rows(title_code))
+
+    def complete(self, prefix, limit=10):
+        """
+        A function to get the titles that start with some text, ignoring case and extra spaces
+
+        Parameters
+        ----------
+        prefix : string
+            The start of a title.
+        limit : int
+            The most titles to return.
+
+        Returns
+        -------
+        titles : list
+            Up to limit matching titles in alphabetical order.
+
+        """
+        key = normalize_title(prefix)
+        matching_titles = []
+        #the matching keys sit together in the sorted list starting at the first key not less than the prefix
+        for position in range(bisect_left(self.sorted_keys, key), len(self.sorted_keys)):
+            if len(matching_titles) == limit or not self.sorted_keys[position].startswith(key):
+                break
+            matching_titles.append(self.titles[self.sorted_title_codes[position]])
+
+        return matching_titles
+
+class PageIndex:
+    """
+    A class to find the titles of books by their exact number of pages, the nearest number of pages or a range of pages
+
+    The titles are kept sorted by their number of pages, keeping the dictionary order for titles with the
+    same number, and each number of pages is mapped to where its titles start, so the titles with a given
+    number of pages are found without looking at any other title.
+
+    Attributes
+    ----------
+    titles : list
+        The titles, in the same order as the dictionary the index was built from.
+    pages : numpy.ndarray
+        The number of pages of each title, with zero for empty values.
+    titles_by_pages : numpy.ndarray
+        The position in titles of each title, sorted by number of pages.
+    sorted_pages : numpy.ndarray
+        The number of pages of each title in titles_by_pages.
+    page_numbers : numpy.ndarray
+        Each different number of pages in order.
+    page_starts : numpy.ndarray
+        Where the titles with each number in page_numbers start in titles_by_pages, with the end on the end.
+    page_positions : dict
+        Each different number of pages and its position in page_numbers.
+
+    """
+    def __init__(self, title_and_pages):
+        self.titles = list(title_and_pages)
+        self.pages = np.fromiter((convert_page_number_to_int(pages) for pages in title_and_pages.values()),
+                                 dtype=np.int64, count=len(self.titles))
+        self.titles_by_pages = np.argsort(self.pages, kind="stable")
+        self.sorted_pages = self.pages[self.titles_by_pages]
+        self.page_numbers, page_starts = np.unique(self.sorted_pages, return_index=True)
+        self.page_starts = np.append(page_starts, len(self.titles))
+        self.page_positions = dict(zip(self.page_numbers.tolist(), range(len(self.page_numbers))))
+
+    def __len__(self):
+        return len(self.titles)
+
+    def find(self, pages):
+        """
+        A function to find the titles of the books with an exact number of pages
+
+        Parameters
+        ----------
+        pages : int
+            The number of pages.
+
+        Returns
+        -------
+        title_positions : list
+            The positions in titles of the matching books, in dictionary order.
+
+        """
+        position = self.page_positions.get(pages)
+        if position is None:
+            return []
+
+        return self.titles_by_pages[self.page_starts[position]:self.page_starts[position + 1]].tolist()
+
+    def find_nearest(self, pages):
+        """
+        A function to find the titles of the books with the number of pages closest to a value
+
+        Parameters
+        ----------
+        pages : float
+            The number of pages to be close to.
+
+        Returns
+        -------
+        nearest_pages : int
+            The closest number of pages any book has, the smaller one if two are equally close, or None if there are no books.
+        title_positions : list
+            The positions in titles of the books with nearest_pages, in dictionary order.
+
+        """
+        if len(self.page_numbers) == 0:
+            return None, []
+        #the closest number is either the first one not below the value or the one before it
+        position = int(np.searchsorted(self.page_numbers, pages))
+        if position == len(self.page_numbers) or (position > 0 and pages - self.page_numbers[position - 1] <= self.page_numbers[position] - pages):
+            position -= 1
+        nearest_pages = int(self.page_numbers[position])
+
+        return nearest_pages, self.find(nearest_pages)
+
+    def find_range(self, lowest_pages, highest_pages):
+        """
+        A function to find the titles of the books with a number of pages inside a range
+
+        Parameters
+        ----------
+        lowest_pages : int
+            The fewest pages, included in the range.
+        highest_pages : int
+            The most pages, included in the range.
+
+        Returns
+        -------
+        title_positions : list
+            The positions in titles of the matching books, fewest pages first.
+
+        """
+        start = np.searchsorted(self.sorted_pages, lowest_pages, side="left")
+        end = np.searchsorted(self.sorted_pages, highest_pages, side="right")
+
+        return self.titles_by_pages[start:max(start, end)].tolist()
+
+#the words searched for are runs of letters and digits in any language
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+")
+
+#the first bytes of a SearchIndex file, changed whenever the layout changes
+SEARCH_INDEX_MAGIC = b"7KSRCH01"
+
+#the numpy types used for the gaps between document numbers in a posting list, by width in bytes
+POSTING_GAP_TYPES = {1: np.uint8, 2: np.uint16, 4: np.uint32}
+
+def tokenize(text):
+    """
+    A function to split text into the lower case words used by the search index
+
+    Parameters
+    ----------
+    text : string
+        The text to split, with + used for commas as in the csv file.
+
+    Returns
+    -------
+    tokens : list
+        The words in the text in order.
+
+    """
+    return SEARCH_TOKEN_PATTERN.findall(text.replace("+", ",").casefold())
+
+class SearchIndex:
+    """
+    A class to rank books by how well their title, subtitle and description match a query using BM25
+
+    Each word has a posting list of the books it appears in and how many times. The book numbers in
+    a list are stored as the gaps between them using the fewest bytes (1, 2 or 4) that fit the
+    largest gap, so the common words that make up most of the index take one byte per book and a
+    list is read back with a view and a cumulative sum.
+
+    Attributes
+    ----------
+    words : list
+        The indexed words in sorted order, the position of a word is its word number.
+    word_starts : numpy.ndarray
+        Where each word's postings start in term_frequencies, with one extra entry for the end.
+    gap_widths : numpy.ndarray
+        The number of bytes used for each word's gaps.
+    gap_offsets : numpy.ndarray
+        Where each word's gaps start in the gap array of its width.
+    gaps : dict
+        The gap arrays for widths 1, 2 and 4.
+    term_frequencies : numpy.ndarray
+        The number of times the word appears in each book of each posting list, up to 255.
+    document_lengths : numpy.ndarray
+        The number of words in each book.
+    title_codes : numpy.ndarray
+        The position of each book's title in titles.
+    titles : list
+        The unique titles with + changed to commas.
+
+    """
+    def __init__(self, words, word_starts, gap_widths, gap_offsets, gaps, term_frequencies, document_lengths, title_codes, titles):
+        self.words = words
+        self.word_starts = word_starts
+        self.gap_widths = gap_widths
+        self.gap_offsets = gap_offsets
+        self.gaps = gaps
+        self.term_frequencies = term_frequencies
+        self.document_lengths = document_lengths
+        self.title_codes = title_codes
+        self.titles = titles
+        self.average_document_length = float(document_lengths.mean()) if len(document_lengths) else 0.0
+        self.length_weights = {}
+
+    @classmethod
+    def from_csv(cls, filename, chunk_rows=100_000):
+        """
+        A function to read the titles, subtitles and descriptions in a csv file and index their words
+
+        The postings for each chunk of rows are counted with numpy and the chunks are joined at the
+        end, so the words of the whole file are never held as Python objects at once.
+
+        Parameters
+        ----------
+        filename : string
+            A file location containing book information.
+        chunk_rows : int
+            The number of rows to tokenize before counting their postings.
+
+        Returns
+        -------
+        search_index : SearchIndex
+            The index of the books in the file.
+
+        """
+        word_numbers = {}
+        title_lookup = {}
+        title_codes = array("i")
+        document_lengths = array("I")
+        chunk_postings = []
+        rows = read_book_rows(filename)
+        document = 0
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                break
+            chunk_words = array("q")
+            chunk_documents = array("q")
+            for isbn13, isbn10, title, subtitle, authors, categories, thumbnail, description, *numbers in chunk:
+                title_codes.append(title_lookup.setdefault(title.replace("+", ","), len(title_lookup)))
+                tokens = tokenize(f"{title} {subtitle} {description}")
+                document_lengths.append(len(tokens))
+                chunk_words.extend([word_numbers.setdefault(token, len(word_numbers)) for token in tokens])
+                chunk_documents.extend(repeat(document, len(tokens)))
+                document += 1
+            #each word and book pair once with the number of times the word is in the book
+            pairs, counts = np.unique(np.frombuffer(chunk_words, dtype=np.int64) << 32 | np.frombuffer(chunk_documents, dtype=np.int64),
+                                      return_counts=True)
+            chunk_postings.append((pairs >> 32, pairs & 0xFFFFFFFF, counts))
+
+        #number the words in sorted order so a word can be found with a binary search
+        words = list(word_numbers)
+        word_order = sorted(range(len(words)), key=words.__getitem__)
+        renumber = np.empty(len(words), dtype=np.int64)
+        renumber[word_order] = np.arange(len(words))
+        words = [words[word_number] for word_number in word_order]
+
+        posting_words = renumber[np.concatenate([postings[0] for postings in chunk_postings] or [np.array([], dtype=np.int64)])]
+        posting_documents = np.concatenate([postings[1] for postings in chunk_postings] or [np.array([], dtype=np.int64)])
+        posting_counts = np.concatenate([postings[2] for postings in chunk_postings] or [np.array([], dtype=np.int64)])
+        #the chunks are in file order so a stable sort keeps each word's books in order
+        order = np.argsort(posting_words, kind="stable")
+        posting_words = posting_words[order]
+        posting_documents = posting_documents[order]
+        word_starts = np.searchsorted(posting_words, np.arange(len(words) + 1))
+
+        return cls.from_postings(words, word_starts, posting_documents, np.minimum(posting_counts[order], 255).astype(np.uint8),
+                                 np.frombuffer(document_lengths, dtype=np.uint32).copy(),
+                                 np.frombuffer(title_codes, dtype=np.int32).copy(), list(title_lookup))
+
+    @classmethod
+    def from_postings(cls, words, word_starts, posting_documents, term_frequencies, document_lengths, title_codes, titles):
+        """
+        A function to compress sorted posting lists into a SearchIndex
+
+        Parameters
+        ----------
+        words : list
+            The words in sorted order.
+        word_starts : numpy.ndarray
+            Where each word's postings start, with one extra entry for the end.
+        posting_documents : numpy.ndarray
+            The book number of each posting, in increasing order within each word.
+        term_frequencies : numpy.ndarray
+            The number of times the word appears in the book of each posting.
+        document_lengths : numpy.ndarray
+            The number of words in each book.
+        title_codes : numpy.ndarray
+            The position of each book's title in titles.
+        titles : list
+            The unique titles.
+
+        Returns
+        -------
+        search_index : SearchIndex
+            The index with the book numbers stored as gaps.
+
+        """
+        posting_gaps = posting_documents.copy()
+        posting_gaps[1:] -= posting_documents[:-1]
+        #the first book of each list is stored as it is
+        first_postings = word_starts[:-1][np.diff(word_starts) > 0]
+        posting_gaps[first_postings] = posting_documents[first_postings]
+
+        word_lengths = np.diff(word_starts)
+        largest_gaps = np.zeros(len(words), dtype=np.int64)
+        if len(posting_gaps):
+            largest_gaps[word_lengths > 0] = np.maximum.reduceat(posting_gaps, first_postings)
+        gap_widths = np.select([largest_gaps < 2 ** 8, largest_gaps < 2 ** 16], [1, 2], 4).astype(np.uint8)
+        posting_widths = np.repeat(gap_widths, word_lengths)
+
+        gap_offsets = np.zeros(len(words), dtype=np.int64)
+        gaps = {}
+        for width, gap_type in POSTING_GAP_TYPES.items():
+            gaps[width] = posting_gaps[posting_widths == width].astype(gap_type)
+            width_words = gap_widths == width
+            gap_offsets[width_words] = np.cumsum(word_lengths[width_words]) - word_lengths[width_words]
+
+        return cls(words, word_starts, gap_widths, gap_offsets, gaps, term_frequencies, document_lengths, title_codes, titles)
+
+    def __len__(self):
+        return len(self.document_lengths)
+
+    def get_word_number(self, word):
+        """
+        A function to find the number of a word in the index
+
+        Parameters
+        ----------
+        word : string
+            A lower case word as returned by tokenize.
+
+        Returns
+        -------
+        word_number : int
+            The position of the word in words, or None if no book has the word.
+
+        """
+        position = bisect_left(self.words, word)
+        if position < len(self.words) and self.words[position] == word:
+            return position
+        return None
+
+    def get_postings(self, word_number):
+        """
+        A function to read back the books a word appears in
+
+        Parameters
+        ----------
+        word_number : int
+            The position of the word in words.
+
+        Returns
+        -------
+        documents : numpy.ndarray
+            The book numbers in increasing order.
+        term_frequencies : numpy.ndarray
+            The number of times the word appears in each of the books.
+
+        """
+        start = self.word_starts[word_number]
+        end = self.word_starts[word_number + 1]
+        offset = self.gap_offsets[word_number]
+        gaps = self.gaps[int(self.gap_widths[word_number])][offset:offset + end - start]
+
+        return np.cumsum(gaps, dtype=np.intp), self.term_frequencies[start:end]
+
+    def search(self, query, k=10, k1=1.2, b=0.75):
+        """
+        A function to find the books that best match a query, ranked by their BM25 score
+
+        Parameters
+        ----------
+        query : string
+            The words to search for.
+        k : int
+            The number of books to return.
+        k1 : float
+            How quickly more mentions of a word stop raising the score.
+        b : float
+            How much longer descriptions are penalised, from 0 to 1.
+
+        Returns
+        -------
+        results : list
+            A list of (book number, score) pairs, best first. Books with the same score are in file order.
+
+        """
+        word_numbers = {self.get_word_number(token) for token in tokenize(query)} - {None}
+        if not word_numbers:
+            return []
+
+        #the part of the BM25 weight that only depends on the length of each book is worked out once
+        if (k1, b) not in self.length_weights:
+            #books with no words have no length to compare, so treat them all as the average length
+            average_document_length = self.average_document_length or 1.0
+            self.length_weights[(k1, b)] = (k1 * (1 - b + b * self.document_lengths / average_document_length)).astype(np.float32)
+        length_weights = self.length_weights[(k1, b)]
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        matches = np.zeros(len(self), dtype=bool)
+        for word_number in word_numbers:
+            documents, term_frequencies = self.get_postings(word_number)
+            #the 1 + in the idf keeps the scores of very common words positive
+            idf = log(1 + (len(self) - len(documents) + 0.5) / (len(documents) + 0.5))
+            term_frequencies = term_frequencies.astype(np.float32)
+            #each book is only once in a posting list so the scores can be added without np.add.at
+            scores[documents] += np.float32(idf * (k1 + 1)) * term_frequencies / (term_frequencies + length_weights[documents])
+            matches[documents] = True
+
+        #only rank the books that matched, as partitioning a mostly zero array of scores is slow
+        candidates = np.flatnonzero(matches)
+        return [(int(candidates[position]), score) for position, score in top_k(scores[candidates], k)]
+
+    def get_title(self, document):
+        """
+        A function to get the title of a book, for example one returned by search
+
+        Parameters
+        ----------
+        document : int
+            The book number, the same as its row in a BookTable.
+
+        Returns
+        -------
+        title : string
+            The title of the book.
+
+        """
+        return self.titles[self.title_codes[document]]
+
+def get_search_index_filename(filename):
+    """
+    A function to get the location of the SearchIndex file kept next to a csv file
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+
+    Returns
+    -------
+    index_filename : string
+        The file location of the index.
+
+    """
+    return os.fspath(filename) + ".search"
+
+def save_search_index(search_index, index_filename, fingerprint):
+    """
+    A function to save a SearchIndex with write_column_file so it can be memory-mapped when loaded
+
+    Parameters
+    ----------
+    search_index : SearchIndex
+        The index to save.
+    index_filename : string
+        The file location to save the index to.
+    fingerprint : dict
+        The fingerprint of the csv file the index was built from.
+
+    Returns
+    -------
+    None.
+
+    """
+    columns = {"word_starts": search_index.word_starts, "gap_widths": search_index.gap_widths,
+               "gap_offsets": search_index.gap_offsets, "term_frequencies": search_index.term_frequencies,
+               "document_lengths": search_index.document_lengths, "title_codes": search_index.title_codes,
+               "words": np.frombuffer("\n".join(search_index.words).encode("utf8"), dtype=np.uint8),
+               "titles": np.frombuffer("\n".join(search_index.titles).encode("utf8"), dtype=np.uint8)}
+    for width, gaps in search_index.gaps.items():
+        columns[f"gaps_{width}"] = gaps
+    header = {"fingerprint": fingerprint, "words": len(search_index.words), "titles": len(search_index.titles)}
+    write_column_file(index_filename, SEARCH_INDEX_MAGIC, header, columns)
+
+def read_search_index(index_filename, fingerprint):
+    """
+    A function to memory-map a SearchIndex file if it matches the fingerprint of the csv file
+
+    Parameters
+    ----------
+    index_filename : string
+        The file location of the index.
+    fingerprint : dict
+        The fingerprint of the csv file the index should have been built from.
+
+    Returns
+    -------
+    search_index : SearchIndex
+        The index in the file, or None if there is no index or it is out of date or damaged.
+
+    """
+    if not os.path.exists(index_filename):
+        return None
+    try:
+        header, columns = read_column_file(index_filename, SEARCH_INDEX_MAGIC)
+        if header["fingerprint"] != fingerprint:
+            return None
+        words = bytes(columns.pop("words")).decode("utf8").split("\n") if header["words"] else []
+        title_bytes = bytes(columns.pop("titles"))
+        titles = title_bytes.decode("utf8").split("\n") if header["titles"] else []
+        gaps = {width: columns.pop(f"gaps_{width}") for width in POSTING_GAP_TYPES}
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return SearchIndex(words=words, titles=titles, gaps=gaps, **columns)
+
+@profile_stage
+def load_search_index(filename, use_cache=True):
+    """
+    A function to load the search index for a csv file, building it only when the file has changed
+
+    As with load_book_table, the csv file is only hashed when its size or modification time have changed.
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    use_cache : bool
+        False to always build the index and leave the saved one alone.
+
+    Returns
+    -------
+    search_index : SearchIndex
+        The index of the books in the file.
+
+    """
+    if not use_cache:
+        return SearchIndex.from_csv(filename)
+
+    index_filename = get_search_index_filename(filename)
+    fingerprint = get_file_fingerprint(filename, read_saved_fingerprint(index_filename, SEARCH_INDEX_MAGIC))
+    search_index = read_search_index(index_filename, fingerprint)
+    if search_index is None:
+        search_index = SearchIndex.from_csv(filename)
+        try:
+            save_search_index(search_index, index_filename, fingerprint)
+        except OSError:
+            #the saved index only saves time so carry on without it
+            pass
+
+    return search_index
+
+def top_k(column, k, key=None, ascending=False):
+    """
+    A function to select the k largest (or smallest) values in a column without sorting all of it
+    
+    Lists and dictionaries use a heap of size k, numpy arrays use a partition, so the cost is O(n log k).
+    Ties are broken by position, so the earlier row or key always comes first.
+
+    Parameters
+    ----------
+    column : list, numpy.ndarray or dict
+        The values to select from, for example BookTable.pages or a dictionary of titles and pages.
+        Any read-only mapping such as AnalysisSession.title_and_pages is treated like a dictionary.
+    k : int
+        The number of values to select.
+    key : function
+        A function applied to each value to get the number to compare, for example int for page strings.
+    ascending : bool
+        True to select the smallest values instead of the largest.
+
+    Returns
+    -------
+    selected : list
+        A list of (row, value) pairs, or (key, value) pairs for a dictionary, in order.
+
+    """
+    if isinstance(column, np.ndarray) and key is None:
+        k = min(k, len(column))
+        if k <= 0:
+            return []
+        #find the value at the kth position, then take everything better than it plus the earliest ties
+        if ascending:
+            kth_value = np.partition(column, k - 1)[k - 1]
+            better_rows = np.flatnonzero(column < kth_value)
+        else:
+            kth_value = np.partition(column, len(column) - k)[len(column) - k]
+            better_rows = np.flatnonzero(column > kth_value)
+        tied_rows = np.flatnonzero(column == kth_value)[:k - len(better_rows)]
+        rows = np.concatenate([better_rows, tied_rows])
+        values = column[rows]
+        rows = rows[np.lexsort((rows, values if ascending else -values.astype(np.float64)))]
+        return list(zip(rows.tolist(), column[rows].tolist()))
+    
+    items = column.items() if isinstance(column, Mapping) else enumerate(column)
+    if key is None:
+        sort_key = lambda item: item[1]
+    else:
+        sort_key = lambda item: key(item[1])
+    
+    #heapq keeps the earlier item first when values are tied
+    if ascending:
+        return heapq.nsmallest(k, items, key=sort_key)
+    return heapq.nlargest(k, items, key=sort_key)
+
+def convert_page_number_to_int(pages):
+    """
+    A function to convert a page number from the title and page dictionary to an int
+
+    Parameters
+    ----------
+    pages : string or int
+        A page number, which may be an empty string.
+
+    Returns
+    -------
+    page_number : int
+        The page number, or zero if it is empty.
+
+    """
+    if pages == '':
+        return 0
+    
+    return int(pages)
+
+def get_top_ten_longest_books(dict_of_title_and_pages):
+    """
+    A function to get the top ten books with the most pages
+ 
+    Parameters
+    ----------
+    dict_of_title_and_pages : dict
+        A dictionary of title and page numbers in key value pairs.
+
+    Returns
+    -------
+    top_ten: list
+        A list of the top ten book titles and their page lengths
+
+    """
+    #select the ten longest books without sorting or converting the whole dictionary
+    top_ten = dict(top_k(dict_of_title_and_pages, 10, key=convert_page_number_to_int))
+    
+    return top_ten
+
+def get_books_with_same_number_pages_as_mean(list_of_page_numbers, dict_of_title_and_pages):
+    """
+    A function to display the book titles that have the same number of pages as the mean
+
+    Parameters
+    ----------
+    list_of_page_numbers : listDict
+        A list of book page numbers
+    dict_of_title_and_pages : dict
+        A dictionaty of titles and page numbers in key value pairs.
+
+    Returns
+    -------
+    None.
+
+    """
+    print(f"    {' Pages':>5}{'Title':>10}")
+    for pages, title in get_titles_with_same_number_pages_as_mean(list_of_page_numbers, dict_of_title_and_pages):
+        print("   - ", pages, "   ", title)
+
+def get_titles_with_same_number_pages_as_mean(list_of_page_numbers, dict_of_title_and_pages, mean_value=None, page_index=None):
+    """
+    A function to get the book titles that have the same number of pages as the mean
+
+    Without a page_index every title is checked, which is quicker than building an index for a single question.
+
+    Parameters
+    ----------
+    list_of_page_numbers : list
+        A list of book page numbers
+    dict_of_title_and_pages : dict
+        A dictionaty of titles and page numbers in key value pairs.
+    mean_value : float
+        The mean number of pages if it has already been calculated.
+    page_index : PageIndex
+        An index of the same dictionary to look the titles up in instead of checking every title.
+
+    Returns
+    -------
+    matching_titles : list
+        A list of [pages, title] pairs for the books with the mean number of pages.
+
+    """
+    if mean_value is None:
+        mean_value = calculate_mean(list_of_page_numbers)
+    #get the mean value of page numbers converted to int for whole number of pages
+    mean_value = int(round(mean_value, 0))
+    
+    if page_index is not None:
+        titles = [page_index.titles[position] for position in page_index.find(mean_value)]
+        return [[dict_of_title_and_pages[title], title] for title in titles]
+
+    matching_titles = []
+    for title, pages in dict_of_title_and_pages.items():
+        #compare as ints as the pages may still be strings from get_data
+        if convert_page_number_to_int(pages) == mean_value:
+            matching_titles.append([pages, title])
+    
+    return matching_titles
+    
+
+def get_total_number_of_records_in_list(list_of_records):
+    """
+    A function to get the total number of records in a list
+    
+    Parameters
+    ----------
+    list_of_records : list
+        A list of records
+
+    Returns
+    -------
+    number_of_records : int
+        The number of records in the list.
+
+    """
+    number_of_records = len(list_of_records)
+    
+    return round(number_of_records, 0)
+
+def get_total_of_records(list_of_records):
+    """
+    A function to get the sum of all the records in a list
+    
+    Parameters
+    ----------
+    list_of_records : list
+        A list of records
+
+    Returns
+    -------
+    total : int
+        The sum of the records in the list.
+
+    """
+    if isinstance(list_of_records, np.ndarray):
+        #add up in 64 bits so large catalogues cannot overflow the int32 columns
+        return int(list_of_records.sum(dtype=np.float64 if list_of_records.dtype.kind == "f" else np.int64))
+    
+    return int(sum(list_of_records))
+
+def get_max_value(list_of_records):
+    """
+    A function to get the maximum value in a list of records
+    
+    Parameters
+    ----------
+    list_of_records : list
+        a list of records
+
+    Returns
+    -------
+    max_value: int
+        The maximum value for a record in the list.
+
+    """
+    if isinstance(list_of_records, np.ndarray):
+        max_value = list_of_records.max()
+    else:
+        max_value = max(list_of_records)
+    
+    return int(max_value)
+    
+def get_fewest_pages_excluding_zero(list_of_records):
+    """
+    A function to get the smallest number of pages in a book excluding zero
+    
+    Parameters
+    ----------
+    list_of_records : list
+        A list of pages per book
+
+    Returns
+    -------
+    fewest_pages : int
+        The fewest pages for a record not including zero.
+
+    """
+    fewest_pages = 9999
+    if isinstance(list_of_records, np.ndarray):
+        #ignore values in the array with zero and take the smallest of the rest
+        pages_on_file = list_of_records[list_of_records != 0]
+        if len(pages_on_file):
+            fewest_pages = min(pages_on_file.min(), fewest_pages)
+        return int(fewest_pages)
+    
+    #loop through the list
+    for i in list_of_records:  
+        #ignore values in the list with zero
+        if i == 0:
+            continue
+        elif i < fewest_pages:
+            #if the value is less than fewest_pages the value is the new lowest value
+            fewest_pages = i
+            
+    return int(fewest_pages)
+
+def get_most_recent_year(list_of_years):
+    """
+    A function that takes a list of years and returns the most recent year
+
+    Parameters
+    ----------
+    list_of_years : list
+        A list of years.
+
+    Returns
+    -------
+    most_recent_year: int
         The most recent year a book was published in the list
     """
-    #set intial highest year to be 1
-    most_recent_year = 1
-    for item in list_of_years:
-        #ignore items with no year
-        if item == "Unknown":
-            continue
-        else:
-         #convert year to int to compare values
-            int_item = int(item)
-            if int_item > most_recent_year:
-                most_recent_year = int_item
-                
-    return most_recent_year
-            
-def get_book_with_fewest_pages(list_of_books_and_pages):
+    #set intial highest year to be 1
+    most_recent_year = 1
+    if isinstance(list_of_years, np.ndarray):
+        #unknown years are stored as zero so they never count as the most recent
+        if len(list_of_years):
+            most_recent_year = max(int(list_of_years.max()), most_recent_year)
+        return most_recent_year
+    
+    for item in list_of_years:
+        #ignore items with no year
+        if item == "Unknown":
+            continue
+        else:
+         #convert year to int to compare values
+            int_item = int(item)
+            if int_item > most_recent_year:
+                most_recent_year = int_item
+                
+    return most_recent_year
+
+def get_oldest_year(list_of_years):
+    """
+    A function that takes a list of years and returns the oldest year
+
+    Parameters
+    ----------
+    list_of_years : list
+        A list of years, where unknown years are "Unknown" in a list or zero in an array.
+
+    Returns
+    -------
+    oldest_year: int
+        The oldest year a book was published in the list
+    """
+    if isinstance(list_of_years, np.ndarray):
+        known_years = list_of_years[list_of_years != 0]
+    else:
+        known_years = [int(item) for item in list_of_years if item != "Unknown"]
+    
+    if len(known_years) == 0:
+        return "Unknown"
+    
+    return int(min(known_years))
+            
+def get_book_with_fewest_pages(list_of_books_and_pages):
+    """
+    A function that takes determines the book with the fewest pages in the list excluding those with zero
+
+    Parameters
+    ----------
+    list_of_books_and_pages : dict
+        A dictionary with book title and number of pages in a key value pair.
+
+    Returns
+    -------
+    title_with_fewest_pages: string
+         The title of the book with the fewest pages, the last one if several are tied, or None if no book has any pages
+
+    """
+    title_with_fewest_pages = None
+    fewest_pages = inf
+    #loop through the dictionary once for the lowest value that is not zero, comparing the pages as ints
+    for title, pages in list_of_books_and_pages.items():
+        pages = convert_page_number_to_int(pages)
+        #<= keeps the last of the tied titles
+        if 0 < pages <= fewest_pages:
+            fewest_pages = pages
+            title_with_fewest_pages = title
+    
+    if title_with_fewest_pages is None:
+        return None
+    return title_with_fewest_pages.title()
+    
+def get_book_with_most_pages(list_of_books_and_pages):
+    """
+    A function that takes determines the book with the most pages in the list
+
+    Parameters
+    ----------
+    list_of_books_and_pages : dict
+        A dictionary with book title and number of pages in a key value pair.
+
+    Returns
+    -------
+    title_with_most_pages: string
+        The title of the book with the most pages
+
+    """
+    #compare the page numbers as ints without converting the dictionary
+    title_with_most_pages = top_k(list_of_books_and_pages, 1, key=convert_page_number_to_int)[0][0]
+    
+    return title_with_most_pages
+
+def convert_dictionary_values_to_int_from_string(dictionary_of_records):
+    """
+    A function to convert string values to ints in a dictionary of key value pairs
+
+    Parameters
+    ----------
+    dictionary_of_records : dict
+        A dictionary of key value pairs in string format.
+
+    Returns
+    -------
+    dictionary_of_records : dict
+        A dictionary of key value pairs in string - int format.
+
+    """
+    #convert string values for pages to int in dictionary
+    for item in dictionary_of_records:
+        #if the string in empty change it to zero
+        if dictionary_of_records[item] == '':
+            dictionary_of_records[item] = 0
+        else:
+            #if the string is not empty convert it to an int
+            dictionary_of_records[item] = int(dictionary_of_records[item])
+            
+    return dictionary_of_records
+
+def get_number_of_items_with_missing_information(list_of_records): 
+    """
+    A function to get the number of items in a column with missing information
+    
+    Parameters
+    ----------
+    list_of_records : list
+        A list of items from one column in the csv file.
+
+    Returns
+    -------
+    counter : int
+        The number of records in the list with no value.
+
+    """
+    if isinstance(list_of_records, np.ndarray):
+        return int(np.count_nonzero(list_of_records == 0))
+    
+    counter = 0
+    #count the number of items that have 0 value
+    for record in list_of_records:
+        if record == 0:
+            counter += 1
+            
+    return counter
+
+def convert_blank_to_zero(list_with_empty_values):
+    """
+    A function for pre-processing data to change and empty values to zero
+    
+    Parameters
+    ----------
+    list_with_empty_values : list
+        A list with some empty values
+
+    Returns
+    -------
+    None.
+
+    """
+    #convert items with no value to 0
+    for i in range(len(list_with_empty_values)):
+        if list_with_empty_values[i] == '':
+            list_with_empty_values[i] = "0"
+
+def convert_list_of_strings_to_floats(list_of_strings):
+    """
+    A function for pre-processing data to convert the items in the list from string to float
+    
+    Parameters
+    ----------
+    list_of_strings : list
+        A list of numbers in string format
+
+    Returns
+    -------
+    list_of_floats: list
+        A list of the numbers in the original list converted to floats
+
+    """
+    list_of_floats = [float(x) for x in list_of_strings]
+    
+    return list_of_floats
+    
+def get_frequency_table(list_of_items):
+    """
+    A function for counting the number of times each item appears in the list in a single hash pass
+    
+    Parameters
+    ----------
+    list_of_items : list
+        A list of items, or a numpy array.
+
+    Returns
+    -------
+    frequency_table : collections.Counter
+        The count of each item, in the order the items first appear in the list.
+
+    """
+    if isinstance(list_of_items, np.ndarray):
+        #count plain Python values so the keys match those from a list
+        list_of_items = list_of_items.tolist()
+    
+    return Counter(list_of_items)
+
+def get_most_common_items(list_of_items, k):
+    """
+    A function for getting the k items that appear most often in the list
+    
+    Parameters
+    ----------
+    list_of_items : list
+        A list of items, or a numpy array.
+    k : int
+        The number of items to return.
+
+    Returns
+    -------
+    most_common : list
+        A list of [item, count] pairs with the highest count first. Ties keep the order the items first appear.
+
+    """
+    return [[item, count] for item, count in get_frequency_table(list_of_items).most_common(k)]
+    
+class TDigest:
+    """
+    A class to estimate the median and other quantiles of a stream of values in a fixed amount of memory
+
+    This is a merging t-digest: values are buffered, sorted and merged into at most about compression
+    weighted centroids. The centroids are kept small near the tails so extreme quantiles stay accurate.
+    Two digests can be merged, so chunks or worker processes can be summarised separately.
+
+    """
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.minimum = inf
+        self.maximum = -inf
+        #arrays of values, or (means, weights) pairs from merged digests, waiting to be compressed
+        self.buffer = []
+        self.buffered = 0
+
+    def update_array(self, values):
+        """
+        A function to add an array of values to the digest
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            The values to add.
+
+        Returns
+        -------
+        None.
+
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self.buffer.append((values, np.ones(len(values))))
+        self.buffered += len(values)
+        #compress as soon as the buffer is bigger than the centroids so memory stays fixed between chunks
+        if self.buffered >= 10 * self.compression:
+            self.compress()
+
+    def merge(self, other):
+        """
+        A function to combine another digest into this one
+
+        Parameters
+        ----------
+        other : TDigest
+            The digest to combine.
+
+        Returns
+        -------
+        None.
+
+        """
+        other.compress()
+        if len(other.means) == 0:
+            return
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.buffer.append((other.means, other.weights))
+        self.buffered += len(other.means)
+        self.compress()
+
+    def compress(self):
+        """
+        A function to merge the buffered values into the centroids
+
+        Neighbouring centroids are merged while they fall in the same unit of the k1 scale function,
+        k(q) = compression / pi * asin(2q - 1), which allows about compression centroids in total.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.buffer:
+            return
+        means = np.concatenate([self.means] + [values for values, weights in self.buffer])
+        weights = np.concatenate([self.weights] + [weights for values, weights in self.buffer])
+        self.buffer = []
+        self.buffered = 0
+
+        order = np.argsort(means, kind="stable")
+        means = means[order]
+        weights = weights[order]
+        cumulative = np.cumsum(weights)
+        quantile_of_centre = (cumulative - weights / 2) / cumulative[-1]
+        scale = np.floor(self.compression / pi * np.arcsin(2 * quantile_of_centre - 1))
+        starts = np.flatnonzero(np.concatenate([[True], scale[1:] != scale[:-1]]))
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    @property
+    def count(self):
+        """
+        The number of values added to the digest
+        """
+        return float(self.weights.sum()) + sum(float(weights.sum()) for values, weights in self.buffer)
+
+    def quantile(self, q):
+        """
+        A function to estimate a quantile of the values added to the digest
+
+        Parameters
+        ----------
+        q : float
+            The quantile between 0 and 1, for example 0.5 for the median.
+
+        Returns
+        -------
+        value : float
+            The estimated value at the quantile.
+
+        """
+        self.compress()
+        if len(self.means) == 0:
+            return nan
+        #each centroid sits at the middle of its weight, with the exact minimum and maximum at the ends
+        cumulative = np.cumsum(self.weights)
+        positions = np.concatenate([[0], cumulative - self.weights / 2, [cumulative[-1]]])
+        values = np.concatenate([[self.minimum], self.means, [self.maximum]])
+
+        return float(np.interp(q * cumulative[-1], positions, values))
+
+def get_mode_from_counts(counts):
+    """
+    A function to get the mode from a dictionary of values and the number of times they appear
+
+    Parameters
+    ----------
+    counts : dict
+        A dictionary of values and counts in the order the values first appear.
+
+    Returns
+    -------
+    mode_value: float
+        The most common value, skipping zero as it signifies missing information.
+
+    """
+    if not counts:
+        return nan
+    #max keeps the first of any tied values so ties go to the value that appears first
+    mode_value = max(counts, key=counts.get)
+    if mode_value == 0 and len(counts) > 1:
+        mode_value = max((value for value in counts if value != 0), key=counts.get)
+
+    return mode_value
+    
+def count_of_unique_items_in_list(list_of_items):
+    """
+    A function for counting the number times each item appears in the list
+    
+    Parameters
+    ----------
+    list_of_items : list
+        A list of items.
+
+    Returns
+    -------
+    count_list : list
+        A list of the count of each number of items in the original list.
+
+    """
+    count_list = [[item, count] for item, count in get_frequency_table(list_of_items).items()]
+        
+    return count_list
+    
+def get_pyplot():
+    """
+    A function to import matplotlib.pyplot the first time a chart is drawn
+
+    Importing pyplot is slow and starts a GUI backend, so it is left out of the module imports
+    to keep stats-only runs, tests and the report command fast.
+
+    Returns
+    -------
+    plt : module
+        The matplotlib.pyplot module.
+
+    """
+    import matplotlib.pyplot as plt
+
+    return plt
+
+@profile_stage
+def display_published_years(years, filename="top_ten_published_years.png", show=True):
+    """
+    A function to display visualizations for published years
+    
+    Parameters
+    ----------
+    years : list
+        a list of published years.
+    filename : string
+        The file location to save the chart to.
+    show : bool
+        False to save the chart without showing it, for headless rendering.
+
+    Returns
+    -------
+    None.
+    
+
+    """
+    #get the ten most common years in the list, most common first, for use in the plot
+    sorted_year_dict = dict(get_most_common_items(years, 10))
+    
+    #as a pie chart
+    plt = get_pyplot()
+    fig, ax = plt.subplots()
+    ax.set_title("Top Ten Years for Published Books")
+    #unknown years are stored as zero when the years come from a BookTable
+    year_labels = ["Unknown" if year == 0 else year for year in sorted_year_dict.keys()]
+    ax.pie(sorted_year_dict.values(), labels=year_labels, autopct="%.0f%%")
+    if show:
+        plt.show()
+    
+    #save the chart as a png file
+    fig.savefig(filename, bbox_inches="tight")
+    if not show:
+        #free the figure as nothing will show it
+        plt.close(fig)
+
+@profile_stage
+def display_visual_page_number_statistics(list_of_page_info, filename="page_number_statistics.png", show=True):
+    """
+    A function to visually display the results of the statistical analysis of the page number variable in a bar chart
+
+    Parameters
+    ----------
+    list_of_page_info : list or dict
+        A list of page numbers, or the results of describe for them if they have already been worked out.
+    filename : string
+        The file location to save the chart to.
+    show : bool
+        False to save the chart without showing it, for headless rendering.
+
+    Returns
+    -------
+    None.
+
+    """
+    #get the statistical results for page numbers
+    pages_statistics = list_of_page_info if isinstance(list_of_page_info, dict) else describe(list_of_page_info)
+    
+    #create a dictionary of statistical results
+    pages_data = {'Mean':pages_statistics["mean"],
+                  'Standard Deviation':pages_statistics["standard_deviation"],
+                  'Mode':pages_statistics["mode"],
+                  'Median':pages_statistics["median"]}
+    
+    plt = get_pyplot()
+    fig, ax = plt.subplots()
+    
+    #plot page number analysis
+    ax.set_title("Page Number Analysis")
+    
+    y_pos = [i for i in range(len(pages_data))]
+    
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(pages_data.keys())
+    
+    ax.set_ylabel("Type of Analysis")
+    ax.set_xlabel("Number of pages")
+
+    ax.barh(y_pos, pages_data.values(), align="center")
+    
+    if show:
+        plt.show()
+    
+    fig.savefig(filename, bbox_inches="tight")
+    if not show:
+        #free the figure as nothing will show it
+        plt.close(fig)
+
+@profile_stage
+def display_visual_number_of_ratings_statistics(list_of_number_ratings, filename="number_of_reviews_statistics.png", show=True):
+    """
+    A function to visually display the statistical analysis results for the number of ratings variable in a bar chart
+
+    Parameters
+    ----------
+    list_of_number_ratings : list or dict
+        A list of the number of ratings for each book, or the results of describe for them if they have already been worked out.
+    filename : string
+        The file location to save the chart to.
+    show : bool
+        False to save the chart without showing it, for headless rendering.
+
+    Returns
+    -------
+    None.
+
+    """
+    #get the statistical results for number of ratings
+    number_ratings_statistics = list_of_number_ratings if isinstance(list_of_number_ratings, dict) else describe(list_of_number_ratings)
+    
+    #create a dictionary of statistical results
+    number_ratings_data = {'Mean':number_ratings_statistics["mean"],
+                  'Standard Deviation':number_ratings_statistics["standard_deviation"],
+                  'Mode':number_ratings_statistics["mode"],
+                  'Median':number_ratings_statistics["median"]}
+    
+    plt = get_pyplot()
+    fig, ax = plt.subplots()
+    
+    #plot number of ratings analysis
+    ax.set_title("Number of Ratings Analysis")
+    
+    y_pos = [i for i in range(len(number_ratings_data))]
+    
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(number_ratings_data.keys())
+    
+    ax.set_ylabel("Analysis")
+    ax.set_xlabel("Result")
+    
+    ax.barh(y_pos, number_ratings_data.values(), align="center")
+    
+    if show:
+        plt.show()
+    
+    fig.savefig(filename, bbox_inches="tight")
+    if not show:
+        #free the figure as nothing will show it
+        plt.close(fig)
+    
+@profile_stage
+def display_visual_average_rating_statistics(list_of_ratings_info, filename="average_rating_statistics.png", show=True):
+    """
+    A function to visually display the statistical analysis results for the average ratings variable in a bar chart
+
+    Parameters
+    ----------
+    list_of_ratings_info : list or dict
+        A list of average ratings, or the results of describe for them if they have already been worked out.
+    filename : string
+        The file location to save the chart to.
+    show : bool
+        False to save the chart without showing it, for headless rendering.
+
+    Returns
+    -------
+    None.
+
+    """
+    #get the statistical results for average ratings
+    av_ratings_statistics = list_of_ratings_info if isinstance(list_of_ratings_info, dict) else describe(list_of_ratings_info)
+    
+    #create a dictionary of statistical results
+    av_ratings_data = {'Mean':av_ratings_statistics["mean"],
+                  'Standard Deviation':av_ratings_statistics["standard_deviation"],
+                  'Mode':av_ratings_statistics["mode"],
+                  'Median':av_ratings_statistics["median"]}
+    
+    plt = get_pyplot()
+    fig, ax = plt.subplots()
+    
+    #plot average rating analysis
+    ax.set_title("Average Rating Analysis")
+    
+    y_pos = [i for i in range(len(av_ratings_data))]
+    
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(av_ratings_data.keys())
+    
+    ax.set_ylabel("Type of Analysis")
+    ax.set_xlabel("Average Rating")
+    
+    ax.barh(y_pos, av_ratings_data.values(), align="center")
+    
+    if show:
+        plt.show()
+    
+    #save the file as a png
+    fig.savefig(filename, bbox_inches="tight")
+    if not show:
+        #free the figure as nothing will show it
+        plt.close(fig)
+    
+#the most books drawn as separate points on the scatter chart before it is drawn as a grid of counts instead
+SCATTER_POINT_LIMIT = 100_000
+
+#the number of columns (pages) and rows (average rating) in the grid of counts
+DENSITY_GRID_BINS = (200, 100)
+
+def get_density_grid(x_values, y_values, bins=DENSITY_GRID_BINS):
+    """
+    A function to count the number of points in each cell of an evenly spaced grid, the same as numpy.histogram2d
+
+    The cell of each point is worked out directly from its value rather than searched for, and the
+    cells are counted with bincount, so the grid is quick to build for millions of points.
+
+    Parameters
+    ----------
+    x_values : numpy.ndarray
+        The x value of each point.
+    y_values : numpy.ndarray
+        The y value of each point.
+    bins : tuple
+        The number of columns and rows in the grid.
+
+    Returns
+    -------
+    density_grid : tuple
+        The counts with a row per y cell and a column per x cell, the x cell edges and the y cell edges.
+
+    """
+    x_values = np.asarray(x_values, dtype=np.float64)
+    y_values = np.asarray(y_values, dtype=np.float64)
+    x_bins, y_bins = bins
+    edges = []
+    cells = []
+    for values, number_of_bins in ((x_values, x_bins), (y_values, y_bins)):
+        lowest, highest = (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+        if highest == lowest:
+            highest = lowest + 1.0
+        edges.append(np.linspace(lowest, highest, number_of_bins + 1))
+        #the highest value goes in the last cell rather than one past it
+        cells.append(np.minimum(((values - lowest) * (number_of_bins / (highest - lowest))).astype(np.intp), number_of_bins - 1))
+    counts = np.bincount(cells[1] * x_bins + cells[0], minlength=x_bins * y_bins).reshape(y_bins, x_bins)
+
+    return counts, edges[0], edges[1]
+
+@profile_stage
+def display_density_plot(density_grid, filename="page_number_v_average_rating.png", show=True):
+    """
+    A function to display the average rating v number of pages as a grid coloured by the number of books in each cell
+
+    The time taken depends on the size of the grid rather than the number of books.
+
+    Parameters
+    ----------
+    density_grid : tuple
+        The counts and cell edges returned by get_density_grid.
+    filename : string
+        The file location to save the chart to.
+    show : bool
+        False to save the chart without showing it, for headless rendering.
+
+    Returns
+    -------
+    None.
+
+    """
+    from matplotlib.colors import LogNorm
+
+    counts, x_edges, y_edges = density_grid
+    plt = get_pyplot()
+    fig, ax = plt.subplots()
+    
+    ax.set_xlabel("Number of Pages in Book")
+    ax.set_ylabel("Average Rating of Book")
+    
+    ax.set_title("Average Rating & Number of Pages")
+    
+    #leave empty cells blank and use a log scale so cells with a few books still show next to very full ones
+    mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts, 0), norm=LogNorm(vmin=1, vmax=max(int(counts.max()), 1)))
+    fig.colorbar(mesh, ax=ax, label="Number of Books")
+    
+    if show:
+        plt.show()
+    
+    #save the file as a png
+    fig.savefig(filename, bbox_inches="tight")
+    if not show:
+        #free the figure as nothing will show it
+        plt.close(fig)
+
+@profile_stage
+def display_scatter_plot(list_of_page_numbers, list_of_average_ratings, filename="page_number_v_average_rating.png", show=True,
+                         max_points=SCATTER_POINT_LIMIT):
+    """
+    A function to visually display the average rating v number of pages in a scatter chart
+
+    With more than max_points books the points are counted into a grid and drawn by display_density_plot
+    instead, as drawing every point gets too slow and the png too large.
+
+    Parameters
+    ----------
+    list_of_page_numbers : list
+        A list of page numbers per book.
+    list_of_average_ratings : list
+        A list of average ratings per book.
+    filename : string
+        The file location to save the chart to.
+    show : bool
+        False to save the chart without showing it, for headless rendering.
+    max_points : int
+        The most books to draw as separate points.
+
+    Returns
+    -------
+    None.
+
+    """
+    if len(list_of_page_numbers) > max_points:
+        display_density_plot(get_density_grid(list_of_page_numbers, list_of_average_ratings), filename, show)
+        return
+
+    plt = get_pyplot()
+    fig, ax = plt.subplots()
+    
+    ax.set_xlabel("Number of Pages in Book")
+    ax.set_ylabel("Average Rating of Book")
+    
+    ax.set_title("Average Rating & Number of Pages")
+    
+    #create the scatter using the page number and average rating lists
+    ax.scatter(list_of_page_numbers, list_of_average_ratings, marker=".")
+    
+    if show:
+        plt.show()
+    
+    #save the file as a png
+    fig.savefig(filename, bbox_inches="tight")
+    if not show:
+        #free the figure as nothing will show it
+        plt.close(fig)
+    
+@profile_stage
+def display_top_ten_longest_books(dict_of_title_and_pages, filename="top_ten_longest_books.png", show=True):
+    """
+    A function to visually display the top ten longest tiles and their number of pages
+
+    Parameters
+    ----------
+    dict_of_title_and_pages : dict
+        A dictionary of titles and page numbers in key value pair.
+    filename : string
+        The file location to save the chart to.
+    show : bool
+        False to save the chart without showing it, for headless rendering.
+
+    Returns
+    -------
+    None.
+
+    """
+    #get the top ten longest books in the dictionary
+    top_ten = get_top_ten_longest_books(dict_of_title_and_pages)
+    
+    plt = get_pyplot()
+    fig, ax = plt.subplots()
+    
+    #plot average rating analysis
+    ax.set_title("Top Ten Longest Books")
+    
+    y_pos = [i for i in range(len(top_ten))]
+    
+    ax.set_yticks(y_pos)
+    #set limit on size of text due to long book titles
+    ax.set_yticklabels(top_ten.keys(), size=7)
+    
+    ax.set_ylabel("Book Title")
+    ax.set_xlabel("Number of Pages")
+    
+    #create the bar chart
+    ax.barh(y_pos, [convert_page_number_to_int(pages) for pages in top_ten.values()], align="center")
+    
+    if show:
+        plt.show()
+    
+    #save the file as a png
+    fig.savefig(filename, bbox_inches="tight")
+    if not show:
+        #free the figure as nothing will show it
+        plt.close(fig)
+    
+def is_headless():
+    """
+    A function to check whether charts can be shown on a screen
+
+    Returns
+    -------
+    headless : bool
+        True if matplotlib has been set to the Agg backend or there is no display to show charts on.
+
+    """
+    if os.environ.get("MPLBACKEND", "").lower() == "agg":
+        return True
+    #Windows and macOS always have a display, other systems need an X11 or Wayland one
+    if sys.platform.startswith(("win", "darwin")):
+        return False
+    
+    return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+def get_visualizations(years, page_numbers, average_ratings, number_of_ratings, title_and_page_numbers, max_points=SCATTER_POINT_LIMIT):
+    """
+    A function to list the charts drawn by the Visualizations option
+
+    With more than max_points books the scatter chart is counted into a grid here, so only the grid
+    is passed to the process that draws it.
+
+    Parameters
+    ----------
+    years : list
+        A list of published years per book.
+    page_numbers : list
+        A list of page numbers per book.
+    average_ratings : list
+        A list of average ratings per book.
+    number_of_ratings : list
+        A list of the number of ratings per book.
+    title_and_page_numbers : dict
+        A dictionary of titles and page numbers in key value pairs.
+    max_points : int
+        The most books to draw as separate points on the scatter chart.
+
+    Returns
+    -------
+    visualizations : list
+        A list of [png file name, display function, arguments] for each chart.
+
+    """
+    if len(page_numbers) > max_points:
+        scatter_chart = [display_density_plot, (get_density_grid(page_numbers, average_ratings),)]
+    else:
+        scatter_chart = [partial(display_scatter_plot, max_points=max_points), (page_numbers, average_ratings)]
+
+    return [["top_ten_published_years.png", display_published_years, (years,)],
+            ["page_number_statistics.png", display_visual_page_number_statistics, (page_numbers,)],
+            ["average_rating_statistics.png", display_visual_average_rating_statistics, (average_ratings,)],
+            ["number_of_reviews_statistics.png", display_visual_number_of_ratings_statistics, (number_of_ratings,)],
+            ["page_number_v_average_rating.png", *scatter_chart],
+            ["top_ten_longest_books.png", display_top_ten_longest_books, (title_and_page_numbers,)]]
+
+def use_headless_backend():
+    """
+    A function to switch matplotlib to the Agg backend, which draws straight to an image so no display is needed
+
+    Returns
+    -------
+    None.
+
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    get_pyplot()
+
+def render_chart(display_function, arguments, filename):
+    """
+    A function to draw and save one chart with the Agg backend, run in a worker process
+
+    Parameters
+    ----------
+    display_function : function
+        One of the display_* functions.
+    arguments : tuple
+        The data to pass to the display function.
+    filename : string
+        The file location to save the chart to.
+
+    Returns
+    -------
+    seconds : float
+        The wall time taken to draw and save the chart.
+
+    """
+    start = time.perf_counter()
+    use_headless_backend()
+    display_function(*arguments, filename=filename, show=False)
+
+    return time.perf_counter() - start
+
+#the file in an output folder that remembers which data each saved chart was drawn from
+RENDER_CACHE_FILENAME = ".render_cache.json"
+
+#the version of the render cache, changed whenever the way charts are keyed changes
+RENDER_CACHE_VERSION = 3
+
+def update_chart_hash(chart_hash, value):
+    """
+    A function to add the data a chart is drawn from to a hash
+
+    Arrays are hashed from their bytes, functions by update_function_hash, tuples one item at a time
+    and everything else, such as the title dictionary or describe results, from its repr.
+
+    Parameters
+    ----------
+    chart_hash : hashlib.blake2b
+        The hash to add to.
+    value : object
+        A display function, an argument or a tuple of arguments.
+
+    Returns
+    -------
+    None.
+
+    """
+    if isinstance(value, np.ndarray):
+        chart_hash.update(f"array {value.dtype} {value.shape}".encode())
+        chart_hash.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, partial):
+        chart_hash.update(b"partial")
+        update_chart_hash(chart_hash, (value.func, value.args, tuple(sorted(value.keywords.items()))))
+    elif callable(value):
+        update_function_hash(chart_hash, value, set())
+    elif isinstance(value, tuple):
+        chart_hash.update(f"tuple {len(value)}".encode())
+        for item in value:
+            update_chart_hash(chart_hash, item)
+    elif isinstance(value, (list, Mapping)) and any(isinstance(item, np.ndarray) for item in (value.values() if isinstance(value, Mapping) else value)):
+        #the repr of a large array leaves values out, so hash containers of arrays item by item
+        update_chart_hash(chart_hash, tuple(value.items()) if isinstance(value, Mapping) else tuple(value))
+    else:
+        chart_hash.update(f"{type(value).__name__} {value!r}".encode())
+
+def update_function_hash(chart_hash, function, hashed_functions):
+    """
+    A function to add a function's compiled code to a hash, with the code of every function in its module it uses
+
+    A chart also changes when a helper it calls changes, such as get_most_common_items or get_pyplot, so
+    each function of the same module named in the code is hashed in turn, along with the values of the
+    UPPER_CASE constants it names, such as DENSITY_GRID_BINS.
+
+    Parameters
+    ----------
+    chart_hash : hashlib.blake2b
+        The hash to add to.
+    function : function
+        The function to hash.
+    hashed_functions : set
+        The functions already in the hash, which are not hashed again.
+
+    Returns
+    -------
+    None.
+
+    """
+    #profile_stage wraps every chart function in the same wrapper, so hash the function it wraps
+    function = inspect.unwrap(function)
+    if function in hashed_functions or not hasattr(function, "__code__"):
+        return
+    hashed_functions.add(function)
+    chart_hash.update(f"function {function.__module__}.{function.__qualname__}".encode())
+
+    codes = [function.__code__]
+    for code in codes:
+        #only simple constants are hashed as a nested function's repr includes its memory address
+        constants = [constant for constant in code.co_consts if isinstance(constant, (str, int, float, bool, type(None)))]
+        chart_hash.update(f"{constants!r}".encode())
+        chart_hash.update(code.co_code)
+        #lambdas, comprehensions and nested functions have code of their own
+        codes += [constant for constant in code.co_consts if inspect.iscode(constant)]
+        for name in code.co_names:
+            global_value = function.__globals__.get(name)
+            if inspect.isfunction(global_value) and global_value.__module__ == function.__module__:
+                update_function_hash(chart_hash, global_value, hashed_functions)
+            elif name.isupper() and isinstance(global_value, (int, float, str, tuple)):
+                chart_hash.update(f"{name} {global_value!r}".encode())
+
+def get_chart_key(display_function, arguments):
+    """
+    A function to get the key a saved chart is looked up by, which changes whenever the chart would look different
+
+    Parameters
+    ----------
+    display_function : function
+        The function that draws the chart.
+    arguments : tuple
+        The arguments the function is given.
+
+    Returns
+    -------
+    key : string
+        A blake2b hash of the function and the functions it uses from its module, its arguments and the
+        matplotlib version. Changes to other modules' code are not seen, apart from matplotlib's version.
+
+    """
+    try:
+        matplotlib_version = importlib.metadata.version("matplotlib")
+    except importlib.metadata.PackageNotFoundError:
+        matplotlib_version = "unknown"
+    chart_hash = hashlib.blake2b()
+    chart_hash.update(f"{RENDER_CACHE_VERSION} {matplotlib_version}".encode())
+    update_chart_hash(chart_hash, (display_function, tuple(arguments)))
+
+    return chart_hash.hexdigest()
+
+def read_render_cache(output_folder):
+    """
+    A function to read which chart keys were saved to an output folder
+
+    Parameters
+    ----------
+    output_folder : string
+        The folder the charts are saved to.
+
+    Returns
+    -------
+    charts : dict
+        Each png file name and its "key", "size" and "mtime_ns" when it was saved, or an empty dictionary
+        if there is no usable render cache.
+
+    """
+    try:
+        with open(os.path.join(output_folder, RENDER_CACHE_FILENAME), encoding="utf8") as cache_file:
+            render_cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(render_cache, dict) or render_cache.get("version") != RENDER_CACHE_VERSION:
+        return {}
+
+    return render_cache.get("charts", {})
+
+def save_render_cache(output_folder, charts):
+    """
+    A function to save which chart keys were saved to an output folder, replacing the file in one step
+
+    Parameters
+    ----------
+    output_folder : string
+        The folder the charts are saved to.
+    charts : dict
+        Each png file name and its "key", "size" and "mtime_ns".
+
+    Returns
+    -------
+    None.
+
+    """
+    cache_filename = os.path.join(output_folder, RENDER_CACHE_FILENAME)
+    temporary_filename = cache_filename + ".tmp"
+    try:
+        with open(temporary_filename, "w", encoding="utf8") as cache_file:
+            cache_file.write(json.dumps({"version": RENDER_CACHE_VERSION, "charts": charts}))
+        os.replace(temporary_filename, cache_filename)
+    except OSError:
+        #the render cache only saves time so carry on without it, for example in a read-only folder
+        pass
+
+def is_chart_saved(chart_filename, saved_chart, key):
+    """
+    A function to check a png file is still the one saved for a chart key and has not been changed or removed since
+
+    Parameters
+    ----------
+    chart_filename : string
+        The png file location.
+    saved_chart : dict
+        The "key", "size" and "mtime_ns" recorded for the png file, or None.
+    key : string
+        The key of the chart that would be drawn now.
+
+    Returns
+    -------
+    saved : bool
+        True if the png file can be used instead of drawing the chart again.
+
+    """
+    if not saved_chart or saved_chart.get("key") != key:
+        return False
+    try:
+        file_stats = os.stat(chart_filename)
+    except OSError:
+        return False
+
+    return file_stats.st_size == saved_chart.get("size") and file_stats.st_mtime_ns == saved_chart.get("mtime_ns")
+
+@profile_stage
+def render_visualizations(visualizations, output_folder=".", workers=None, use_cache=True):
+    """
+    A function to draw and save every chart at the same time in a pool of processes, without showing them
+
+    Each chart is keyed by a hash of the data it is drawn from. A chart whose png file was saved from the
+    same key and has not been changed since is not drawn again, and when no chart needs drawing matplotlib
+    is not even loaded.
+
+    Parameters
+    ----------
+    visualizations : list
+        The charts to draw as returned by get_visualizations.
+    output_folder : string
+        The folder to save the png files to.
+    workers : int
+        The number of processes to use, by default one per chart to draw up to the number of cores.
+    use_cache : bool
+        False to draw every chart and leave the render cache alone.
+
+    Returns
+    -------
+    chart_seconds : dict
+        A dictionary of each png file and the seconds it took to draw, or None if the saved file was
+        used, in the order given, once all are saved.
+
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    saved_charts = read_render_cache(output_folder) if use_cache else {}
+    chart_seconds = {}
+    chart_keys = {}
+    charts_to_draw = []
+    for name, display_function, arguments in visualizations:
+        chart_seconds[name] = None
+        if use_cache:
+            chart_keys[name] = get_chart_key(display_function, arguments)
+            if is_chart_saved(os.path.join(output_folder, name), saved_charts.get(name), chart_keys[name]):
+                continue
+        charts_to_draw.append([name, display_function, arguments])
+    if not charts_to_draw:
+        return chart_seconds
+
+    if workers is None:
+        workers = min(len(charts_to_draw), os.cpu_count() or 1)
+    #load matplotlib once here so forked workers do not each have to import it
+    use_headless_backend()
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [[name, pool.submit(render_chart, display_function, arguments, os.path.join(output_folder, name))]
+                for name, display_function, arguments in charts_to_draw]
+        #result waits for each chart and passes on any error from the worker
+        for name, job in jobs:
+            chart_seconds[name] = job.result()
+    
+    if use_cache:
+        for name, display_function, arguments in charts_to_draw:
+            file_stats = os.stat(os.path.join(output_folder, name))
+            saved_charts[name] = {"key": chart_keys[name], "size": file_stats.st_size, "mtime_ns": file_stats.st_mtime_ns}
+        save_render_cache(output_folder, saved_charts)
+
+    return chart_seconds
+
+def print_render_timings(chart_seconds, total_seconds):
+    """
+    A function to display how long each chart took to draw in headless rendering
+
+    Parameters
+    ----------
+    chart_seconds : dict
+        A dictionary of png files and seconds as returned by render_visualizations.
+    total_seconds : float
+        The wall time taken to draw all of the charts.
+
+    Returns
+    -------
+    None.
+
+    """
+    print(f"    {'Seconds':>7}   Chart")
+    for name, seconds in chart_seconds.items():
+        if seconds is None:
+            #the chart was unchanged so the saved png file was kept
+            print(f"   - {'saved':>7}   {name}")
+        else:
+            print(f"   - {seconds:>7.2f}   {name}")
+    drawing_seconds = sum(seconds for seconds in chart_seconds.values() if seconds is not None)
+    print(f"Total time: {total_seconds:.2f} seconds ({drawing_seconds:.2f} seconds of drawing)")
+    
+@profile_stage
+def calculate_mean(list_of_records):
+    """
+    A function to calculate the mean from a list of values
+
+    Parameters
+    ----------
+    list_of_records : list
+        A list of records in float format.
+
+    Returns
+    -------
+    mean_value: float
+        The mean value of the original list
+
+    """
+    if isinstance(list_of_records, np.ndarray):
+        return float(list_of_records.mean(dtype=np.float64))
+    
+    mean_value = sum(list_of_records)/len(list_of_records)
+    return mean_value
+    
+@profile_stage
+def calculate_standard_deviation(list_of_records):
+    """
+    A function to calculate the standard deviation of a list of records
+
+    Parameters
+    ----------
+    list_of_records : list
+        A list of record in float format.
+
+    Returns
+    -------
+    standard_deviation_value:
+        The standard deviation for the original list
+
+    """
+    if isinstance(list_of_records, np.ndarray):
+        return float(list_of_records.std(dtype=np.float64))
+    
+    #work out the mean once rather than for every item in the list
+    mean_value = calculate_mean(list_of_records)
+    deviations = [(x - mean_value) ** 2 for x in list_of_records] 
+    standard_deviation = sqrt(sum(deviations)/(len(list_of_records)))
+    
+    return standard_deviation
+
+@profile_stage
+def calculate_median(list_of_records):
+    """
+    A function to calculate the median of a list of records
+
+    Parameters
+    ----------
+    list_of_records : list
+        A list of records in float format.
+
+    Returns
+    -------
+    median_value: float.
+        The value of the median in the original list
+    """
+    if isinstance(list_of_records, np.ndarray):
+        return float(np.median(list_of_records))
+    
+    #create a copy of the list for the sorting to be used in the calculation in order to preserve the order of the original list
+    copy_of_list = list_of_records.copy()
+    mid_index = int(len(copy_of_list)/2)
+    copy_of_list.sort()
+    
+    if len(copy_of_list) % 2:
+        median_value = copy_of_list[mid_index]
+    else:
+        median_value = (copy_of_list[mid_index-1] + copy_of_list[mid_index]) / 2
+    
+    return median_value
+
+@profile_stage
+def calculate_mode(list_of_records):
+    """
+    A function to calculate the mode of a list
+
+    Parameters
+    ----------
+    list_of_records : list
+        A list of records in float format
+
+    Returns
+    -------
+    mode_value: float
+        The value of the mode of the original list
+
+    """
+    #count each value once and take the most common, skipping zero as it signifies missing information
+    mode_value = get_mode_from_counts(get_frequency_table(list_of_records))
+        
+    return mode_value
+
+@profile_stage
+def calculate_correlation(list_one, list_two):
+    """
+    A function that takes in two lists and calculates the correlation between them
+
+    Parameters
+    ----------
+    list_one : list
+        A list of values.
+    list_two : list
+        A list of value.
+
+    Returns
+    -------
+    correlation_value: float
+        The result of the correlation between the two lists provided
+
+    """
+    if isinstance(list_one, np.ndarray) or isinstance(list_two, np.ndarray):
+        x_deviations = np.asarray(list_one, dtype=np.float64) - calculate_mean(np.asarray(list_one))
+        y_deviations = np.asarray(list_two, dtype=np.float64) - calculate_mean(np.asarray(list_two))
+        return float(x_deviations @ y_deviations / sqrt((x_deviations @ x_deviations) * (y_deviations @ y_deviations)))
+    
+    #calculate the mean of both lists
+    mean_list_one = calculate_mean(list_one)
+    mean_list_two = calculate_mean(list_two)
+    
+    #create a list of the deviations, which are reused for the products and squares
+    x_deviations = [x - mean_list_one for x in list_one]
+    y_deviations = [y - mean_list_two for y in list_two]
+    
+    #calculate the correlation
+    xy_deviations = sum(x*y for (x,y) in zip(x_deviations, y_deviations))
+    correlation_value = xy_deviations/(sqrt(sum(x*x for x in x_deviations))*(sqrt(sum(y*y for y in y_deviations))))
+    
+    return correlation_value
+
+#the columns of a BookTable in the correlation matrix, with the names used in the report
+CORRELATION_COLUMNS = {"pages": "pages", "average_rating": "average_ratings", "number_of_ratings": "number_of_ratings", "year": "years"}
+
+#the ways the correlation matrix can be worked out
+CORRELATION_METHODS = ("pearson", "spearman")
+
+def get_ranks(values, missing=None):
+    """
+    A function to rank the values in a column, giving tied values the mean of the ranks they cover
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The values to rank.
+    missing : numpy.ndarray
+        A boolean mask that is True for empty values, which are left out of the ranking, or None if no values are empty.
+
+    Returns
+    -------
+    ranks : numpy.ndarray
+        The rank of each value counting from 1, with zero for empty values.
+
+    """
+    values = np.asarray(values)
+    present = slice(None) if missing is None else ~np.asarray(missing)
+    #one sort finds every different value and how many times it appears
+    unique_values, positions, counts = np.unique(values[present], return_inverse=True, return_counts=True)
+    mean_ranks = np.cumsum(counts) - (counts - 1) / 2
+    ranks = np.zeros(len(values))
+    ranks[present] = mean_ranks[positions.reshape(-1)]
+
+    return ranks
+
+@profile_stage
+def calculate_correlation_matrix(columns, missing_masks=None, method="pearson", chunk_rows=1_000_000):
+    """
+    A function to calculate the correlation between every pair of columns at once
+
+    Each column is centred on its mean and the sums needed for every pair come from matrix products
+    over a chunk of rows at a time, so memory use is set by chunk_rows rather than the number of books.
+    Empty values are handled pairwise: each pair uses the rows where both of its values are present.
+    For spearman each column is ranked once, leaving out its own empty values.
+
+    Parameters
+    ----------
+    columns : list
+        The numeric columns, all the same length.
+    missing_masks : list
+        A boolean mask per column that is True for empty values, or None if no values are empty.
+    method : string
+        One of CORRELATION_METHODS.
+    chunk_rows : int
+        The most rows to hold in the matrices at once.
+
+    Returns
+    -------
+    correlation_matrix : numpy.ndarray
+        The correlation of each pair of columns, with nan where a pair has fewer than two rows or a column
+        does not vary over those rows.
+
+    """
+    if missing_masks is None:
+        missing_masks = [None] * len(columns)
+    if method == "spearman":
+        columns = [get_ranks(column, missing) for column, missing in zip(columns, missing_masks)]
+    columns = [np.asarray(column) for column in columns]
+    present_masks = [np.ones(len(column), dtype=bool) if missing is None else ~np.asarray(missing)
+                     for column, missing in zip(columns, missing_masks)]
+    #centring first keeps the sums small so the differences below do not lose precision
+    means = [column[present].mean(dtype=np.float64) if present.any() else 0.0 for column, present in zip(columns, present_masks)]
+
+    size = len(columns)
+    counts = np.zeros((size, size))
+    sums = np.zeros((size, size))
+    squares = np.zeros((size, size))
+    products = np.zeros((size, size))
+    total_rows = len(columns[0]) if columns else 0
+    for start in range(0, total_rows, chunk_rows):
+        stop = min(start + chunk_rows, total_rows)
+        present = np.empty((stop - start, size))
+        values = np.empty((stop - start, size))
+        for position, (column, present_mask, mean) in enumerate(zip(columns, present_masks, means)):
+            present[:, position] = present_mask[start:stop]
+            #empty values become zero so they add nothing to any sum
+            values[:, position] = np.where(present_mask[start:stop], column[start:stop] - mean, 0.0)
+        #entry [i, j] of each product only counts the rows where columns i and j are both present
+        counts += present.T @ present
+        sums += values.T @ present
+        squares += np.square(values).T @ present
+        products += values.T @ values
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariances = products - sums * sums.T / counts
+        variances = squares - np.square(sums) / counts
+        correlation_matrix = covariances / np.sqrt(variances * variances.T)
+    correlation_matrix[(counts < 2) | ~(variances > 0) | ~(variances.T > 0)] = nan
+    #every column matches itself exactly, whatever the rounding above
+    diagonal = np.diag_indices(size)
+    correlation_matrix[diagonal] = np.where(np.isnan(correlation_matrix[diagonal]), nan, 1.0)
+
+    return np.clip(correlation_matrix, -1.0, 1.0)
+
+class RunningMoments:
+    """
+    A class to keep the count, mean, sum of squared deviations, minimum and maximum of a stream of values
+
+    Values are added one at a time with Welford's update or an array at a time, and two sets of moments
+    are combined with Chan's parallel formula, so the values themselves never need to be kept.
+
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sum_of_squared_deviations = 0.0
+        self.minimum = inf
+        self.maximum = -inf
+
+    def update(self, value):
+        """
+        A function to add a single value to the moments
+
+        Parameters
+        ----------
+        value : float
+            The value to add.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.sum_of_squared_deviations += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def update_array(self, values):
+        """
+        A function to add an array of values to the moments in one vectorised step
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            The values to add.
+
+        Returns
+        -------
+        None.
+
+        """
+        if len(values) == 0:
+            return
+        values = np.asarray(values, dtype=np.float64)
+        chunk = RunningMoments()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.sum_of_squared_deviations = float(np.square(values - chunk.mean).sum())
+        chunk.minimum = float(values.min())
+        chunk.maximum = float(values.max())
+        self.merge(chunk)
+
+    def merge(self, other):
+        """
+        A function to combine another set of moments into these ones
+
+        Parameters
+        ----------
+        other : RunningMoments
+            The moments to combine.
+
+        Returns
+        -------
+        None.
+
+        """
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.sum_of_squared_deviations += other.sum_of_squared_deviations + delta * delta * self.count * other.count / total
+        self.count = total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def standard_deviation(self):
+        """
+        The population standard deviation, the same as calculate_standard_deviation
+        """
+        if self.count == 0:
+            return nan
+        return sqrt(self.sum_of_squared_deviations / self.count)
+
+class RunningCorrelation:
+    """
+    A class to keep the moments and co-moment of two streams of values so their correlation can be
+    worked out without keeping the values, merged in the same way as RunningMoments
+
+    """
+    def __init__(self):
+        self.x_moments = RunningMoments()
+        self.y_moments = RunningMoments()
+        self.co_moment = 0.0
+
+    def update_arrays(self, x_values, y_values):
+        """
+        A function to add paired arrays of values in one vectorised step
+
+        Parameters
+        ----------
+        x_values : numpy.ndarray
+            The first values of each pair.
+        y_values : numpy.ndarray
+            The second values of each pair.
+
+        Returns
+        -------
+        None.
+
+        """
+        if len(x_values) == 0:
+            return
+        chunk = RunningCorrelation()
+        chunk.x_moments.update_array(x_values)
+        chunk.y_moments.update_array(y_values)
+        chunk.co_moment = float((np.asarray(x_values, dtype=np.float64) - chunk.x_moments.mean) @
+                                (np.asarray(y_values, dtype=np.float64) - chunk.y_moments.mean))
+        self.merge(chunk)
+
+    def merge(self, other):
+        """
+        A function to combine another set of paired moments into these ones
+
+        Parameters
+        ----------
+        other : RunningCorrelation
+            The moments to combine.
+
+        Returns
+        -------
+        None.
+
+        """
+        if other.x_moments.count == 0:
+            return
+        total = self.x_moments.count + other.x_moments.count
+        self.co_moment += other.co_moment + ((other.x_moments.mean - self.x_moments.mean) * (other.y_moments.mean - self.y_moments.mean)
+                                             * self.x_moments.count * other.x_moments.count / total)
+        self.x_moments.merge(other.x_moments)
+        self.y_moments.merge(other.y_moments)
+
+    @property
+    def correlation(self):
+        """
+        The Pearson correlation of the pairs, the same as calculate_correlation
+        """
+        spread = sqrt(self.x_moments.sum_of_squared_deviations * self.y_moments.sum_of_squared_deviations)
+        if spread == 0:
+            return nan
+        return self.co_moment / spread
+
+def get_median_from_counts(counts):
+    """
+    A function to get the median from a dictionary of values and the number of times they appear
+
+    Parameters
+    ----------
+    counts : dict
+        A dictionary of values and counts.
+
+    Returns
+    -------
+    median_value: float
+        The median, the same as calculate_median on the original values.
+
+    """
+    total = sum(counts.values())
+    if total == 0:
+        return nan
+    #walk the distinct values in order until both middle positions are passed
+    lower_position = (total - 1) // 2
+    upper_position = total // 2
+    lower_value = None
+    cumulative = 0
+    for value in sorted(counts):
+        cumulative += counts[value]
+        if lower_value is None and cumulative > lower_position:
+            lower_value = value
+        if cumulative > upper_position:
+            return (lower_value + value) / 2
+
+def describe(list_of_records):
+    """
+    A function to calculate every summary statistic for a list of records at once
+
+    The moments are gathered in one pass, the counts in one hash pass and the median with one
+    selection step, instead of separate passes for each calculate_* function.
+
+    Parameters
+    ----------
+    list_of_records : list
+        A list of records in float format, or a numpy array.
+
+    Returns
+    -------
+    statistics : dict
+        The count, missing count (zeros), mean, standard deviation, mode, median, minimum and maximum.
+
+    """
+    values = np.asarray(list_of_records, dtype=np.float64)
+    moments = RunningMoments()
+    moments.update_array(values)
+    counts = get_frequency_table(values)
+
+    #select the middle item(s) rather than sorting the whole list
+    median_value = nan
+    if len(values):
+        mid_index = len(values) // 2
+        if len(values) % 2:
+            median_value = float(np.partition(values, mid_index)[mid_index])
+        else:
+            middle = np.partition(values, [mid_index - 1, mid_index])
+            median_value = float((middle[mid_index - 1] + middle[mid_index]) / 2)
+
+    return {"count": moments.count,
+            "missing": counts.get(0.0, 0),
+            "mean": moments.mean if moments.count else nan,
+            "standard_deviation": moments.standard_deviation,
+            "mode": get_mode_from_counts(counts),
+            "median": median_value,
+            "min": moments.minimum,
+            "max": moments.maximum}
+
+@profile_stage
+def describe_books(list_of_book_pages, list_of_average_ratings, list_of_number_of_ratings):
+    """
+    A function to calculate the statistics shared by the Statistical Analysis option and the results file
+
+    Parameters
+    ----------
+    list_of_book_pages : list
+        A list of book page numbers.
+    list_of_average_ratings : list
+        A list of average ratings per books.
+    list_of_number_of_ratings : list
+        A list of the number of ratings per book.
+
+    Returns
+    -------
+    book_statistics : dict
+        The describe results for "pages", "average_rating" and "number_of_ratings" and the
+        "correlation" between page numbers and average rating.
+
+    """
+    return {"pages": describe(list_of_book_pages),
+            "average_rating": describe(list_of_average_ratings),
+            "number_of_ratings": describe(list_of_number_of_ratings),
+            "correlation": calculate_correlation(np.asarray(list_of_book_pages, dtype=np.float64),
+                                                 np.asarray(list_of_average_ratings, dtype=np.float64))}
+    
+#the numeric columns summarized by bootstrap_book_statistics, summarize_books_out_of_core and BookAggregates, with the BookTable column each one comes from
+AGGREGATE_COLUMNS = {"pages": "pages", "average_rating": "average_ratings", "number_of_ratings": "number_of_ratings"}
+
+#the most row numbers drawn at once by a bootstrap batch, which sets the memory each worker uses
+BOOTSTRAP_BATCH_VALUES = 2_000_000
+
+#the prepared columns a worker process resamples, set once when the worker starts rather than sent with every batch
+BOOTSTRAP_WORKER_STATE = {}
+
+def set_bootstrap_worker_columns(columns):
+    """
+    A function to give a bootstrap worker process the columns to resample, sorted and centred ready for bootstrap_batch
+
+    Parameters
+    ----------
+    columns : dict
+        Each column name in AGGREGATE_COLUMNS and its values.
+
+    Returns
+    -------
+    None.
+
+    """
+    BOOTSTRAP_WORKER_STATE.clear()
+    columns = {name: np.asarray(column, dtype=np.float64) for name, column in columns.items()}
+    names = list(columns)
+    means = np.array([columns[name].mean() for name in names])
+    centred = np.column_stack([columns[name] for name in names]) - means
+    #the centred values, their squares and the product of pages and average rating, summed for each resample
+    pages, average_rating = names.index("pages"), names.index("average_rating")
+    BOOTSTRAP_WORKER_STATE.update(
+        names=names, means=means,
+        moment_values=np.column_stack([centred, np.square(centred), centred[:, pages] * centred[:, average_rating]]),
+        orders=[np.argsort(columns[name], kind="stable") for name in names],
+        sorted_values=[np.sort(columns[name], kind="stable") for name in names])
+
+def bootstrap_batch(seed_sequence, resamples):
+    """
+    A function to work out the statistics of a batch of resamples in one vectorised step, run in a worker process
+
+    Each resample is turned into the number of times each book was drawn. The means, standard deviations
+    and correlation of every resample then come from one matrix product of those counts with the centred
+    columns. Each median is read from the running total of the counts in the column's sorted order.
+
+    Parameters
+    ----------
+    seed_sequence : numpy.random.SeedSequence
+        The seed for this batch, so the same batch always draws the same rows.
+    resamples : int
+        The number of resamples in the batch.
+
+    Returns
+    -------
+    statistics : dict
+        For each column, arrays of the mean, median and standard_deviation of each resample, and
+        the correlation between pages and average rating of each resample.
+
+    """
+    worker = BOOTSTRAP_WORKER_STATE
+    names = worker["names"]
+    number_of_books = len(worker["moment_values"])
+    #draw each resample of the books with replacement and count how many times each book was drawn,
+    #with a row per book and a column per resample so the running totals below add whole rows at a time
+    rows = np.random.default_rng(seed_sequence).integers(0, number_of_books, size=(resamples, number_of_books), dtype=np.int32)
+    rows *= resamples
+    rows += np.arange(resamples, dtype=np.int32)[:, None]
+    counts = np.bincount(rows.ravel(), minlength=resamples * number_of_books).astype(np.int32).reshape(number_of_books, resamples)
+    del rows
+
+    sums = counts.T @ worker["moment_values"] / number_of_books
+    centred_means = sums[:, :len(names)]
+    variances = np.maximum(sums[:, len(names):2 * len(names)] - np.square(centred_means), 0)
+
+    statistics = {}
+    #the middle one or two positions of a sorted resample, counting from zero
+    middle_positions = sorted({(number_of_books - 1) // 2, number_of_books // 2})
+    for position, name in enumerate(names):
+        running_counts = counts[worker["orders"][position]]
+        np.cumsum(running_counts, axis=0, out=running_counts)
+        middle_values = [worker["sorted_values"][position][(running_counts <= middle).sum(axis=0)] for middle in middle_positions]
+        statistics[name] = {"mean": centred_means[:, position] + worker["means"][position],
+                            "median": sum(middle_values) / len(middle_values),
+                            "standard_deviation": np.sqrt(variances[:, position])}
+
+    pages, average_rating = names.index("pages"), names.index("average_rating")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        statistics["correlation"] = ((sums[:, -1] - centred_means[:, pages] * centred_means[:, average_rating]) /
+                                     np.sqrt(variances[:, pages] * variances[:, average_rating]))
+
+    return statistics
+
+@profile_stage
+def bootstrap_book_statistics(book_table, resamples=10_000, confidence=0.95, seed=None, workers=None):
+    """
+    A function to work out bootstrap confidence intervals for the statistics returned by describe_books
+
+    The books are resampled with replacement in batches spread over a pool of processes. Each batch has
+    its own seed spawned from one seed, so the same seed gives the same intervals however many workers are used.
+
+    Parameters
+    ----------
+    book_table : BookTable
+        The books to resample.
+    resamples : int
+        The number of resamples.
+    confidence : float
+        The share of resampled values inside each interval, for example 0.95.
+    seed : int
+        The seed to draw the resamples with, or None for a new one which is returned so the intervals can be repeated.
+    workers : int
+        The number of processes to resample with, by default one per CPU.
+
+    Returns
+    -------
+    intervals : dict
+        The resamples, confidence and seed, the [lower, upper] interval of the mean, median and
+        standard_deviation of each column in AGGREGATE_COLUMNS, and the interval of the correlation.
+
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    columns = {name: getattr(book_table, column) for name, column in AGGREGATE_COLUMNS.items()}
+    batch_size = max(1, min(resamples, BOOTSTRAP_BATCH_VALUES // max(len(book_table), 1)))
+    batch_sizes = [batch_size] * (resamples // batch_size) + ([resamples % batch_size] if resamples % batch_size else [])
+    if len(book_table) == 0:
+        #there is nothing to resample without any books
+        batch_sizes = []
+    seed_sequence = np.random.SeedSequence(seed)
+    batch_seeds = seed_sequence.spawn(len(batch_sizes))
+
+    if workers == 1 or len(batch_sizes) <= 1:
+        #a single worker resamples in this process
+        set_bootstrap_worker_columns(columns)
+        batches = list(map(bootstrap_batch, batch_seeds, batch_sizes))
+        BOOTSTRAP_WORKER_STATE.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=set_bootstrap_worker_columns, initargs=(columns,)) as pool:
+            batches = list(pool.map(bootstrap_batch, batch_seeds, batch_sizes))
+
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+    def get_interval(values):
+        if not values:
+            return [None, None]
+        return [None if isnan(value) else value for value in np.quantile(np.concatenate(values), quantiles).tolist()]
+
+    intervals = {"resamples": resamples, "confidence": confidence, "seed": seed_sequence.entropy}
+    for name in AGGREGATE_COLUMNS:
+        intervals[name] = {statistic: get_interval([batch[name][statistic] for batch in batches])
+                           for statistic in ("mean", "median", "standard_deviation")}
+    intervals["correlation"] = get_interval([batch["correlation"] for batch in batches])
+
+    return intervals
+
+def describe_correlation(correlation, interval=None):
+    """
+    A function to put the strength and direction of a correlation into words
+
+    Parameters
+    ----------
+    correlation : float
+        The correlation.
+    interval : list
+        The [lower, upper] confidence interval of the correlation, if one has been worked out.
+
+    Returns
+    -------
+    description : string
+        For example "a weak positive correlation".
+
+    """
+    if interval is not None and interval[0] is not None and interval[1] is not None and interval[0] <= 0 <= interval[1]:
+        return "no clear correlation"
+    size = abs(correlation)
+    if size < 0.1:
+        return "no clear correlation"
+    strength = "weak" if size < 0.3 else "moderate" if size < 0.5 else "strong"
+
+    return f"a {strength} {'positive' if correlation > 0 else 'negative'} correlation"
+
+#the quantiles estimated by the out-of-core summary
+SUMMARY_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+@profile_stage
+def summarize_books_out_of_core(filename, chunk_rows=100_000, compression=200, quantiles=SUMMARY_QUANTILES):
+    """
+    A function to summarise a csv file of any size in a fixed amount of memory
+
+    The file is read chunk_rows rows at a time. The count, missing count (zeros), mean, standard
+    deviation, minimum and maximum are exact, using RunningMoments. The median and other quantiles are
+    estimated with a TDigest. Memory use depends on chunk_rows and compression, not on the size of the file.
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    chunk_rows : int
+        The most rows to hold in memory at once.
+    compression : int
+        The number of centroids each TDigest may keep, higher is more accurate.
+    quantiles : tuple
+        The quantiles between 0 and 1 to estimate.
+
+    Returns
+    -------
+    summary : dict
+        A dictionary of statistics for "pages", "average_rating" and "number_of_ratings".
+
+    """
+    moments = {name: RunningMoments() for name in AGGREGATE_COLUMNS}
+    digests = {name: TDigest(compression) for name in AGGREGATE_COLUMNS}
+    missing = dict.fromkeys(AGGREGATE_COLUMNS, 0)
+
+    for columns in read_book_column_chunks(filename, chunk_rows):
+        for name, column_name in AGGREGATE_COLUMNS.items():
+            moments[name].update_array(columns[column_name])
+            digests[name].update_array(columns[column_name])
+            missing[name] += int(np.count_nonzero(columns[column_name] == 0))
+
+    summary = {}
+    for name in AGGREGATE_COLUMNS:
+        summary[name] = {"count": moments[name].count,
+                         "missing": missing[name],
+                         "mean": moments[name].mean if moments[name].count else nan,
+                         "standard_deviation": moments[name].standard_deviation,
+                         "min": moments[name].minimum,
+                         "max": moments[name].maximum,
+                         "median": digests[name].quantile(0.5),
+                         "quantiles": {str(q): digests[name].quantile(q) for q in quantiles}}
+
+    return summary
+
+class BookAggregates:
+    """
+    A class to keep mergeable statistics for a run of rows from a csv file
+
+    Every result in a report can be worked out from the aggregates, and the aggregates of two runs of
+    rows merge exactly when the earlier run is merged first, so a file can be split between processes.
+
+    Attributes
+    ----------
+    rows : int
+        The number of rows added.
+    moments : dict
+        RunningMoments for each column in AGGREGATE_COLUMNS.
+    counts : dict
+        A Counter for each column in AGGREGATE_COLUMNS and "years", in the order values first appear.
+    totals : dict
+        The exact int totals of "pages" and "number_of_ratings".
+    correlation : RunningCorrelation
+        The paired moments of pages and average rating.
+    top_rows : dict
+        For each column in AGGREGATE_COLUMNS, the top_k_size rows as (value, -byte offset, title), largest first.
+    added_title_pages : dict
+        Each title and the pages of the first book with that title, among the rows not in saved_titles.
+    saved_titles : tuple
+        The file location of a title log written by save_book_aggregates_state holding the titles of the rows
+        before these ones, and the [title bytes, titles] of each block in it, or None. It is only read when
+        title_and_pages is asked for.
+
+    """
+    def __init__(self, top_k_size=10):
+        self.top_k_size = top_k_size
+        self.rows = 0
+        self.moments = {name: RunningMoments() for name in AGGREGATE_COLUMNS}
+        self.counts = {name: Counter() for name in list(AGGREGATE_COLUMNS) + ["years"]}
+        self.totals = {"pages": 0, "number_of_ratings": 0}
+        self.correlation = RunningCorrelation()
+        self.top_rows = {name: [] for name in AGGREGATE_COLUMNS}
+        self.added_title_pages = {}
+        self.saved_titles = None
+
+    def update(self, columns, titles, offsets):
+        """
+        A function to add a chunk of rows to the aggregates
+
+        Parameters
+        ----------
+        columns : dict
+            The columns for the rows as returned by parse_book_columns.
+        titles : list
+            The title of each row as written in the file.
+        offsets : list
+            The byte offset of each row in the file, used to break ties in top_rows.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.rows += len(offsets)
+        titles = [title.replace("+", ",") for title in titles]
+        for name, column_name in AGGREGATE_COLUMNS.items():
+            #count floats so the results match describe
+            values = columns[column_name].astype(np.float64)
+            self.moments[name].update_array(values)
+            self.counts[name].update(values.tolist())
+            chunk_top_rows = [(value, -offsets[row], titles[row]) for row, value in top_k(values, self.top_k_size)]
+            self.top_rows[name] = heapq.nlargest(self.top_k_size, self.top_rows[name] + chunk_top_rows)
+        self.counts["years"].update(columns["years"].tolist())
+        self.totals["pages"] += get_total_of_records(columns["pages"])
+        self.totals["number_of_ratings"] += get_total_of_records(columns["number_of_ratings"])
+        self.correlation.update_arrays(columns["pages"], columns["average_ratings"])
+        for title, pages in zip(titles, columns["pages"].tolist()):
+            self.added_title_pages.setdefault(title, pages)
+
+    def merge(self, other):
+        """
+        A function to combine the aggregates of the rows that follow these ones in the file
+
+        Parameters
+        ----------
+        other : BookAggregates
+            The aggregates to combine.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.rows += other.rows
+        for name in AGGREGATE_COLUMNS:
+            self.moments[name].merge(other.moments[name])
+            self.top_rows[name] = heapq.nlargest(self.top_k_size, self.top_rows[name] + other.top_rows[name])
+        for name, counts in other.counts.items():
+            self.counts[name].update(counts)
+        for name, total in other.totals.items():
+            self.totals[name] += total
+        self.correlation.merge(other.correlation)
+        for title, pages in other.added_title_pages.items():
+            self.added_title_pages.setdefault(title, pages)
+
+    @property
+    def title_and_pages(self):
+        """
+        Each title and the pages of the first book with that title, as in BookTable.title_page_dict
+
+        The saved title log is read each time this is asked for, so only reports that need the titles pay for it.
+
+        """
+        if self.saved_titles is None:
+            return self.added_title_pages
+
+        titles_filename, title_blocks = self.saved_titles
+        titles = []
+        title_pages = []
+        with open(titles_filename, "rb") as titles_file:
+            for title_bytes, block_titles in title_blocks:
+                block = titles_file.read(title_bytes)
+                if block_titles:
+                    titles += block.decode("utf8").split("\n")
+                    title_pages += np.frombuffer(titles_file.read(8 * block_titles), "<i8").tolist()
+        title_and_pages = dict(zip(titles, title_pages))
+        if len(title_and_pages) < len(titles):
+            #a title seen again by a later run keeps its first place, so give it the pages of its first book by writing them last
+            title_and_pages.update(zip(reversed(titles), reversed(title_pages)))
+        for title, pages in self.added_title_pages.items():
+            title_and_pages.setdefault(title, pages)
+
+        return title_and_pages
+
+    def describe(self, name):
+        """
+        A function to get the same statistics as describe for one column
+
+        Parameters
+        ----------
+        name : string
+            A column in AGGREGATE_COLUMNS.
+
+        Returns
+        -------
+        statistics : dict
+            The count, missing count (zeros), mean, standard deviation, mode, median, minimum and maximum.
+
+        """
+        moments = self.moments[name]
+        counts = self.counts[name]
+
+        return {"count": moments.count,
+                "missing": counts.get(0.0, 0),
+                "mean": moments.mean if moments.count else nan,
+                "standard_deviation": moments.standard_deviation,
+                "mode": get_mode_from_counts(counts),
+                "median": get_median_from_counts(counts),
+                "min": moments.minimum,
+                "max": moments.maximum}
+
+    def to_state(self):
+        """
+        A function to get the aggregates as a dictionary that can be saved with json
+
+        Returns
+        -------
+        state : dict
+            The aggregates, with each Counter as a list of [value, count] pairs so the order values
+            first appear is kept. The titles are left out as save_book_aggregates_state keeps them in a log.
+
+        """
+        return {"top_k_size": self.top_k_size,
+                "rows": self.rows,
+                "moments": {name: vars(moments) for name, moments in self.moments.items()},
+                "counts": {name: list(counts.items()) for name, counts in self.counts.items()},
+                "totals": self.totals,
+                "correlation": {"x_moments": vars(self.correlation.x_moments), "y_moments": vars(self.correlation.y_moments),
+                                "co_moment": self.correlation.co_moment},
+                "top_rows": self.top_rows}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        A function to rebuild aggregates from a dictionary returned by to_state
+
+        Parameters
+        ----------
+        state : dict
+            The saved aggregates.
+
+        Returns
+        -------
+        aggregates : BookAggregates
+            The rebuilt aggregates.
+
+        """
+        aggregates = cls(state["top_k_size"])
+        aggregates.rows = state["rows"]
+        for name, moments in state["moments"].items():
+            vars(aggregates.moments[name]).update(moments)
+        aggregates.counts = {name: Counter(dict(pairs)) for name, pairs in state["counts"].items()}
+        aggregates.totals = dict(state["totals"])
+        vars(aggregates.correlation.x_moments).update(state["correlation"]["x_moments"])
+        vars(aggregates.correlation.y_moments).update(state["correlation"]["y_moments"])
+        aggregates.correlation.co_moment = state["correlation"]["co_moment"]
+        #json turns tuples into lists, and heapq needs every row to be the same type to compare them
+        aggregates.top_rows = {name: [tuple(row) for row in rows] for name, rows in state["top_rows"].items()}
+
+        return aggregates
+
+def split_file_into_ranges(filename, parts, start=None, end=None):
+    """
+    A function to split a csv file into byte ranges that each start at the beginning of a line
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    parts : int
+        The number of ranges to split the rows into.
+    start : int
+        The byte offset of the first row to include, by default the row after the column titles.
+    end : int
+        The byte offset to stop at, by default the end of the file.
+
+    Returns
+    -------
+    ranges : list
+        A list of [start, end] byte offsets covering every row from start to end, in file order.
+
+    """
+    file_size = os.path.getsize(filename) if end is None else end
+    with open(filename, "rb") as books:
+        if start is None:
+            #the first range starts after the column titles
+            books.readline()
+            start = books.tell()
+        boundaries = [min(start, file_size)]
+        for part in range(1, parts):
+            #step back one byte so a guess that lands on the start of a line is kept
+            guess = boundaries[0] + (file_size - boundaries[0]) * part // parts - 1
+            books.seek(max(guess, boundaries[-1]))
+            books.readline()
+            boundaries.append(max(books.tell(), boundaries[-1]))
+        boundaries.append(file_size)
+
+    return [[start, end] for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+def read_book_rows_in_range(filename, start, end):
+    """
+    A generator to read the rows of a csv file that start inside a byte range
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    start : int
+        The byte offset of the first row, which must be the start of a line.
+    end : int
+        The byte offset to stop at.
+
+    Yields
+    ------
+    row : tuple
+        The byte offset of the row and its twelve columns in string format.
+
+    """
+    with open(filename, "rb") as books:
+        books.seek(start)
+        offset = start
+        while offset < end:
+            line = books.readline()
+            if not line:
+                return
+            yield offset, line.decode("utf8").split(",")
+            offset += len(line)
+
+def aggregate_book_range(filename, start, end, chunk_rows=100_000):
+    """
+    A function to work out the aggregates for one byte range of a csv file, run in a worker process
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    start : int
+        The byte offset of the first row.
+    end : int
+        The byte offset to stop at.
+    chunk_rows : int
+        The most rows to hold in memory at once.
+
+    Returns
+    -------
+    aggregates : BookAggregates
+        The aggregates for the rows in the range.
+
+    """
+    aggregates = BookAggregates()
+    rows = read_book_rows_in_range(filename, start, end)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return aggregates
+        offsets = [offset for offset, row in chunk]
+        titles = [row[2] for offset, row in chunk]
+        aggregates.update(parse_book_columns(row for offset, row in chunk), titles, offsets)
+
+def aggregate_books_in_parallel(filename, workers=None, chunk_rows=100_000, start=None, end=None):
+    """
+    A function to read a csv file in a pool of processes and merge what each one finds
+
+    The file is split into one byte range per worker. Each worker returns the BookAggregates for its
+    range and these are merged in file order, giving exactly the same results as reading the file in one go.
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    workers : int
+        The number of processes to use, by default one per core.
+    chunk_rows : int
+        The most rows each worker holds in memory at once.
+    start : int
+        The byte offset of the first row to read, by default the row after the column titles.
+    end : int
+        The byte offset to stop at, by default the end of the file.
+
+    Returns
+    -------
+    aggregates : BookAggregates
+        The aggregates for the rows read.
+
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    ranges = split_file_into_ranges(filename, workers, start, end)
+    starts = [start for start, end in ranges]
+    ends = [end for start, end in ranges]
+
+    aggregates = BookAggregates()
+    if workers == 1 or len(ranges) <= 1:
+        #a single worker reads the file in this process
+        for range_aggregates in map(aggregate_book_range, repeat(filename), starts, ends, repeat(chunk_rows)):
+            aggregates.merge(range_aggregates)
+        return aggregates
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        #map returns the partial aggregates in file order
+        for range_aggregates in pool.map(aggregate_book_range, repeat(filename), starts, ends, repeat(chunk_rows)):
+            aggregates.merge(range_aggregates)
+
+    return aggregates
+
+#the version of the saved aggregates file, changed whenever its layout changes
+AGGREGATE_STATE_VERSION = 3
+
+#the number of bytes read at a time while hashing the rows already read
+AGGREGATE_CHECK_BYTES = 2 ** 20
+
+def get_aggregate_state_filename(filename):
+    """
+    A function to get the location of the saved aggregates kept next to a csv file
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+
+    Returns
+    -------
+    state_filename : string
+        The file location of the saved aggregates.
+
+    """
+    return os.fspath(filename) + ".aggregates"
+
+def get_aggregate_titles_filename(filename):
+    """
+    A function to get the location of the title log kept next to a csv file with the saved aggregates
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+
+    Returns
+    -------
+    titles_filename : string
+        The file location of the title log.
+
+    """
+    return os.fspath(filename) + ".titles"
+
+def save_book_aggregates_state(aggregates, state_filename, titles_filename, offset, prefix_hash, ends_with_new_line):
+    """
+    A function to save the aggregates of the first part of a csv file so later runs only read new rows
+
+    The titles of the rows read by this run are added to the end of a log as a block of titles separated
+    by new lines followed by their pages as int64, so saving costs the same however many titles were saved before.
+
+    Parameters
+    ----------
+    aggregates : BookAggregates
+        The aggregates of every row before offset.
+    state_filename : string
+        The file location to save the aggregates to.
+    titles_filename : string
+        The file location of the title log.
+    offset : int
+        The number of bytes of the csv file that have been read.
+    prefix_hash : string
+        The sha256 hash of those bytes.
+    ends_with_new_line : bool
+        False if the last row read had no new line, so an append would change it.
+
+    Returns
+    -------
+    None.
+
+    """
+    if aggregates.saved_titles is None:
+        #the old aggregates would read the new log as their own, so remove them before it is started again
+        if os.path.exists(state_filename):
+            os.remove(state_filename)
+        title_blocks = []
+    else:
+        title_blocks = list(aggregates.saved_titles[1])
+    titles_length = sum(title_bytes + 8 * block_titles for title_bytes, block_titles in title_blocks)
+    #titles never hold a new line, and one long string loads much faster than a line at a time
+    block = "\n".join(aggregates.added_title_pages).encode("utf8")
+    with open(titles_filename, "r+b" if titles_length else "wb") as titles_file:
+        #leave out anything added by a run that stopped before saving its aggregates
+        titles_file.truncate(titles_length)
+        titles_file.seek(titles_length)
+        titles_file.write(block)
+        titles_file.write(np.array(list(aggregates.added_title_pages.values()), dtype="<i8").tobytes())
+    title_blocks.append([len(block), len(aggregates.added_title_pages)])
+
+    state = {"version": AGGREGATE_STATE_VERSION, "offset": offset, "prefix_hash": prefix_hash,
+             "ends_with_new_line": ends_with_new_line, "title_blocks": title_blocks, "aggregates": aggregates.to_state()}
+    temporary_filename = state_filename + ".tmp"
+    with open(temporary_filename, "w", encoding="utf8") as state_file:
+        #dumps uses the C encoder where dump writes piece by piece in Python
+        state_file.write(json.dumps(state))
+    os.replace(temporary_filename, state_filename)
+
+def read_book_aggregates_state(state_filename, titles_filename):
+    """
+    A function to read the aggregates saved by save_book_aggregates_state
+
+    Parameters
+    ----------
+    state_filename : string
+        The file location of the saved aggregates.
+    titles_filename : string
+        The file location of the title log, which is not read until the titles are needed.
+
+    Returns
+    -------
+    state : dict
+        The saved offset, prefix hash and aggregates, or None if there are none or they are damaged.
+
+    """
+    try:
+        with open(state_filename, encoding="utf8") as state_file:
+            state = json.load(state_file)
+        if state["version"] != AGGREGATE_STATE_VERSION:
+            return None
+        titles_length = sum(title_bytes + 8 * block_titles for title_bytes, block_titles in state["title_blocks"])
+        if os.path.getsize(titles_filename) < titles_length:
+            return None
+        state["aggregates"] = BookAggregates.from_state(state["aggregates"])
+        state["aggregates"].saved_titles = (titles_filename, state["title_blocks"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    return state
+
+def update_hash_from_file(file_hash, file, length):
+    """
+    A function to add the next bytes of an open file to a hash a block at a time
+
+    Parameters
+    ----------
+    file_hash : hashlib hash
+        The hash to update.
+    file : file
+        A file opened in binary mode.
+    length : int
+        The number of bytes to read from the current position.
+
+    Returns
+    -------
+    None.
+
+    """
+    while length > 0:
+        block = file.read(min(length, AGGREGATE_CHECK_BYTES))
+        if not block:
+            return
+        file_hash.update(block)
+        length -= len(block)
+
+@profile_stage
+def load_book_aggregates(filename, workers=1, use_saved=True, chunk_rows=100_000):
+    """
+    A function to get the aggregates of a csv file, only reading the rows added since the last run
+
+    The aggregates are saved next to the csv file with the number of bytes read and a hash of
+    those bytes. If the file still starts with exactly those bytes only the rows after them are
+    read and merged in. If the file has been shortened or any earlier byte has changed the whole
+    file is read again. The hash of the earlier bytes is carried on over the new rows, so the file
+    is hashed in a single pass.
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    workers : int
+        The number of processes to read the new rows with.
+    use_saved : bool
+        False to always read the whole file and leave the saved aggregates alone.
+    chunk_rows : int
+        The most rows each worker holds in memory at once.
+
+    Returns
+    -------
+    aggregates : BookAggregates
+        The aggregates for the whole file.
+
+    """
+    if not use_saved:
+        return aggregate_books_in_parallel(filename, workers, chunk_rows)
+
+    state_filename = get_aggregate_state_filename(filename)
+    titles_filename = get_aggregate_titles_filename(filename)
+    state = read_book_aggregates_state(state_filename, titles_filename)
+    #only read up to the current end so rows appended while this runs are left for the next run
+    file_size = os.path.getsize(filename)
+    #sha256 rather than the blake2b used elsewhere, as most processors hash it in hardware at twice the speed
+    file_hash = hashlib.sha256()
+    start = None
+    aggregates = BookAggregates()
+    with open(filename, "rb") as books:
+        if state is not None and state["offset"] <= file_size and (state["ends_with_new_line"] or state["offset"] == file_size):
+            update_hash_from_file(file_hash, books, state["offset"])
+            if file_hash.hexdigest() == state["prefix_hash"]:
+                start = state["offset"]
+                aggregates = state["aggregates"]
+            else:
+                file_hash = hashlib.sha256()
+                books.seek(0)
+        #carry on hashing to the end of the file for the next run
+        update_hash_from_file(file_hash, books, file_size - books.tell())
+        books.seek(max(file_size - 1, 0))
+        ends_with_new_line = books.read(1) == b"\n"
+
+    if start != file_size:
+        aggregates.merge(aggregate_books_in_parallel(filename, workers, chunk_rows, start, file_size))
+        try:
+            save_book_aggregates_state(aggregates, state_filename, titles_filename, file_size, file_hash.hexdigest(), ends_with_new_line)
+        except OSError:
+            #the saved aggregates only save time so carry on without them, for example in a read-only folder
+            pass
+
+    return aggregates
+
+#the columns books can be grouped by, with their position in a row of the csv file
+GROUP_COLUMNS = {"authors": 4, "categories": 5}
+
+#the statistics the groups can be ranked by
+GROUP_SORT_COLUMNS = ("books", "mean_rating", "total_pages", "total_ratings")
+
+class BookGroups:
+    """
+    A class to keep the statistics of each value of one column, such as all the books by each author
+
+    Each value is given a code the first time it is seen, as the titles are in BookTable, and the
+    statistics are held in numpy arrays indexed by that code. Each chunk of rows is added in one
+    vectorised step and its rating moments are combined with Chan's parallel formula, as in RunningMoments.
+
+    Attributes
+    ----------
+    names : list
+        Each value in the order it first appears. Empty values are grouped as "Unknown".
+    name_codes : dict
+        Each value and its position in names.
+    books : numpy.ndarray
+        The number of books in each group.
+    rated_books : numpy.ndarray
+        The number of books in each group with an average rating.
+    mean_ratings : numpy.ndarray
+        The mean of the average ratings in each group, leaving out books with no rating.
+    sum_of_squared_deviations : numpy.ndarray
+        The sum of squared deviations of the average ratings in each group.
+    total_pages : numpy.ndarray
+        The total pages of the books in each group, counting empty values as zero.
+    total_ratings : numpy.ndarray
+        The total number of ratings of the books in each group, counting empty values as zero.
+
+    """
+    def __init__(self):
+        self.names = []
+        self.name_codes = {}
+        self.books = np.zeros(0, dtype=np.int64)
+        self.rated_books = np.zeros(0, dtype=np.int64)
+        self.mean_ratings = np.zeros(0)
+        self.sum_of_squared_deviations = np.zeros(0)
+        self.total_pages = np.zeros(0, dtype=np.int64)
+        self.total_ratings = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_codes(self, values, split_names):
+        """
+        A function to find the group code of each value, adding new values as they are seen
+
+        Parameters
+        ----------
+        values : list
+            The value of the column for each row.
+        split_names : bool
+            True to split each value on ; and add the row to the group of each name, as for authors.
+
+        Returns
+        -------
+        rows : numpy.ndarray
+            The row of each code, so a row with several names appears once per name.
+        codes : numpy.ndarray
+            The group code for each entry in rows.
+
+        """
+        name_codes = self.name_codes
+        #a new name is given the next code, so the dictionary keeps the names in the order they first appear
+        add_name = name_codes.setdefault
+        if not split_names:
+            #change + back to commas
+            codes = [add_name(value.replace("+", ",").strip() or "Unknown", len(name_codes)) for value in values]
+            rows = np.arange(len(codes), dtype=np.int32)
+        else:
+            rows = []
+            codes = []
+            for row, value in enumerate(values):
+                value = value.replace("+", ",")
+                if ";" not in value:
+                    rows.append(row)
+                    codes.append(add_name(value.strip() or "Unknown", len(name_codes)))
+                    continue
+                #count a name given twice for the same book once
+                for name in dict.fromkeys(name.strip() or "Unknown" for name in value.split(";")):
+                    rows.append(row)
+                    codes.append(add_name(name, len(name_codes)))
+            rows = np.array(rows, dtype=np.int32)
+        self.names.extend(islice(name_codes, len(self.names), None))
+
+        return rows, np.array(codes, dtype=np.int32)
+
+    def update(self, values, columns, split_names=False):
+        """
+        A function to add a chunk of rows to the groups
+
+        Parameters
+        ----------
+        values : list
+            The value of the column to group by for each row.
+        columns : dict
+            The numeric columns of the same rows as returned by parse_book_columns.
+        split_names : bool
+            True to split each value on ; and add the row to the group of each name, as for authors.
+
+        Returns
+        -------
+        None.
+
+        """
+        rows, codes = self.get_codes(values, split_names)
+        size = len(self.names)
+        old_size = len(self.books)
+        if size > old_size:
+            for name in ("books", "rated_books", "mean_ratings", "sum_of_squared_deviations", "total_pages", "total_ratings"):
+                column = getattr(self, name)
+                setattr(self, name, np.concatenate([column, np.zeros(size - old_size, dtype=column.dtype)]))
+
+        #the totals are exact because they stay far below the 2**53 limit of float64 weights
+        self.books += np.bincount(codes, minlength=size)
+        self.total_pages += np.rint(np.bincount(codes, weights=columns["pages"][rows], minlength=size)).astype(np.int64)
+        self.total_ratings += np.rint(np.bincount(codes, weights=columns["number_of_ratings"][rows], minlength=size)).astype(np.int64)
+
+        rated = ~columns["average_ratings_missing"][rows]
+        rated_codes = codes[rated]
+        ratings = columns["average_ratings"][rows[rated]]
+        chunk_count = np.bincount(rated_codes, minlength=size)
+        chunk_mean = np.bincount(rated_codes, weights=ratings, minlength=size) / np.maximum(chunk_count, 1)
+        chunk_sum_of_squared_deviations = np.bincount(rated_codes, weights=np.square(ratings - chunk_mean[rated_codes]), minlength=size)
+
+        #combine the moments of the chunk with the moments so far for every group at once
+        total = self.rated_books + chunk_count
+        delta = chunk_mean - self.mean_ratings
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.where(total > 0, chunk_count / total, 0.0)
+        self.mean_ratings += delta * share
+        self.sum_of_squared_deviations += chunk_sum_of_squared_deviations + delta * delta * self.rated_books * share
+        self.rated_books = total
+
+    @property
+    def rating_standard_deviations(self):
+        """
+        The population standard deviation of the average ratings in each group, nan for groups without a rating
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(self.sum_of_squared_deviations / self.rated_books)
+
+    def describe(self, code):
+        """
+        A function to get the statistics of one group for a report
+
+        Parameters
+        ----------
+        code : int
+            The position of the group in names.
+
+        Returns
+        -------
+        statistics : dict
+            The books, rated_books, mean_rating, rating_standard_deviation, total_pages and total_ratings
+            of the group, with None for the rating statistics if no book has a rating.
+
+        """
+        rated = self.rated_books[code] > 0
+        return {"books": int(self.books[code]),
+                "rated_books": int(self.rated_books[code]),
+                "mean_rating": float(self.mean_ratings[code]) if rated else None,
+                "rating_standard_deviation": float(self.rating_standard_deviations[code]) if rated else None,
+                "total_pages": int(self.total_pages[code]),
+                "total_ratings": int(self.total_ratings[code])}
+
+    def get_top_groups(self, k, sort_by="books", min_books=1):
+        """
+        A function to select the k groups with the highest value of one statistic without sorting every group
+
+        Parameters
+        ----------
+        k : int
+            The number of groups to select.
+        sort_by : string
+            One of GROUP_SORT_COLUMNS.
+        min_books : int
+            The fewest books a group needs to be selected, for example to leave out authors with one book
+            when ranking by mean rating.
+
+        Returns
+        -------
+        top_groups : dict
+            The selected values and their statistics from describe, highest first.
+
+        """
+        if sort_by == "mean_rating":
+            #groups without a rating go after every rated group
+            values = np.where(self.rated_books > 0, self.mean_ratings, -inf)
+        else:
+            values = getattr(self, sort_by)
+        candidates = np.flatnonzero(self.books >= min_books)
+
+        return {self.names[candidates[row]]: self.describe(candidates[row]) for row, value in top_k(values[candidates], k)}
+
+def group_book_rows(rows, columns=tuple(GROUP_COLUMNS), chunk_rows=100_000):
+    """
+    A function to work out the statistics of each author and each category in a single pass over the rows
+
+    Each value is looked up in a dictionary of group codes, so the time taken grows linearly with the
+    number of rows. A book with several authors separated by ; is added to the group of each author.
+
+    Parameters
+    ----------
+    rows : iterable
+        The split columns for each book as produced by read_book_rows.
+    columns : tuple
+        The names of the columns in GROUP_COLUMNS to group by.
+    chunk_rows : int
+        The most rows to hold in memory at once.
+
+    Returns
+    -------
+    groups : dict
+        The BookGroups for each column.
+
+    """
+    groups = {column: BookGroups() for column in columns}
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return groups
+        numbers = parse_book_columns(chunk)
+        for column in columns:
+            position = GROUP_COLUMNS[column]
+            groups[column].update([row[position] for row in chunk], numbers, split_names=column == "authors")
+
+@profile_stage
+def group_books(filename, columns=tuple(GROUP_COLUMNS), chunk_rows=100_000):
+    """
+    A function to work out the statistics of each author and each category in a csv file
+
+    Parameters
+    ----------
+    filename : string
+        A file location containing book information.
+    columns : tuple
+        The names of the columns in GROUP_COLUMNS to group by.
+    chunk_rows : int
+        The most rows to hold in memory at once.
+
+    Returns
+    -------
+    groups : dict
+        The BookGroups for each column as returned by group_book_rows.
+
+    """
+    return group_book_rows(read_book_rows(filename), columns, chunk_rows)
+
+def main_menu():
+    """
+    A function for printing out the Main Menu of the program
+
+    Returns
+    -------
+    None.
+
+    """
+    print()
+    print("Menu Options:")
+    print("-------------")
+    print("Enter \"A\" for analysis\nEnter \"H\" for help\nEnter \"Q\" to quit")
+
+def main_menu_error():
+    """
+    A function for displaying error messages if a user enters an invalid entry on the Main Menu
+
+    Returns
+    -------
+    None.
+
+    """
+    print()
+    print("ERROR: Invalid selection. Please enter one of the following options only:")
+    print()
+    print("\"A\" - for analysis of book data")
+    print("\"H\" - for help and information")
+    print("\"Q\" - to quit")
+    
+def quit_message():
+    """
+    A function for displaying a message to the user when they decide to quit the application
+
+    Returns
+    -------
+    None.
+
     """
-    A function that takes determines the book with the fewest pages in the list excluding those with zero
+    print()
+    print("Closing application, goodbye!")
+
+def help_section_info():
+    """
+    A function to display information if the user selects the Help option on the Main Menu
+
+    Returns
+    -------
+    None.
+
+    """
+    print()
+    print("***HELP SECTION***")
+    print("==================")
+    print("This program analyses a file containing almost 7000 books taken from the following dataset on kaggle:")
+    print()
+    print("https://www.kaggle.com/dylanjcastillo/7k-books-with-metadata")
+    print()
+    print("If you enter \"A\" on the main menu, a list of analysis options will be displayed.")
+    print()
+    print("These options include the following:")
+    print()
+    print("1. Book Information")
+    print("   - Details of the number of books and pages on file")
+    print("   - Details of the number of book reviews in the file")
+    print("   - Details of the averge ratings for books in the file")
+    print("   - Details of the years books in the file were published")
+    print()
+    print("2. Statistical Analysis")
+    print("   - The mean, mode, median and standard deviation of book page numbers")
+    print("   - The mean, mode, median and standard deviation of average reviews")
+    print("   - The mean, mode, median and standard deviation of number of reviews")
+    print("   - Correlation information for page numbers and average rating")
+    print()
+    print("3. Additional Analysis")
+    print("   - Title information on the longest book")
+    print("   - Title information on the shortest book")
+    print("   - List of books with the same number of pages as the mean")
+    print("   - List of top ten longest books on file")
+    print()
+    print("4. Visualizations") 
+    print("   - Various visualizations showing results of analysis")
+    print("   - Output includes bar charts, pie charts and scatter plots")
+    print()
+    print("5. Save to File")
+    print("   - The option to save output to a text file")
+    print()
+    print("6. Search by Title")
+    print("   - The page number, year and ratings of books with a title")
+    print("   - Titles starting with the text entered if no title matches exactly")
+    print()
+
+def analysis_menu():
+    """
+    A function to display the Analysis Menu options
+
+    Returns
+    -------
+    None.
+
+    """
+    print()
+    print("Menu Options:")
+    print("-------------")
+    print("Enter \"B\" for book page information\nEnter \"S\" for statistical analysis\nEnter \"A\" for additional analysis\nEnter \"V\" for visualizations\nEnter \"F\" to save results to a file\nEnter \"T\" to search by title\nEnter \"M\" to return to main menu")
+
+def analysis_error_menu():
+    """
+    A function to display the options on the Analysis Menu
+
+    Returns
+    -------
+    None.
+
+    """
+    print("ERROR: Invalid selection. Please enter one of the following options only:")
+    print()
+    print("\"B\" - for book information")
+    print("\"S\" - for statistical analysis")
+    print("\"A\" - for additional analysis")
+    print("\"V\" - for visualizations")
+    print("\"F\" - to save results to a file")
+    print("\"T\" - to search by title")
+    print("\"M\" - to return to the main menu")
+    print()
+    
+def book_information_menu(list_of_book_pages, list_of_number_of_ratings, list_of_years):
+    """
+    A function to display the output of the Book information option on the Analysis Menu
 
     Parameters
     ----------
-    list_of_books_and_pages : dict
-        A dictionary with book title and number of pages in a key value pair.
+    list_of_book_pages : list
+        A list of page numbers per book
+    list_of_number_of_ratings : list
+        A list of the number of ratings per book
+    list_of_years : list
+        A list of the number of the published year for each book
 
     Returns
     -------
-    title_with_fewest_pages: int
-         The title of the book with the most pages
+    None.
 
     """
-    #set the fewest pages
-    fewest_pages = 9999
-    #convert the valeus in the dictionary to int
-    converted_dict = convert_dictionary_values_to_int_from_string(list_of_books_and_pages)
-    
-    #loop through the converted dictionary for the lowest value that is not zero
-    for item in converted_dict:
-        if converted_dict[item] < fewest_pages and converted_dict[item] > 0:
-            fewest_pages = converted_dict[item]
-    
-    #get the associated key for the lowest value
-    for key, value in converted_dict.items():
-        if value == fewest_pages:
-            title_with_fewest_pages = key
+    print_book_information(build_book_section(list_of_book_pages, list_of_number_of_ratings, list_of_years))
+
+def print_book_information(book_information):
+    """
+    A function to display book information that has already been worked out by build_book_section
+
+    Parameters
+    ----------
+    book_information : dict
+        The results returned by build_book_section.
+
+    Returns
+    -------
+    None.
+
+    """
+    print("Book Information:")
+    print("-----------------")
+    print()
+    print("Books and Pages:")
+    print("1. Total number of books in list:", book_information["total_books"])
+    print("2. Total pages in all books combined:", book_information["total_pages"])
+    print()
+    print("Page Numbers:")
+    print("1. Most pages in a book:", book_information["most_pages"], "pages")
+    print("2. Fewest pages in a book:", book_information["fewest_pages"], "pages")
+    print("3. Number of books in file with no page count:", book_information["books_with_no_page_count"])
+    print()
+    print("Published Year:")
+    print("1. Number of unique years a book was published:", book_information["unique_published_years"])
+    print("2. The most recent year a book was published:", book_information["most_recent_year"])
+    print("3. The oldest year a book was published:", book_information["oldest_year"])
+    print()
+    print("Number of Ratings:")
+    print("1. Total number of book reviews:", book_information["total_reviews"])
+    print("2. Number of books on file with no reviews:", book_information["books_with_no_reviews"])
     
-    return title_with_fewest_pages.title()
+def search_by_title_menu(session):
+    """
+    A function to ask for a title and display the books with that title, or titles that start with it
+
+    Parameters
+    ----------
+    session : AnalysisSession
+        The books being analysed.
+
+    Returns
+    -------
+    None.
+
+    """
+    title = input("Enter a book title or the start of a title: ")
+    print()
+    book_table = session.book_table
+    rows = session.title_index.find(title)
+    if rows:
+        print("Books with that title:")
+        print(f"    {'Pages':>5}{'Year':>9}{'Rating':>8}{'Ratings':>9}   Title")
+        for row in rows:
+            year = book_table.years[row] or "Unknown"
+            print(f"   - {book_table.pages[row]:>4}{year:>9}{book_table.average_ratings[row]:>8.2f}"
+                  f"{book_table.number_of_ratings[row]:>9}   {book_table.get_title(row)}")
+        return
+
+    matching_titles = session.title_index.complete(title)
+    if matching_titles:
+        print("No book has that exact title. Titles starting with", repr(title.strip()) + ":")
+        for matching_title in matching_titles:
+            print("   - ", matching_title)
+    else:
+        print("No books found with a title starting with", repr(title.strip()))
+
+def visualizations_message():
+    """
+    A function to display a message to the user when the analysis is running
+
+    Returns
+    -------
+    None.
+
+    """
+    print("Visualizations:")
+    print("---------------")
+    print()
+    print("***LOADING VISUALIZATIONS...***")
+    print("- If using Spyder, please check the Plots section to view the visualizations")
+    print("- The visualizations are also saved as .png files in the current folder")
+
+def statistical_analysis_info(book_statistics):
+    """
+    A function to display the output of the Statistical Analysis option on the Analysis menu
+
+    Parameters
+    ----------
+    book_statistics : dict
+        The statistics for the books as returned by describe_books.
+
+    Returns
+    -------
+    None.
+
+    """
+    pages = book_statistics["pages"]
+    average_rating = book_statistics["average_rating"]
+    number_of_ratings = book_statistics["number_of_ratings"]
+    print("Mean, Mode, Median & Standard Deviation:")
+    print("----------------------------------------")
+    print()
+    print("Statistics for Page Numbers per Book:")
+    print("1.1. Mean number of pages per book:", int(round(pages["mean"], 0)))
+    print("1.2. Standard deviation of book pages:", int(pages["standard_deviation"]))
+    print("1.3. Mode of book pages:", int(pages["mode"]))
+    print("1.4. Median number of book pages:", int(pages["median"]))
+    print()
+    print("Statistics for Average Rating out of 5 per Book:")
+    print("2.1. Mean average rating for all books:", round(average_rating["mean"], 2))
+    print("2.2. Standard deviation of average ratings:", round(average_rating["standard_deviation"], 2))
+    print("2.3. Mode of average ratings:", average_rating["mode"])
+    print("2.4. Median average rating:", round(average_rating["median"], 2))
+    print()
+    print("Statistics for Number of Ratings per Book:") 
+    print("3.1. Mean number of ratings per book:", int(number_of_ratings["mean"]))
+    print("3.2. Standard deviation of ratings per book:", int(number_of_ratings["standard_deviation"]))
+    print("3.3. Mode of ratings per book:", int(number_of_ratings["mode"]))
+    print("3.4. Median number ratings per book:", int(number_of_ratings["median"]))
+    print()
+    print("Correlation between Number of Pages and Average Rating:")
+    print("4.1 Correlation between number of pages and average rating:", round(book_statistics["correlation"], 2))
+    print("    - This suggests " + describe_correlation(book_statistics["correlation"]))
+
+@profile_stage
+def write_results_file(book_statistics, filename="7kBooks_Results.txt"):
+    """
+    A function to save the statistical analysis results to a text file
+
+    Parameters
+    ----------
+    book_statistics : dict
+        The statistics for the books as returned by describe_books.
+    filename : string
+        The file location to save the results to.
+
+    Returns
+    -------
+    None.
+
+    """
+    write_text_file(filename, format_report({"stats": book_statistics}, "results"))
+
+def write_text_file(filename, text):
+    """
+    A function to write text to a file in a single write, so the file is never left half-written
+
+    The text is written to a temporary file next to the file, which then replaces it.
+
+    Parameters
+    ----------
+    filename : string
+        The file location to write to.
+    text : string
+        The text to write.
+
+    Returns
+    -------
+    None.
+
+    """
+    temporary_filename = filename + ".tmp"
+    try:
+        with open(temporary_filename, "w", encoding="utf8") as text_file:
+            text_file.write(text)
+        os.replace(temporary_filename, filename)
+    except BaseException:
+        #leave nothing behind if the write or the rename failed
+        if os.path.exists(temporary_filename):
+            os.remove(temporary_filename)
+        raise
+
+def additional_analysis_info(list_of_book_pages, list_of_average_ratings, title_and_pages):
+    print_additional_analysis(build_additional_section(title_and_pages, calculate_mean(list_of_book_pages)))
+
+def print_additional_analysis(additional_analysis):
+    """
+    A function to display additional analysis that has already been worked out by build_additional_section
+
+    Parameters
+    ----------
+    additional_analysis : dict
+        The results returned by build_additional_section.
+
+    Returns
+    -------
+    None.
+
+    """
+    print("Additional Analysis:")
+    print("--------------------")
+    print("1. Book with most pages:")
+    print("   - ", additional_analysis["book_with_most_pages"])
+    print()
+    print("2. Book with fewest pages:")
+    print("   - ", additional_analysis["book_with_fewest_pages"])
+    print()
+    print("3. Titles with the same number of pages as the mean:")
+    print(f"    {' Pages':>5}{'Title':>10}")
+    for pages, title in additional_analysis["titles_with_mean_pages"]:
+        print("   - ", pages, "   ", title)
+    print()
+    print("4. Top 10 longest books:")
+    print(f"    {' Pages':>5}{'Title':>10}")
+    #loop through the top ten longest books and print out the title and number of pages
+    for pages, title in additional_analysis["top_ten_longest_books"]:
+        print("   - ", pages, "   ", title)
     
-def get_book_with_most_pages(list_of_books_and_pages):
+#the sections that can be included in a batch report
+REPORT_SECTIONS = ("book", "stats", "additional", "correlation")
+
+#the sections included when none are chosen, leaving out those that need every column of every book
+DEFAULT_REPORT_SECTIONS = ("book", "stats", "additional")
+
+@profile_stage
+def build_report(book_table, sections=DEFAULT_REPORT_SECTIONS):
+    """
+    A function to work out the results for each requested section of a batch report
+
+    The title dictionary and the statistics are calculated once and shared by every section that needs them.
+
+    Parameters
+    ----------
+    book_table : BookTable
+        The books to report on.
+    sections : iterable
+        The names of the sections to include from REPORT_SECTIONS.
+
+    Returns
+    -------
+    report : dict
+        A dictionary of section names and dictionaries of results.
+
     """
-    A function that takes determines the book with the most pages in the list
+    report = {}
+    book_statistics = None
+    title_and_pages = None
+    if "stats" in sections or "additional" in sections:
+        book_statistics = describe_books(book_table.pages, book_table.average_ratings, book_table.number_of_ratings)
+    if "additional" in sections:
+        title_and_pages = book_table.title_page_dict()
+
+    if "book" in sections:
+        report["book"] = build_book_section(book_table.pages, book_table.number_of_ratings, book_table.years)
+    if "stats" in sections:
+        report["stats"] = book_statistics
+    if "additional" in sections:
+        report["additional"] = build_additional_section(title_and_pages, book_statistics["pages"]["mean"])
+    if "correlation" in sections:
+        report["correlation"] = build_correlation_section(book_table)
+
+    return report
+
+def build_book_section(list_of_book_pages, list_of_number_of_ratings, list_of_years):
+    """
+    A function to work out the results shown by the Book information option and the book section of a batch report
 
     Parameters
     ----------
-    list_of_books_and_pages : dict
-        A dictionary with book title and number of pages in a key value pair.
+    list_of_book_pages : list
+        A list of page numbers per book.
+    list_of_number_of_ratings : list
+        A list of the number of ratings per book.
+    list_of_years : list
+        A list of the published year for each book.
 
     Returns
     -------
-    title_with_most_pages: string
-        The title of the book with the most pages
+    book : dict
+        The totals, largest and smallest values and missing counts for the pages, years and ratings.
 
     """
-    #convert string values in the dictionary to ints to allow for calculations
-    converted_dict = convert_dictionary_values_to_int_from_string(list_of_books_and_pages)
-    
-    title_with_most_pages = max(converted_dict, key=converted_dict.get) 
-    
-    return title_with_most_pages
+    return {"total_books": get_total_number_of_records_in_list(list_of_book_pages),
+            "total_pages": get_total_of_records(list_of_book_pages),
+            "most_pages": get_max_value(list_of_book_pages) if len(list_of_book_pages) else 0,
+            "fewest_pages": get_fewest_pages_excluding_zero(list_of_book_pages),
+            "books_with_no_page_count": get_number_of_items_with_missing_information(list_of_book_pages),
+            "unique_published_years": len(get_frequency_table(list_of_years)),
+            "most_recent_year": get_most_recent_year(list_of_years),
+            "oldest_year": get_oldest_year(list_of_years),
+            "total_reviews": get_total_of_records(list_of_number_of_ratings),
+            "books_with_no_reviews": get_number_of_items_with_missing_information(list_of_number_of_ratings)}
 
-def convert_dictionary_values_to_int_from_string(dictionary_of_records):
+def build_additional_section(title_and_pages, mean_pages, page_index=None):
     """
-    A function to convert string values to ints in a dictionary of key value pairs
+    A function to work out the results for the additional section of a batch report
 
     Parameters
     ----------
-    dictionary_of_records : dict
-        A dictionary of key value pairs in string format.
+    title_and_pages : dict
+        A dictionary of titles and page numbers in key value pairs.
+    mean_pages : float
+        The mean number of pages per book.
+    page_index : PageIndex
+        An index of title_and_pages to find the titles with the mean number of pages in, if one has been built.
 
     Returns
     -------
-    dictionary_of_records : dict
-        A dictionary of key value pairs in string - int format.
+    additional : dict
+        The books with the most and fewest pages, the titles with the mean number of pages and the top ten longest books.
 
     """
-    #convert string values for pages to int in dictionary
-    for item in dictionary_of_records:
-        #if the string in empty change it to zero
-        if dictionary_of_records[item] == '':
-            dictionary_of_records[item] = 0
-        else:
-            #if the string is not empty convert it to an int
-            dictionary_of_records[item] = int(dictionary_of_records[item])
-            
-    return dictionary_of_records
+    #there is no longest or shortest book in a file with no books
+    return {"book_with_most_pages": get_book_with_most_pages(title_and_pages) if title_and_pages else None,
+            "book_with_fewest_pages": get_book_with_fewest_pages(title_and_pages),
+            "titles_with_mean_pages": get_titles_with_same_number_pages_as_mean(None, title_and_pages, mean_pages, page_index) if title_and_pages else [],
+            "top_ten_longest_books": [[pages, title] for title, pages in get_top_ten_longest_books(title_and_pages).items()]}
 
-def get_number_of_items_with_missing_information(list_of_records): 
+def build_correlation_section(book_table):
     """
-    A function to get the number of items in a column with missing information
-    
+    A function to work out the correlation between each pair of pages, average rating, number of ratings and year
+
+    Unlike the other sections empty values are left out rather than counted as zero, one pair at a time.
+
     Parameters
     ----------
-    list_of_records : list
-        A list of items from one column in the csv file.
+    book_table : BookTable
+        The books to report on.
 
     Returns
     -------
-    counter : int
-        The number of records in the list with no value.
+    correlation : dict
+        For each of CORRELATION_METHODS, a dictionary of each column in CORRELATION_COLUMNS and its correlation
+        with every column, with None where it cannot be worked out.
 
     """
-    counter = 0
-    #count the number of items that have 0 value
-    for record in list_of_records:
-        if record == 0:
-            counter += 1
-            
-    return counter
+    names = list(CORRELATION_COLUMNS)
+    columns = [getattr(book_table, column) for column in CORRELATION_COLUMNS.values()]
+    missing_masks = [getattr(book_table, column + "_missing") for column in CORRELATION_COLUMNS.values()]
 
-def convert_blank_to_zero(list_with_empty_values):
+    correlation = {}
+    for method in CORRELATION_METHODS:
+        correlation_matrix = calculate_correlation_matrix(columns, missing_masks, method).tolist()
+        correlation[method] = {name: {other_name: None if isnan(value) else value for other_name, value in zip(names, row)}
+                               for name, row in zip(names, correlation_matrix)}
+
+    return correlation
+
+@profile_stage
+def build_report_from_aggregates(aggregates, sections=DEFAULT_REPORT_SECTIONS):
     """
-    A function for pre-processing data to change and empty values to zero
-    
+    A function to work out the same report as build_report from the aggregates of a whole file
+
     Parameters
     ----------
-    list_with_empty_values : list
-        A list with some empty values
+    aggregates : BookAggregates
+        The aggregates for the books to report on.
+    sections : iterable
+        The names of the sections to include from REPORT_SECTIONS, apart from correlation which needs build_report.
 
     Returns
     -------
-    None.
+    report : dict
+        A dictionary of section names and dictionaries of results.
 
     """
-    #convert items with no value to 0
-    for i in range(len(list_with_empty_values)):
-        if list_with_empty_values[i] == '':
-            list_with_empty_values[i] = "0"
+    report = {}
+    page_counts = aggregates.counts["pages"]
+    known_years = [year for year in aggregates.counts["years"] if year != 0]
 
-def convert_list_of_strings_to_floats(list_of_strings):
+    if "book" in sections:
+        report["book"] = {"total_books": aggregates.rows,
+                          "total_pages": aggregates.totals["pages"],
+                          "most_pages": int(aggregates.moments["pages"].maximum) if aggregates.rows else 0,
+                          "fewest_pages": int(min([pages for pages in page_counts if pages != 0] + [9999])),
+                          "books_with_no_page_count": page_counts.get(0.0, 0),
+                          "unique_published_years": len(aggregates.counts["years"]),
+                          "most_recent_year": max(known_years + [1]),
+                          "oldest_year": min(known_years) if known_years else "Unknown",
+                          "total_reviews": aggregates.totals["number_of_ratings"],
+                          "books_with_no_reviews": aggregates.counts["number_of_ratings"].get(0.0, 0)}
+    if "stats" in sections:
+        report["stats"] = {name: aggregates.describe(name) for name in AGGREGATE_COLUMNS}
+        report["stats"]["correlation"] = aggregates.correlation.correlation
+    if "additional" in sections:
+        report["additional"] = build_additional_section(aggregates.title_and_pages, aggregates.moments["pages"].mean)
+
+    return report
+
+def flatten_report(report):
     """
-    A function for pre-processing data to convert the items in the list from string to float
-    
+    A function to turn a report into rows of section, name and value for the csv and text formats
+
     Parameters
     ----------
-    list_of_strings : list
-        A list of numbers in string format
+    report : dict
+        A report as returned by build_report.
 
     Returns
     -------
-    list_of_floats: list
-        A list of the numbers in the original list converted to floats
+    rows : list
+        A list of [section, name, value] rows where nested results have dotted names.
 
     """
-    list_of_floats = [float(x) for x in list_of_strings]
-    
-    return list_of_floats
-    
-def count_of_unique_items_in_list(list_of_items):
+    rows = []
+    def add_rows(section, name, value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                add_rows(section, f"{name}.{key}" if name else key, item)
+        elif isinstance(value, list) and value and isinstance(value[0], list):
+            for position, item in enumerate(value, start=1):
+                add_rows(section, f"{name}.{position}", item)
+        else:
+            rows.append([section, name, value])
+
+    for section, results in report.items():
+        add_rows(section, "", results)
+
+    return rows
+
+#the heading, name and number of decimal places of each column in the results file, with None for whole numbers
+RESULTS_FILE_COLUMNS = (("pages", "Book Page Number Statistics:", "book pages", None),
+                        ("average_rating", "Book Average Rating Statistics:", "average rating", 2),
+                        ("number_of_ratings", "Book Number of Ratings Statistics:", "number of ratings", None))
+
+#the label and name of each statistic in the results file
+RESULTS_FILE_STATISTICS = (("Mean", "mean"), ("Mode", "mode"), ("Median", "median"), ("Standard Deviation", "standard_deviation"))
+
+def convert_non_finite_to_none(value):
     """
-    A function for counting the number times each item appears in the list
-    
+    A function to replace each nan or infinite number in a report with None, as JSON has no way to write them
+
     Parameters
     ----------
-    list_of_items : list
-        A list of items.
+    value : object
+        A report, or a section, result or number in one.
 
     Returns
     -------
-    count_list : list
-        A list of the count of each number of items in the original list.
+    value : object
+        The value with the same nesting and None in place of each number that is not finite.
 
     """
-    count_list = []
-    
-    for item in list_of_items:
-        count = list_of_items.count(item)
-        #add count of items to new list with number of times it occurs in the list
-        if [item, count] not in count_list:
-            count_list.append([item, count])
-        else:
-            continue
-        
-    return count_list
-    
-def display_published_years(years):
+    if isinstance(value, float):
+        return value if isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: convert_non_finite_to_none(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [convert_non_finite_to_none(item) for item in value]
+
+    return value
+
+def write_json_report(report):
     """
-    A function to display visualizations for published years
-    
+    A function to write a report as JSON, with null for any statistic that could not be worked out
+
     Parameters
     ----------
-    years : list
-        a list of published years.
+    report : dict
+        A report as returned by build_report.
 
     Returns
     -------
-    None.
-    
+    report_text : string
+        The formatted report.
 
     """
-    #get the count of each unique year in the list
-    count_of_years = count_of_unique_items_in_list(years)
-    
-    #sort the list of years and counts
-    sorted_list = sorted(count_of_years, key=lambda x: x[1], reverse=True)
-    #convert to a dictionary with only the first 10 items from the sorted
-    year_dict = dict(sorted_list[:10])
-    
-    #sort the dictionary as well to make sure it is correct
-    sorted_year_dict = {}
-    sorted_keys = sorted(year_dict, key=year_dict.get, reverse=True)
-    
-    #put the sorted items into a dictionary for use in the plot
-    for item in sorted_keys:
-        sorted_year_dict[item] = year_dict[item]
-    
-    #as a pie chart
-    fig, ax = plt.subplots()
-    ax.set_title("Top Ten Years for Published Books")
-    ax.pie(sorted_year_dict.values(), labels=sorted_year_dict.keys(), autopct="%.0f%%")
-    plt.show()
-    
-    #save the chart as a png file
-    fig.savefig("top_ten_published_years.png", bbox_inches="tight")
+    #allow_nan=False makes any number convert_non_finite_to_none missed an error rather than invalid JSON
+    return json.dumps(convert_non_finite_to_none(report), indent=2, allow_nan=False) + "\n"
 
-def display_visual_page_number_statistics(list_of_page_info):
+def write_csv_report(report):
     """
-    A function to visually display the results of the statistical analysis of the page number variable in a bar chart
+    A function to write a report as CSV rows of section, name and value
 
     Parameters
     ----------
-    list_of_page_info : list
-        A list of page numbers.
+    report : dict
+        A report as returned by build_report.
 
     Returns
     -------
-    None.
+    report_text : string
+        The formatted report.
 
     """
-    #get the statistical results for page numbers
-    pages_mean = calculate_mean(list_of_page_info)
-    pages_sd = calculate_standard_deviation(list_of_page_info)
-    pages_mode = calculate_mode(list_of_page_info)
-    pages_median = calculate_median(list_of_page_info)
-    
-    #create a dictionary of statistical results
-    pages_data = {'Mean':pages_mean,
-                  'Standard Deviation':pages_sd,
-                  'Mode':pages_mode,
-                  'Median':pages_median}
-    
-    fig, ax = plt.subplots()
-    
-    #plot page number analysis
-    ax.set_title("Page Number Analysis")
-    
-    y_pos = [i for i in range(len(pages_data))]
-    
-    ax.set_yticks(y_pos)
-    ax.set_yticklabels(pages_data.keys())
-    
-    ax.set_ylabel("Type of Analysis")
-    ax.set_xlabel("Number of pages")
-
-    ax.barh(y_pos, pages_data.values(), align="center")
-    
-    plt.show() 
-    
-    fig.savefig("page_number_statistics.png", bbox_inches="tight")
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(["section", "name", "value"])
+    for section, name, value in flatten_report(report):
+        writer.writerow([section, name, json.dumps(value) if isinstance(value, list) else value])
+    return output.getvalue()
 
-def display_visual_number_of_ratings_statistics(list_of_number_ratings):
+def write_text_report(report):
     """
-    A function to visually display the statistical analysis results for the number of ratings variable in a bar chart
+    A function to write a report as a line of text for each result
 
     Parameters
     ----------
-    list_of_number_ratings : list
-        A list of the number of ratings for each book.
+    report : dict
+        A report as returned by build_report.
 
     Returns
     -------
-    None.
+    report_text : string
+        The formatted report.
 
     """
-    #get the statistical results for number of ratings
-    number_ratings_mean = calculate_mean(list_of_number_ratings)
-    number_ratings_sd = calculate_standard_deviation(list_of_number_ratings)
-    number_ratings_mode = calculate_mode(list_of_number_ratings)
-    number_ratings_median = calculate_median(list_of_number_ratings)
-    
-    #create a dictionary of statistical results
-    number_ratings_data = {'Mean':number_ratings_mean,
-                  'Standard Deviation':number_ratings_sd,
-                  'Mode':number_ratings_mode,
-                  'Median':number_ratings_median}
-    
-    fig, ax = plt.subplots()
-    
-    #plot number of ratings analysis
-    ax.set_title("Number of Ratings Analysis")
-    
-    y_pos = [i for i in range(len(number_ratings_data))]
-    
-    ax.set_yticks(y_pos)
-    ax.set_yticklabels(number_ratings_data.keys())
-    
-    ax.set_ylabel("Analysis")
-    ax.set_xlabel("Result")
-    
-    ax.barh(y_pos, number_ratings_data.values(), align="center")
-    
-    plt.show() 
-    
-    fig.savefig("number_of_reviews_statistics.png", bbox_inches="tight")
-    
-def display_visual_average_rating_statistics(list_of_ratings_info):
+    return "".join(f"{section}.{name}: {value}\n" for section, name, value in flatten_report(report))
+
+def write_markdown_report(report):
     """
-    A function to visually display the statistical analysis results for the average ratings variable in a bar chart
+    A function to write a report as Markdown, with a heading and a table of names and values for each section
 
     Parameters
     ----------
-    list_of_ratings_info : list
-        A list of average ratings.
+    report : dict
+        A report as returned by build_report.
 
     Returns
     -------
-    None.
+    report_text : string
+        The formatted report.
 
     """
-    #get the statistical results for average ratings
-    av_ratings_mean = calculate_mean(list_of_ratings_info)
-    av_ratings_sd = calculate_standard_deviation(list_of_ratings_info)
-    av_ratings_mode = calculate_mode(list_of_ratings_info)
-    av_ratings_median = calculate_median(list_of_ratings_info)
-    
-    #create a dictionary of statistical results
-    av_ratings_data = {'Mean':av_ratings_mean,
-                  'Standard Deviation':av_ratings_sd,
-                  'Mode':av_ratings_mode,
-                  'Median':av_ratings_median}
-    
-    fig, ax = plt.subplots()
-    
-    #plot average rating analysis
-    ax.set_title("Average Rating Analysis")
-    
-    y_pos = [i for i in range(len(av_ratings_data))]
-    
-    ax.set_yticks(y_pos)
-    ax.set_yticklabels(av_ratings_data.keys())
-    
-    ax.set_ylabel("Type of Analysis")
-    ax.set_xlabel("Average Rating")
-    
-    ax.barh(y_pos, av_ratings_data.values(), align="center")
-    
-    plt.show()  
-    
-    #save the file as a png
-    fig.savefig("average_rating_statistics.png", bbox_inches="tight")
-    
-def display_scatter_plot(list_of_page_numbers, list_of_average_ratings):
+    lines = []
+    section_rows = {}
+    for section, name, value in flatten_report(report):
+        section_rows.setdefault(section, []).append((name, value))
+
+    for section, rows in section_rows.items():
+        if lines:
+            lines.append("")
+        lines += [f"## {section}", "", "| Name | Value |", "| --- | --- |"]
+        for name, value in rows:
+            value = json.dumps(value) if isinstance(value, list) else str(value)
+            #a bar would end the table cell and a new line would end the table
+            value = value.replace("|", "\\|").replace("\n", " ")
+            lines.append(f"| {name} | {value} |")
+
+    return "\n".join(lines) + "\n"
+
+def write_results_report(report):
     """
-    A function to visually display the average rating v number of pages in a scatter chart
+    A function to write the stats section of a report in the layout of the 7kBooks_Results.txt file
 
     Parameters
     ----------
-    list_of_page_numbers : list
-        A list of page numbers per book.
-    list_of_average_ratings : list
-        A list of average ratings per book.
+    report : dict
+        A report as returned by build_report, which must include the stats section.
 
     Returns
     -------
-    None.
+    report_text : string
+        The formatted report.
 
     """
-    fig, ax = plt.subplots()
-    
-    ax.set_xlabel("Number of Pages in Book")
-    ax.set_ylabel("Average Rating of Book")
-    
-    ax.set_title("Average Rating & Number of Pages")
-    
-    #create the scatter using the page number and average rating lists
-    ax.scatter(list_of_page_numbers, list_of_average_ratings, marker=".")
-    
-    plt.show()
-    
-    #save the file as a png
-    fig.savefig("page_number_v_average_rating.png", bbox_inches="tight")
-    
-def display_top_ten_longest_books(dict_of_title_and_pages):
+    book_statistics = report["stats"]
+    lines = ["          Statistical Analysis Results", "=" * 48, ""]
+    for position, (column, heading, name, decimals) in enumerate(RESULTS_FILE_COLUMNS):
+        if position > 0:
+            lines.append("")
+        lines += [heading, "=" * len(heading)]
+        for label, statistic in RESULTS_FILE_STATISTICS:
+            value = book_statistics[column][statistic]
+            lines.append(f"{label} of {name}: " + str(int(value) if decimals is None else round(value, decimals)))
+        lines.append("-" * 48)
+    lines += ["The original source file can be found here:", "", "https://www.kaggle.com/dylanjcastillo/7k-books-with-metadata"]
+
+    return "\n".join(lines)
+
+#the function that writes each format a report can be written in
+REPORT_WRITERS = {"json": write_json_report, "csv": write_csv_report, "text": write_text_report,
+                  "markdown": write_markdown_report, "results": write_results_report}
+
+#the formats any report can be written in, leaving out the results layout which only has room for the stats section
+REPORT_FORMATS = ("json", "csv", "text", "markdown")
+
+@profile_stage
+def format_report(report, report_format):
     """
-    A function to visually display the top ten longest tiles and their number of pages
+    A function to write a report in one of the formats in REPORT_WRITERS
+
+    The whole report is formatted as one string, so it can be saved with a single write.
 
     Parameters
     ----------
-    dict_of_title_and_pages : dict
-        A dictionary of titles and page numbers in key value pair.
+    report : dict
+        A report as returned by build_report.
+    report_format : string
+        One of REPORT_WRITERS.
 
     Returns
     -------
-    None.
+    report_text : string
+        The formatted report.
 
     """
-    #convert strings to ints in the dictionary
-    dict_with_ints = convert_dictionary_values_to_int_from_string(dict_of_title_and_pages)
-    #get the top ten longest books in the dictionary
-    top_ten = get_top_ten_longest_books(dict_with_ints)
-    
-    fig, ax = plt.subplots()
-    
-    #plot average rating analysis
-    ax.set_title("Top Ten Longest Books")
-    
-    y_pos = [i for i in range(len(top_ten))]
-    
-    ax.set_yticks(y_pos)
-    #set limit on size of text due to long book titles
-    ax.set_yticklabels(top_ten.keys(), size=7)
-    
-    ax.set_ylabel("Book Title")
-    ax.set_xlabel("Number of Pages")
-    
-    #create the bar chart
-    ax.barh(y_pos, top_ten.values(), align="center")
-    
-    plt.show()  
-    
-    #save the file as a png
-    fig.savefig("top_ten_longest_books.png", bbox_inches="tight")
-    
-def calculate_mean(list_of_records):
+    return REPORT_WRITERS[report_format](report)
+
+class AnalysisSession:
     """
-    A function to calculate the mean from a list of values
+    A class to hold the books loaded for the analysis menu and every result worked out from them
+
+    Each result is worked out the first time it is asked for and kept, so choosing a menu option
+    again costs nothing. The session keeps read-only views of the columns and a read-only title
+    dictionary, so nothing done through the session can change the books after a result has been kept.
+
+    Attributes
+    ----------
+    book_table : BookTable
+        The books being analysed, as a table of read-only views of the columns of the table it was given.
+
+    """
+    def __init__(self, book_table):
+        #make views read-only rather than the columns themselves, so the table given is left writeable
+        columns = {name: getattr(book_table, name).view() for name in BOOK_CACHE_COLUMNS}
+        for column in columns.values():
+            column.setflags(write=False)
+        self.book_table = BookTable(titles=book_table.titles, **columns)
+
+    @classmethod
+    def from_csv(cls, filename, use_cache=True):
+        """
+        A function to start a session on the books in a csv file
+
+        Parameters
+        ----------
+        filename : string
+            A file location containing book information.
+        use_cache : bool
+            False to always read the csv file and leave the cache alone.
+
+        Returns
+        -------
+        session : AnalysisSession
+            A session for the books in the file.
+
+        """
+        return cls(load_book_table(filename, use_cache))
+
+    def filter(self, book_filter):
+        """
+        A function to start a session on the books inside the ranges of a filter
+
+        The sorted indexes used for narrow ranges are kept with this session's books, so filtering the
+        same session again is quick.
+
+        Parameters
+        ----------
+        book_filter : BookFilter
+            The ranges the books must be inside.
+
+        Returns
+        -------
+        session : AnalysisSession
+            A session for the matching books.
+
+        """
+        return AnalysisSession(book_filter.apply(self.book_table, use_indexes=True))
+
+    @cached_property
+    def title_and_pages(self):
+        """
+        A read-only dictionary of each title and the pages of the first book with that title
+        """
+        return MappingProxyType(self.book_table.title_page_dict())
+
+    @cached_property
+    def title_index(self):
+        """
+        The TitleIndex of the titles, used by the Search by title option
+        """
+        return TitleIndex.from_book_table(self.book_table)
 
-    Parameters
-    ----------
-    list_of_records : list
-        A list of records in float format.
+    @cached_property
+    def page_index(self):
+        """
+        The PageIndex of title_and_pages, used to find the titles with the mean number of pages
+        """
+        return PageIndex(self.title_and_pages)
 
-    Returns
-    -------
-    mean_value: float
-        The mean value of the original list
+    @cached_property
+    def book_information(self):
+        """
+        The results of the Book information option, as returned by build_book_section
+        """
+        return build_book_section(self.book_table.pages, self.book_table.number_of_ratings, self.book_table.years)
 
-    """
-    mean_value = sum(list_of_records)/len(list_of_records)
-    return mean_value
-    
-def calculate_standard_deviation(list_of_records):
-    """
-    A function to calculate the standard deviation of a list of records
+    @cached_property
+    def book_statistics(self):
+        """
+        The results of the Statistical analysis option, as returned by describe_books
+        """
+        return describe_books(self.book_table.pages, self.book_table.average_ratings, self.book_table.number_of_ratings)
 
-    Parameters
-    ----------
-    list_of_records : list
-        A list of record in float format.
+    @cached_property
+    def additional_analysis(self):
+        """
+        The results of the Additional analysis option, as returned by build_additional_section
+        """
+        return build_additional_section(self.title_and_pages, self.book_statistics["pages"]["mean"], self.page_index)
 
-    Returns
-    -------
-    standard_deviation_value:
-        The standard deviation for the original list
+    @cached_property
+    def top_ten_longest_books(self):
+        """
+        A dictionary of the titles and pages of the ten longest books, longest first
+        """
+        return {title: pages for pages, title in self.additional_analysis["top_ten_longest_books"]}
 
-    """
-    deviations = [(x - calculate_mean(list_of_records)) ** 2 for x in list_of_records] 
-    standard_deviation = sqrt(sum(deviations)/(len(list_of_records)))
-    
-    return standard_deviation
+    @cached_property
+    def visualizations(self):
+        """
+        The charts drawn by the Visualizations option, as returned by get_visualizations
 
-def calculate_median(list_of_records):
+        The statistics charts are given the kept statistics and the longest books chart the kept top ten
+        so drawing them does not work anything out again.
+        """
+        visualizations = get_visualizations(self.book_table.years, self.book_table.pages, self.book_table.average_ratings,
+                                            self.book_table.number_of_ratings, self.top_ten_longest_books)
+        kept_statistics = {display_visual_page_number_statistics: (self.book_statistics["pages"],),
+                           display_visual_average_rating_statistics: (self.book_statistics["average_rating"],),
+                           display_visual_number_of_ratings_statistics: (self.book_statistics["number_of_ratings"],)}
+
+        return [[name, display_function, kept_statistics.get(display_function, arguments)]
+                for name, display_function, arguments in visualizations]
+
+def main(arguments=None):
     """
-    A function to calculate the median of a list of records
+    A function to run the program, showing the menus unless a command is given on the command line
+
+    For example: python 7kbooks.py report --input 7kBooks.csv --format json --sections book,stats,additional
+
+    Profiling is turned on with --profile, --profile-memory or --profile-trace before the command, or by
+    setting BOOKS_PROFILE to time or memory and BOOKS_PROFILE_TRACE to a file location.
 
     Parameters
     ----------
-    list_of_records : list
-        A list of records in float format.
+    arguments : list
+        The command line arguments, taken from sys.argv when not given.
 
     Returns
     -------
-    median_value: float.
-        The value of the median in the original list
+    exit_code : int
+        Zero on success.
+
     """
-    #create a copy of the list for the sorting to be used in the calculation in order to preserve the order of the original list
-    copy_of_list = list_of_records.copy()
-    mid_index = int(len(copy_of_list)/2)
-    copy_of_list.sort()
-    
-    if len(copy_of_list) % 2:
-        median_value = copy_of_list[mid_index]
+    parser = ArgumentParser(description="Analysis of the 7kBooks dataset. Run with no command for the interactive menus.")
+    parser.add_argument("--profile", action="store_true", help="print the time and calls of each stage of the analysis when it finishes")
+    parser.add_argument("--profile-memory", action="store_true", help="as --profile and also record the peak memory of each stage, which is slower")
+    parser.add_argument("--profile-trace", help="a JSON file to save the profile and each call to")
+    commands = parser.add_subparsers(dest="command")
+    report_parser = commands.add_parser("report", help="write the analysis results without the menus")
+    report_parser.add_argument("--input", default="7kBooks.csv", help="the csv file of books to analyse")
+    report_parser.add_argument("--format", default="text", choices=list(REPORT_WRITERS), help="the format of the results")
+    report_parser.add_argument("--sections", default=",".join(DEFAULT_REPORT_SECTIONS),
+                               help="a comma separated list of sections from " + ", ".join(REPORT_SECTIONS))
+    report_parser.add_argument("--output", help="a file to write the results to instead of the screen")
+    report_parser.add_argument("--no-cache", action="store_true", help="read the whole csv file instead of only the rows added since the last report")
+    report_parser.add_argument("--workers", type=int, help="the number of processes to read the csv file and resample the books with")
+    report_parser.add_argument("--filter", help="only analyse the books inside comma separated column=lowest:highest ranges, "
+                                                "for example years=1990:2000,number_of_ratings=100:,pages=200:400, on the columns "
+                                                + ", ".join(FILTER_COLUMNS))
+    report_parser.add_argument("--bootstrap", type=int, default=0, metavar="RESAMPLES",
+                               help="add bootstrap confidence intervals from this many resamples to the stats section")
+    report_parser.add_argument("--confidence", type=float, default=0.95, help="the confidence level of the bootstrap intervals")
+    report_parser.add_argument("--seed", type=int, help="the seed for the bootstrap resamples, to repeat earlier intervals")
+    summary_parser = commands.add_parser("summary", help="summarise a csv file of any size in a fixed amount of memory")
+    summary_parser.add_argument("--input", default="7kBooks.csv", help="the csv file of books to analyse")
+    summary_parser.add_argument("--chunk-rows", type=int, default=100_000, help="the most rows to hold in memory at once")
+    summary_parser.add_argument("--compression", type=int, default=200, help="the size of the quantile sketch, higher is more accurate")
+    summary_parser.add_argument("--format", default="text", choices=REPORT_FORMATS, help="the format of the results")
+    summary_parser.add_argument("--output", help="a file to write the results to instead of the screen")
+    search_parser = commands.add_parser("search", help="rank the books by how well their title, subtitle and description match some words")
+    search_parser.add_argument("--input", default="7kBooks.csv", help="the csv file of books to search")
+    search_parser.add_argument("--query", required=True, help="the words to search for")
+    search_parser.add_argument("--top", type=int, default=10, help="the number of books to show")
+    search_parser.add_argument("--format", default="text", choices=REPORT_FORMATS, help="the format of the results")
+    search_parser.add_argument("--output", help="a file to write the results to instead of the screen")
+    search_parser.add_argument("--no-cache", action="store_true", help="build the search index instead of using the saved one")
+    groups_parser = commands.add_parser("groups", help="show the statistics of the authors and categories with the most books")
+    groups_parser.add_argument("--input", default="7kBooks.csv", help="the csv file of books to analyse")
+    groups_parser.add_argument("--by", default=",".join(GROUP_COLUMNS),
+                               help="a comma separated list of columns to group by from " + ", ".join(GROUP_COLUMNS))
+    groups_parser.add_argument("--top", type=int, default=10, help="the number of groups to show for each column")
+    groups_parser.add_argument("--sort-by", default="books", choices=GROUP_SORT_COLUMNS, help="the statistic to rank the groups by")
+    groups_parser.add_argument("--min-books", type=int, default=1, help="the fewest books a group needs to be shown")
+    groups_parser.add_argument("--format", default="text", choices=REPORT_FORMATS, help="the format of the results")
+    groups_parser.add_argument("--output", help="a file to write the results to instead of the screen")
+    render_parser = commands.add_parser("render", help="save the visualizations as png files without showing them")
+    render_parser.add_argument("--input", default="7kBooks.csv", help="the csv file of books to analyse")
+    render_parser.add_argument("--output-folder", default=".", help="the folder to save the png files to")
+    render_parser.add_argument("--workers", type=int, help="the number of processes to draw the charts with")
+    render_parser.add_argument("--no-cache", action="store_true", help="draw every chart even if its data has not changed")
+    render_parser.add_argument("--scatter-points", type=int, default=SCATTER_POINT_LIMIT,
+                               help="the most books to draw as points on the scatter chart before drawing a grid of counts instead")
+    options = parser.parse_args(arguments)
+    trace_filename = options.profile_trace or os.environ.get(PROFILE_TRACE_ENVIRONMENT_VARIABLE)
+    if options.profile or options.profile_memory or trace_filename:
+        PROFILER.enable(trace_memory=options.profile_memory)
     else:
-        median_value = (copy_of_list[mid_index-1] + copy_of_list[mid_index]) / 2
-    
-    return median_value
+        PROFILER.enable_from_environment()
 
-def calculate_mode(list_of_records):
+    if options.command is None:
+        run_menus()
+        exit_code = 0
+    elif options.command == "report":
+        exit_code = run_report(parser, options)
+    elif options.command == "summary":
+        exit_code = run_summary(options)
+    elif options.command == "search":
+        exit_code = run_search(options)
+    elif options.command == "groups":
+        exit_code = run_groups(parser, options)
+    else:
+        exit_code = run_render(options)
+
+    if PROFILER.enabled:
+        PROFILER.print_summary()
+        if trace_filename:
+            PROFILER.save_trace(trace_filename)
+
+    return exit_code
+
+def run_report(parser, options):
     """
-    A function to calculate the mode of a list
+    A function to run the report command
 
     Parameters
     ----------
-    list_of_records : list
-        A list of records in float format
+    parser : argparse.ArgumentParser
+        The command line parser, used to report bad options.
+    options : argparse.Namespace
+        The options given for the report command.
 
     Returns
     -------
-    mode_value: float
-        The value of the mode of the original list
+    exit_code : int
+        Zero on success.
 
     """
-    #create a copy of the list for use in the calculations so the original list maintains its order
-    copy_of_list = list_of_records.copy()
-    count_of_items = count_of_unique_items_in_list(copy_of_list)
-    sorted_list = sorted(count_of_items, key=lambda x: x[1], reverse=True)
-    mode_value = sorted_list[0][0]
-    #if the mode is zero return the next highest value as zero signifies missing information
-    if mode_value == 0:
-        mode_value = sorted_list[1][0]
-        
-    return mode_value
+    sections = [section.strip() for section in options.sections.split(",") if section.strip()]
+    for section in sections:
+        if section not in REPORT_SECTIONS:
+            parser.error(f"unknown section {section!r}, choose from " + ", ".join(REPORT_SECTIONS))
+    if not 0 < options.confidence < 1:
+        parser.error("--confidence must be between 0 and 1")
+    if options.format == "results" and "stats" not in sections:
+        parser.error("--format results needs the stats section")
 
-def calculate_correlation(list_one, list_two):
+    book_filter = None
+    if options.filter:
+        try:
+            book_filter = parse_book_filter(options.filter)
+        except ValueError as error:
+            parser.error(str(error))
+
+    try:
+        bootstrap = options.bootstrap > 0 and "stats" in sections
+        if book_filter is not None or "correlation" in sections or bootstrap:
+            #the saved aggregates cover every book and keep no columns to pair up, so these reports work from the columns
+            book_table = load_book_table(options.input, use_cache=not options.no_cache)
+            if book_filter is not None:
+                book_table = book_filter.apply(book_table)
+            if book_filter is not None and len(book_table) == 0:
+                print("No books match the filter", file=sys.stderr)
+                return 1
+            report = build_report(book_table, sections)
+            if bootstrap:
+                report["stats"]["confidence_intervals"] = bootstrap_book_statistics(book_table, options.bootstrap, options.confidence,
+                                                                                    options.seed, options.workers)
+        elif options.no_cache and not options.workers:
+            report = build_report(BookTable.from_csv(options.input), sections)
+        else:
+            #the saved aggregates mean only rows appended since the last report are read
+            aggregates = load_book_aggregates(options.input, options.workers or 1, use_saved=not options.no_cache)
+            report = build_report_from_aggregates(aggregates, sections)
+        report_text = format_report(report, options.format)
+        write_command_output(report_text, options.output)
+    #handle errors when trying to read the book file or write the results
+    except (FileNotFoundError, IsADirectoryError, PermissionError) as error:
+        print_file_error(error)
+        return 1
+
+    return 0
+
+def run_summary(options):
     """
-    A function that takes in two lists and calculates the correlation between them
+    A function to run the summary command
 
     Parameters
     ----------
-    list_one : list
-        A list of values.
-    list_two : list
-        A list of value.
+    options : argparse.Namespace
+        The options given for the summary command.
 
     Returns
     -------
-    correlation_value: float
-        The result of the correlation between the two lists provided
+    exit_code : int
+        Zero on success.
 
     """
-    #calculate the mean of both lists
-    mean_list_one = calculate_mean(list_one)
-    mean_list_two = calculate_mean(list_two)
-    
-    #create a list of the deviations
-    x_deviations = [x - mean_list_one for x in list_one]
-    y_deviations = [y - mean_list_two for y in list_two]
-    
-    #create a list of the deviations multiplied
-    xy_deviations = [x*y for (x,y) in zip(x_deviations, y_deviations)]
-    
-    #create a list of the deviations squared
-    x_sqd_deviations = [(x - mean_list_one) ** 2 for x in list_one]
-    y_sqd_deviations = [(y - mean_list_two) ** 2 for y in list_two]
-    
-    #calculate the correlation
-    correlation_value = sum(xy_deviations)/(sqrt(sum(x_sqd_deviations))*(sqrt(sum(y_sqd_deviations))))
-    
-    return correlation_value
-    
-def main_menu():
-    """
-    A function for printing out the Main Menu of the program
+    try:
+        summary = summarize_books_out_of_core(options.input, options.chunk_rows, options.compression)
+        write_command_output(format_report(summary, options.format), options.output)
+    #handle errors when trying to read the book file or write the results
+    except (FileNotFoundError, IsADirectoryError, PermissionError) as error:
+        print_file_error(error)
+        return 1
 
-    Returns
-    -------
-    None.
+    return 0
 
+def run_search(options):
     """
-    print()
-    print("Menu Options:")
-    print("-------------")
-    print("Enter \"A\" for analysis\nEnter \"H\" for help\nEnter \"Q\" to quit")
+    A function to run the search command
 
-def main_menu_error():
-    """
-    A function for displaying error messages if a user enters an invalid entry on the Main Menu
+    Parameters
+    ----------
+    options : argparse.Namespace
+        The options given for the search command.
 
     Returns
     -------
-    None.
+    exit_code : int
+        Zero on success.
 
     """
-    print()
-    print("ERROR: Invalid selection. Please enter one of the following options only:")
-    print()
-    print("\"A\" - for analysis of book data")
-    print("\"H\" - for help and information")
-    print("\"Q\" - to quit")
-    
-def quit_message():
-    """
-    A function for displaying a message to the user when they decide to quit the application
+    try:
+        search_index = load_search_index(options.input, use_cache=not options.no_cache)
+        results = [[round(score, 4), search_index.get_title(document)] for document, score in search_index.search(options.query, options.top)]
+        write_command_output(format_report({"search": {"query": options.query, "results": results}}, options.format), options.output)
+    #handle errors when trying to read the book file or write the results
+    except (FileNotFoundError, IsADirectoryError, PermissionError) as error:
+        print_file_error(error)
+        return 1
 
-    Returns
-    -------
-    None.
+    return 0
 
+def run_groups(parser, options):
     """
-    print()
-    print("Closing application, goodbye!")
+    A function to run the groups command
 
-def help_section_info():
-    """
-    A function to display information if the user selects the Help option on the Main Menu
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        The command line parser, used to report bad options.
+    options : argparse.Namespace
+        The options given for the groups command.
 
     Returns
     -------
-    None.
+    exit_code : int
+        Zero on success.
 
     """
-    print()
-    print("***HELP SECTION***")
-    print("==================")
-    print("This program analyses a file containing almost 7000 books taken from the following dataset on kaggle:")
-    print()
-    print("https://www.kaggle.com/dylanjcastillo/7k-books-with-metadata")
-    print()
-    print("If you enter \"A\" on the main menu, a list of analysis options will be displayed.")
-    print()
-    print("These options include the following:")
-    print()
-    print("1. Book Information")
-    print("   - Details of the number of books and pages on file")
-    print("   - Details of the number of book reviews in the file")
-    print("   - Details of the averge ratings for books in the file")
-    print("   - Details of the years books in the file were published")
-    print()
-    print("2. Statistical Analysis")
-    print("   - The mean, mode, median and standard deviation of book page numbers")
-    print("   - The mean, mode, median and standard deviation of average reviews")
-    print("   - The mean, mode, median and standard deviation of number of reviews")
-    print("   - Correlation information for page numbers and average rating")
-    print()
-    print("3. Additional Analysis")
-    print("   - Title information on the longest book")
-    print("   - Title information on the shortest book")
-    print("   - List of books with the same number of pages as the mean")
-    print("   - List of top ten longest books on file")
-    print()
-    print("4. Visualizations") 
-    print("   - Various visualizations showing results of analysis")
-    print("   - Output includes bar charts, pie charts and scatter plots")
-    print()
-    print("5. Save to File")
-    print("   - The option to save output to a text file")
-    print()
+    columns = [column.strip() for column in options.by.split(",") if column.strip()]
+    for column in columns:
+        if column not in GROUP_COLUMNS:
+            parser.error(f"unknown column {column!r}, choose from " + ", ".join(GROUP_COLUMNS))
 
-def analysis_menu():
-    """
-    A function to display the Analysis Menu options
+    try:
+        groups = group_books(options.input, tuple(columns))
+        report = {column: groups[column].get_top_groups(options.top, options.sort_by, options.min_books) for column in columns}
+        write_command_output(format_report(report, options.format), options.output)
+    #handle errors when trying to read the book file or write the results
+    except (FileNotFoundError, IsADirectoryError, PermissionError) as error:
+        print_file_error(error)
+        return 1
 
-    Returns
-    -------
-    None.
+    return 0
 
+def write_command_output(text, output_filename):
     """
-    print()
-    print("Menu Options:")
-    print("-------------")
-    print("Enter \"B\" for book page information\nEnter \"S\" for statistical analysis\nEnter \"A\" for additional analysis\nEnter \"V\" for visualizations\nEnter \"F\" to save results to a file\nEnter \"M\" to return to main menu")
+    A function to write the output of a command to a file, or to the screen if no file is given
 
-def analysis_error_menu():
-    """
-    A function to display the options on the Analysis Menu
+    Parameters
+    ----------
+    text : string
+        The output to write.
+    output_filename : string
+        The file location to write to, or None for the screen.
 
     Returns
     -------
     None.
 
     """
-    print("ERROR: Invalid selection. Please enter one of the following options only:")
-    print()
-    print("\"B\" - for book information")
-    print("\"S\" - for statistical analysis")
-    print("\"A\" - for additional analysis")
-    print("\"V\" - for visualizations")
-    print("\"F\" - to save results to a file")
-    print("\"M\" - to return to the main menu")
-    print()
-    
-def book_information_menu(list_of_book_pages, list_of_number_of_ratings, list_of_years):
+    if output_filename:
+        write_text_file(output_filename, text)
+    else:
+        sys.stdout.write(text)
+
+def run_render(options):
     """
-    A function to display the output of the Book information option on the Analysis Menu
+    A function to run the render command
 
     Parameters
     ----------
-    list_of_book_pages : list
-        A list of page numbers per book
-    list_of_number_of_ratings : list
-        A list of the number of ratings per book
-    list_of_years : list
-        A list of the number of the published year for each book
+    options : argparse.Namespace
+        The options given for the render command.
 
     Returns
     -------
-    None.
+    exit_code : int
+        Zero on success.
 
     """
-    print("Book Information:")
-    print("-----------------")
-    print()
-    print("Books and Pages:")
-    print("1. Total number of books in list:", get_total_number_of_records_in_list(list_of_book_pages))
-    print("2. Total pages in all books combined:", int(sum(list_of_book_pages)))
-    print()
-    print("Page Numbers:")
-    print("1. Most pages in a book:", get_max_value(list_of_book_pages), "pages")
-    print("2. Fewest pages in a book:", get_fewest_pages_excluding_zero(list_of_book_pages), "pages")
-    print("3. Number of books in file with no page count:", get_number_of_items_with_missing_information(list_of_book_pages))
-    print()
-    print("Published Year:")
-    print("1. Number of unique years a book was published:", len(count_of_unique_items_in_list(list_of_years)))
-    print("2. The most recent year a book was published:", get_most_recent_year(list_of_years))
-    print("3. The oldest year a book was published:", min(list_of_years))
-    print()
-    print("Number of Ratings:")
-    print("1. Total number of book reviews:", int(sum(list_of_number_of_ratings)))
-    print("2. Number of books on file with no reviews:", get_number_of_items_with_missing_information(list_of_number_of_ratings))
-    
-def visualizations_message():
+    try:
+        book_table = load_book_table(options.input)
+        start = time.perf_counter()
+        chart_seconds = render_visualizations(get_visualizations(book_table.years, book_table.pages, book_table.average_ratings,
+                                                                 book_table.number_of_ratings, book_table.get_longest_titles(), options.scatter_points),
+                                              options.output_folder, options.workers, use_cache=not options.no_cache)
+    #handle errors when trying to read the book file or save the charts
+    except (FileNotFoundError, IsADirectoryError, PermissionError) as error:
+        print_file_error(error)
+        return 1
+    print_render_timings(chart_seconds, time.perf_counter() - start)
+
+    return 0
+
+def print_file_error(error):
     """
-    A function to display a message to the user when the analysis is running
+    A function for displaying an error message when a command cannot read or write a file
+
+    Parameters
+    ----------
+    error : OSError
+        The FileNotFoundError, IsADirectoryError or PermissionError that was raised.
 
     Returns
     -------
     None.
 
     """
-    print("Visualizations:")
-    print("---------------")
-    print()
-    print("***LOADING VISUALIZATIONS...***")
-    print("- If using Spyder, please check the Plots section to view the visualizations")
-    print("- The visualizations are also saved as .png files in the current folder")
+    if isinstance(error, FileNotFoundError):
+        print("ERROR: File not found. Please ensure the correct file is being used.", file=sys.stderr)
+    elif isinstance(error, IsADirectoryError):
+        print("ERROR: The name entered is a directory. Please ensure a valid file is entered", file=sys.stderr)
+    else:
+        print("ERROR: Permission denied. Please ensure the correct file is being used.", file=sys.stderr)
 
-def statistical_analysis_info(list_of_book_pages, list_of_average_ratings, list_of_number_of_ratings):
+def run_menus():
     """
-    A function to display the output of the Statistical Analysis option on the Analysis menu
-
-    Parameters
-    ----------
-    list_of_book_pages : list
-        A list of book page numbers.
-    list_of_average_ratings : list
-        A list of average ratings per books.
-    list_of_number_of_ratings : list
-        A list of the number of ratings per book.
+    A function to run the interactive main menu and analysis menu
 
     Returns
     -------
     None.
 
     """
-    print("Mean, Mode, Median & Standard Deviation:")
-    print("----------------------------------------")
-    print()
-    print("Statistics for Page Numbers per Book:")
-    print("1.1. Mean number of pages per book:", int(round(calculate_mean(list_of_book_pages), 0)))
-    print("1.2. Standard deviation of book pages:", int(calculate_standard_deviation(list_of_book_pages)))
-    print("1.3. Mode of book pages:", int(calculate_mode(list_of_book_pages)))
-    print("1.4. Median number of book pages:", int(calculate_median(list_of_book_pages)))
-    print()
-    print("Statistics for Average Rating out of 5 per Book:")
-    print("2.1. Mean average rating for all books:", round(calculate_mean(list_of_average_ratings), 2))
-    print("2.2. Standard deviation of average ratings:", round(calculate_standard_deviation(list_of_average_ratings), 2))
-    print("2.3. Mode of average ratings:", calculate_mode(list_of_average_ratings))
-    print("2.4. Median average rating:", round(calculate_median(list_of_average_ratings), 2))
-    print()
-    print("Statistics for Number of Ratings per Book:") 
-    print("3.1. Mean number of ratings per book:", int(calculate_mean(list_of_number_of_ratings)))
-    print("3.2. Standard deviation of ratings per book:", int(calculate_standard_deviation(list_of_number_of_ratings)))
-    print("3.3. Mode of ratings per book:", int(calculate_mode(list_of_number_of_ratings)))
-    print("3.4. Median number ratings per book:", int(calculate_median(list_of_number_of_ratings)))
-    print()
-    print("Correlation between Number of Pages and Average Rating:")
-    print("4.1 Correlation between number of pages and average rating:", round(calculate_correlation(list_of_book_pages, list_of_average_ratings), 2))
-    print("    - This suggests a weak positive correlation")
-    
-def additional_analysis_info(list_of_book_pages, list_of_average_ratings, title_and_pages):
-    print("Additional Analysis:")
-    print("--------------------")
-    print("1. Book with most pages:")
-    print("   - ", get_book_with_most_pages(title_and_pages))
-    print()
-    print("2. Book with fewest pages:")
-    print("   - ", get_book_with_fewest_pages(title_and_pages))
-    print()
-    print("3. Titles with the same number of pages as the mean:")
-    get_books_with_same_number_pages_as_mean(list_of_book_pages, title_and_pages)
+    print("This program performs analysis on a dataset of books")
+    print("The dataset is called 7kBooks and the original version can be found at the following location:")
+    print("https://www.kaggle.com/dylanjcastillo/7k-books-with-metadata")
     print()
-    print("4. Top 10 longest books:")
-    top_ten_books = get_top_ten_longest_books(title_and_pages)
-    print(f"    {' Pages':>5}{'Title':>10}")
-    #loop through the top ten longest books and print out the title and number of pages
-    for k, v in top_ten_books.items():
-        print("   - ", v, "   ", k)
     
-if __name__ == "__main__":
     #INTERACTIVE MAIN MENU
     print("***Welcome to the 7kBooks Analysis Program***")
     print("=============================================")
@@ -1029,8 +5964,8 @@ if __name__ == "__main__":
             print()
             print("Initializing data for analysis...please wait...")
             try:
-                #open the book file
-                page_numbers, years, average_ratings, number_of_ratings, title_and_page_numbers = get_data("7kBooks.csv")
+                #open the book file, every result is worked out once when it is first needed
+                session = AnalysisSession.from_csv("7kBooks.csv")
                 while True:
                     print() 
                     print("***ANALYSIS SECTION***")
@@ -1039,27 +5974,30 @@ if __name__ == "__main__":
                     choice = input("Enter your selection: ").lower()
                     print()
                     #alert users to invalid input
-                    if choice not in ("b", "s", "a", "v", "f", "m"):
+                    if choice not in ("b", "s", "a", "v", "f", "t", "m"):
                         analysis_error_menu()
                     #print out information about the number of pages in the books in the file
                     if choice == "b":
-                        book_information_menu(page_numbers, number_of_ratings, years)
+                        print_book_information(session.book_information)
                     #display visualizations    
                     if choice == "v":
                         visualizations_message()
-                        display_published_years(years)
-                        display_visual_page_number_statistics(page_numbers)
-                        display_visual_average_rating_statistics(average_ratings)
-                        display_visual_number_of_ratings_statistics(number_of_ratings)
-                        display_scatter_plot(page_numbers, average_ratings)
-                        display_top_ten_longest_books(title_and_page_numbers)
+                        visualizations = session.visualizations
+                        #without a screen draw the charts in parallel and only save them
+                        if is_headless():
+                            start = time.perf_counter()
+                            chart_seconds = render_visualizations(visualizations)
+                            print_render_timings(chart_seconds, time.perf_counter() - start)
+                        else:
+                            for name, display_function, arguments in visualizations:
+                                display_function(*arguments)
                         
                     #print out reults of statistical analysis calculations on the books in the file
                     elif choice == "s":
-                        statistical_analysis_info(page_numbers, average_ratings, number_of_ratings)
+                        statistical_analysis_info(session.book_statistics)
                     #print out some additional information on the book titles in the file
                     elif choice == "a":
-                        additional_analysis_info(page_numbers, average_ratings, title_and_page_numbers)
+                        print_additional_analysis(session.additional_analysis)
                     #save the statistical analysis results to a file
                     elif choice == "f":
                         print("***PRINTING RESULTS...***")
@@ -1067,72 +6005,7 @@ if __name__ == "__main__":
                         print("Results can be found in the \"7kBooks_Results.txt\" file in the current folder")
                         print()
                         try:
-                            with open("7kBooks_Results.txt", "w") as results_file:
-                                results_file.write("          Statistical Analysis Results")
-                                results_file.write("\n")
-                                results_file.write("================================================")
-                                results_file.write("\n")
-                                results_file.write("\n")
-                                results_file.write("Book Page Number Statistics:")
-                                results_file.write("\n")
-                                results_file.write("============================")
-                                results_file.write("\n")
-                                results_file.write("Mean of book pages: ")
-                                results_file.write(str(int(calculate_mean(page_numbers))))
-                                results_file.write("\n")
-                                results_file.write("Mode of book pages: ")
-                                results_file.write(str(int(calculate_mode(page_numbers))))
-                                results_file.write("\n")
-                                results_file.write("Median of book pages: ")
-                                results_file.write(str(int(calculate_median(page_numbers))))
-                                results_file.write("\n")
-                                results_file.write("Standard Deviation of book pages: ")
-                                results_file.write(str(int(calculate_standard_deviation(page_numbers))))
-                                results_file.write("\n")
-                                results_file.write("------------------------------------------------")
-                                results_file.write("\n")
-                                results_file.write("\n")
-                                results_file.write("Book Average Rating Statistics:")
-                                results_file.write("\n")
-                                results_file.write("===============================")
-                                results_file.write("\n")
-                                results_file.write("Mean of average rating: ")
-                                results_file.write(str(round(calculate_mean(average_ratings), 2)))
-                                results_file.write("\n")
-                                results_file.write("Mode of average rating: ")
-                                results_file.write(str(round(calculate_mode(average_ratings), 2)))
-                                results_file.write("\n")
-                                results_file.write("Median of average rating: ")
-                                results_file.write(str(round(calculate_median(average_ratings), 2)))
-                                results_file.write("\n")
-                                results_file.write("Standard Deviation of average rating: ")
-                                results_file.write(str(round(calculate_standard_deviation(average_ratings), 2)))
-                                results_file.write("\n")
-                                results_file.write("------------------------------------------------")
-                                results_file.write("\n")
-                                results_file.write("\n")
-                                results_file.write("Book Number of Ratings Statistics:")
-                                results_file.write("\n")
-                                results_file.write("==================================")
-                                results_file.write("\n")
-                                results_file.write("Mean of number of ratings: ")
-                                results_file.write(str(int(calculate_mean(number_of_ratings))))
-                                results_file.write("\n")
-                                results_file.write("Mode of number of ratings: ")
-                                results_file.write(str(int(calculate_mode(number_of_ratings))))
-                                results_file.write("\n")
-                                results_file.write("Median of number of ratings: ")
-                                results_file.write(str(int(calculate_median(number_of_ratings))))
-                                results_file.write("\n")
-                                results_file.write("Standard Deviation of number of ratings: ")
-                                results_file.write(str(int(calculate_standard_deviation(number_of_ratings))))
-                                results_file.write("\n")
-                                results_file.write("------------------------------------------------")
-                                results_file.write("\n")
-                                results_file.write("The original source file can be found here:")
-                                results_file.write("\n")
-                                results_file.write("\n")
-                                results_file.write("https://www.kaggle.com/dylanjcastillo/7k-books-with-metadata")
+                            write_results_file(session.book_statistics)
                         #handle errors when trying to write to the results file
                         except FileNotFoundError:
                             print()
@@ -1143,6 +6016,9 @@ if __name__ == "__main__":
                         except PermissionError:
                             print()
                             print("ERROR: Permission denied. Please ensure the correct file is being used.")                
+                    #look up books by title
+                    elif choice == "t":
+                        search_by_title_menu(session)
                     #send user back to the main menu of the program
                     elif choice == "m":
                         print("Returning to main menu...")
@@ -1161,5 +6037,6 @@ if __name__ == "__main__":
             except PermissionError:
                 print()
                 print("ERROR: Permission denied. Please ensure the correct file is being used.")
-                
-                
\ No newline at end of file
+
+if __name__ == "__main__":
+    sys.exit(main())
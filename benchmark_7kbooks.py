@@ -0,0 +1,501 @@
+#Program to benchmark functions used in data analysis
+#Run with: python benchmark_7kbooks.py --sizes 7000,70000 --output benchmark_results.json
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+#the analysis program name starts with a number so it is loaded from its file location
+spec = importlib.util.spec_from_file_location("books_analysis", os.path.join(os.path.dirname(os.path.abspath(__file__)), "7kbooks.py"))
+books_analysis = importlib.util.module_from_spec(spec)
+sys.modules["books_analysis"] = books_analysis
+spec.loader.exec_module(books_analysis)
+
+HEADER = "isbn13,isbn10,title,subtitle,authors,categories,thumbnail,description,published_year,average_rating,num_pages,ratings_count\n"
+
+#the most common categories in 7kBooks.csv and roughly how often they appear
+CATEGORIES = ["Fiction"] * 38 + ["Juvenile Fiction"] * 8 + ["Biography & Autobiography"] * 6 + ["History"] * 4 + \
+             ["Literary Criticism", "Philosophy", "Comics & Graphic Novels", "Religion", "Poetry", "Science",
+              "Drama", "Business & Economics", "Computers", "Cooking", "Detective and mystery stories"] * 2
+
+WORDS = ("the of and a in to house night love war story life world time girl man city book dark last "
+         "river secret garden shadow king queen star fire ice blood heart stone light road home game "
+         "summer winter english history guide art science mind death child dream letters moon sea").split()
+
+SYLLABLES = "ka lo mi ra ten sho vel an dor is ber quin ta mor el ly ga fen ro us".split()
+
+def write_synthetic_csv(filename, number_of_rows, seed=0):
+    """
+    A function to write a csv file shaped like 7kBooks.csv filled with random books
+
+    The twelve columns use + instead of commas like the original file, and the number of blank
+    values, repeated titles, authors, descriptions and the spread of the numbers are roughly the
+    same as in 7kBooks.csv so the timings carry over to the real file.
+
+    Parameters
+    ----------
+    filename : string
+        The file location to write the books to.
+    number_of_rows : int
+        The number of books to write.
+    seed : int
+        The seed for the random number generator so the file is the same each run.
+
+    Returns
+    -------
+    None.
+
+    """
+    random_numbers = random.Random(seed)
+    def words(low, high):
+        return " ".join(random_numbers.choice(WORDS) for i in range(random_numbers.randint(low, high)))
+
+    def made_up_word(number):
+        #a different word for every number so new titles are not repeated by chance
+        word = ""
+        while True:
+            number, syllable = divmod(number, len(SYLLABLES))
+            word += SYLLABLES[syllable]
+            if number == 0:
+                return word.title()
+
+    #building descriptions is the slowest part so a pool of them is reused
+    descriptions = [" ".join(words(6, 14).capitalize() + "+" for i in range(random_numbers.randint(3, 7))).rstrip("+") + "."
+                    for i in range(1000)]
+    authors = [f"{words(1, 1).title()} {words(1, 1).title()}son {i}" for i in range(max(1000, number_of_rows // 5))]
+    recent_titles = []
+
+    with open(filename, "w", encoding="utf8") as books:
+        books.write(HEADER)
+        lines = []
+        for i in range(number_of_rows):
+            #about 6% of titles are repeated and 5% have a comma written as +
+            if recent_titles and random_numbers.random() < 0.06:
+                title = random_numbers.choice(recent_titles)
+            else:
+                title = f"{words(0, 4).title()} {made_up_word(i)}".strip() + (f"+ Volume {i % 9 + 1}" if random_numbers.random() < 0.05 else "")
+                recent_titles.append(title)
+                if len(recent_titles) > 1000:
+                    recent_titles.pop(0)
+            subtitle = words(2, 6).title() if random_numbers.random() < 0.35 else ""
+            author = ";".join(random_numbers.sample(authors, 2 if random_numbers.random() < 0.17 else 1)) if random_numbers.random() > 0.01 else ""
+            category = random_numbers.choice(CATEGORIES) if random_numbers.random() > 0.015 else ""
+            thumbnail = (f"http://books.google.com/books/content?id={i:012X}&printsec=frontcover&img=1&zoom=1&source=gbs_api"
+                         if random_numbers.random() > 0.05 else "")
+            description = random_numbers.choice(descriptions) if random_numbers.random() > 0.04 else ""
+            year = str(min(2019, 2008 - int(random_numbers.expovariate(1 / 9)))) if random_numbers.random() > 0.001 else ""
+            #the rating, pages and number of ratings are blank together in the original file
+            if random_numbers.random() > 0.0063:
+                rating = f"{min(5.0, max(1.0, random_numbers.gauss(3.93, 0.33))):.2f}" if random_numbers.random() > 0.0015 else "0"
+                pages = str(int(random_numbers.lognormvariate(5.72, 0.48)))
+                #the most ratings of any book in 7kBooks.csv is about 5.6 million
+                ratings = str(min(5_629_932, int(random_numbers.lognormvariate(6.93, 2.75))))
+            else:
+                rating = pages = ratings = ""
+            lines.append(f"{9780000000000 + i},{i},{title},{subtitle},{author},{category},{thumbnail},"
+                         f"{description},{year},{rating},{pages},{ratings}\n")
+            if len(lines) == 10_000:
+                books.writelines(lines)
+                lines = []
+        books.writelines(lines)
+
+def time_function(function, *args):
+    """
+    A function to time a single call of another function
+
+    Parameters
+    ----------
+    function : function
+        The function to time.
+    *args : any
+        The arguments to pass to the function.
+
+    Returns
+    -------
+    seconds : float
+        The wall time taken by the call in seconds.
+
+    """
+    start = time.perf_counter()
+    function(*args)
+
+    return time.perf_counter() - start
+
+def get_best_time(function, arguments, repeats):
+    """
+    A function to time several calls of another function and keep the fastest
+
+    Parameters
+    ----------
+    function : function
+        The function to time.
+    arguments : tuple
+        The arguments to pass to the function.
+    repeats : int
+        The number of calls to time.
+
+    Returns
+    -------
+    seconds : float
+        The wall time taken by the fastest call in seconds.
+
+    """
+    return min(time_function(function, *arguments) for repeat in range(repeats))
+
+def benchmark_get_data(sizes):
+    """
+    A function to show how the time taken by get_data grows with the number of rows in the file
+
+    Parameters
+    ----------
+    sizes : list
+        The numbers of rows to benchmark.
+
+    Returns
+    -------
+    results : list
+        A list of the number of rows, seconds and microseconds per row for each size.
+
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            filename = os.path.join(folder, f"books_{size}.csv")
+            write_synthetic_csv(filename, size)
+            seconds = time_function(books_analysis.get_data, filename)
+            results.append([size, seconds, seconds / size * 1e6])
+
+    return results
+
+def benchmark_memory_per_book(size):
+    """
+    A function to compare the memory held per book by the get_data lists and a BookTable
+
+    Parameters
+    ----------
+    size : int
+        The number of rows to load.
+
+    Returns
+    -------
+    results : dict
+        The bytes per book for each way of loading the file.
+
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, f"books_{size}.csv")
+        write_synthetic_csv(filename, size)
+        for name, loader in (("get_data", books_analysis.get_data), ("BookTable", books_analysis.BookTable.from_csv)):
+            tracemalloc.start()
+            loaded = loader(filename)
+            results[name] = tracemalloc.get_traced_memory()[0] / size
+            tracemalloc.stop()
+            del loaded
+
+    return results
+
+def benchmark_frequency_counting(size):
+    """
+    A function to time the frequency counting functions on a list of published years
+
+    Parameters
+    ----------
+    size : int
+        The number of values to count.
+
+    Returns
+    -------
+    results : dict
+        The seconds taken by each function.
+
+    """
+    random_numbers = random.Random(0)
+    years = [str(random_numbers.randint(1850, 2019)) if random_numbers.random() > 0.01 else "Unknown" for i in range(size)]
+    ratings = [round(random_numbers.uniform(1, 5), 2) for i in range(size)]
+
+    return {"count_of_unique_items_in_list": time_function(books_analysis.count_of_unique_items_in_list, years),
+            "get_most_common_items": time_function(books_analysis.get_most_common_items, years, 10),
+            "calculate_mode": time_function(books_analysis.calculate_mode, ratings)}
+
+def benchmark_parallel_ingestion(size, worker_counts=(1, 2, 4, 8)):
+    """
+    A function to time loading a file and working out its report with different numbers of worker processes
+
+    Parameters
+    ----------
+    size : int
+        The number of rows in the file.
+    worker_counts : tuple
+        The numbers of workers to time.
+
+    Returns
+    -------
+    results : list
+        A list of the number of workers, seconds and speedup over one worker.
+
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, f"books_{size}.csv")
+        write_synthetic_csv(filename, size)
+        for workers in worker_counts:
+            seconds = time_function(lambda: books_analysis.build_report_from_aggregates(
+                books_analysis.aggregate_books_in_parallel(filename, workers)))
+            results.append([workers, seconds, results[0][1] / seconds if results else 1.0])
+
+    return results
+
+def benchmark_incremental_append(size, appended_fraction=0.01):
+    """
+    A function to compare a full report with a report after rows are appended to a file that has already been reported on
+
+    Parameters
+    ----------
+    size : int
+        The number of rows in the file before the append.
+    appended_fraction : float
+        The number of rows appended as a fraction of size.
+
+    Returns
+    -------
+    results : dict
+        The seconds taken by the full report and the report after the append.
+
+    """
+    results = {}
+    appended_rows = int(size * appended_fraction)
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, f"books_{size}.csv")
+        write_synthetic_csv(filename, size + appended_rows)
+        with open(filename, "rb") as books:
+            lines = books.readlines()
+        with open(filename, "wb") as books:
+            books.writelines(lines[:size + 1])
+        results["full"] = time_function(lambda: books_analysis.build_report_from_aggregates(books_analysis.load_book_aggregates(filename)))
+        with open(filename, "ab") as books:
+            books.writelines(lines[size + 1:])
+        results["append"] = time_function(lambda: books_analysis.build_report_from_aggregates(books_analysis.load_book_aggregates(filename)))
+
+    return results
+
+#the numbers of rows the suite is run on by default, 7kBooks.csv and then 10, 100 and 1000 times bigger
+BENCHMARK_SIZES = (7_000, 70_000, 700_000, 7_000_000)
+
+def benchmark_suite(sizes=BENCHMARK_SIZES, repeats=3):
+    """
+    A function to time the loading, calculation and report functions on synthetic files of each size
+
+    Every function in the analysis program whose name starts with calculate_ is timed, so new ones
+    are picked up without changing the suite.
+
+    Parameters
+    ----------
+    sizes : iterable
+        The numbers of rows to benchmark.
+    repeats : int
+        The number of times to call each function, keeping the fastest.
+
+    Returns
+    -------
+    results : dict
+        For each number of rows as a string, a dictionary of function names and seconds.
+
+    """
+    calculate_functions = [name for name in dir(books_analysis) if name.startswith("calculate_")]
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            filename = os.path.join(folder, f"books_{size}.csv")
+            write_synthetic_csv(filename, size)
+            timings = {"get_data": get_best_time(books_analysis.get_data, (filename,), repeats)}
+            pages, years, ratings, number_of_ratings, title_and_pages = books_analysis.get_data(filename)
+
+            for name in calculate_functions:
+                function = getattr(books_analysis, name)
+                #calculate_correlation compares two lists, calculate_correlation_matrix a list of them, the others take one
+                if name == "calculate_correlation_matrix":
+                    arguments = ([pages, ratings, number_of_ratings],)
+                else:
+                    arguments = (pages, ratings) if len(inspect.signature(function).parameters) == 2 else (pages,)
+                timings[name] = get_best_time(function, arguments, repeats)
+            timings["count_of_unique_items_in_list"] = get_best_time(books_analysis.count_of_unique_items_in_list, (years,), repeats)
+            timings["get_top_ten_longest_books"] = get_best_time(books_analysis.get_top_ten_longest_books, (title_and_pages,), repeats)
+            timings["group_books"] = get_best_time(books_analysis.group_books, (filename,), repeats)
+
+            book_statistics = books_analysis.describe_books(pages, ratings, number_of_ratings)
+            results_filename = os.path.join(folder, "7kBooks_Results.txt")
+            timings["write_results_file"] = get_best_time(books_analysis.write_results_file, (book_statistics, results_filename), repeats)
+            report = books_analysis.build_report(books_analysis.BookTable.from_csv(filename))
+            for report_format in books_analysis.REPORT_FORMATS:
+                timings[f"format_report[{report_format}]"] = get_best_time(books_analysis.format_report, (report, report_format), repeats)
+
+            results[str(size)] = timings
+            os.remove(filename)
+
+    return results
+
+def get_git_commit():
+    """
+    A function to get the commit the analysis program was benchmarked at
+
+    Returns
+    -------
+    commit : string
+        The git commit hash, or None when the program is not in a git repository.
+
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_benchmark_results(results, filename, repeats):
+    """
+    A function to save the suite results as JSON with details of the machine and version they came from
+
+    Parameters
+    ----------
+    results : dict
+        The results returned by benchmark_suite.
+    filename : string
+        The file location to save the results to.
+    repeats : int
+        The number of times each function was called.
+
+    Returns
+    -------
+    None.
+
+    """
+    saved = {"commit": get_git_commit(),
+             "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+             "python": platform.python_version(),
+             "numpy": books_analysis.np.__version__,
+             "machine": platform.machine(),
+             "cores": os.cpu_count(),
+             "repeats": repeats,
+             "results": results}
+    with open(filename, "w", encoding="utf8") as results_file:
+        json.dump(saved, results_file, indent=2)
+
+def compare_benchmark_results(old_results, new_results):
+    """
+    A function to compare two sets of suite results, for example from before and after a change
+
+    Parameters
+    ----------
+    old_results : dict
+        The "results" of an earlier saved run.
+    new_results : dict
+        The results returned by benchmark_suite.
+
+    Returns
+    -------
+    comparison : list
+        A list of [size, function name, old seconds, new seconds, new / old] for each timing in both.
+
+    """
+    comparison = []
+    for size, timings in new_results.items():
+        for name, seconds in timings.items():
+            if name in old_results.get(size, {}):
+                old_seconds = old_results[size][name]
+                comparison.append([size, name, old_seconds, seconds, seconds / old_seconds if old_seconds else float("inf")])
+
+    return comparison
+
+def print_extra_benchmarks():
+    """
+    A function to print the memory, frequency counting, parallel and incremental benchmarks
+
+    Returns
+    -------
+    None.
+
+    """
+    print("get_data load time:")
+    print(f"{'Rows':>10}{'Seconds':>12}{'us/row':>10}")
+    results = benchmark_get_data([7_000, 70_000, 500_000])
+    for rows, seconds, per_row in results:
+        print(f"{rows:>10}{seconds:>12.3f}{per_row:>10.2f}")
+    print()
+    #linear growth means the time per row stays roughly the same as the file gets bigger
+    print("Time per row at largest size / smallest size:", round(results[-1][2] / results[0][2], 2))
+    print()
+    print("Memory held per book in bytes:")
+    for name, bytes_per_book in benchmark_memory_per_book(70_000).items():
+        print(f"{name:>10}{bytes_per_book:>12.1f}")
+    print()
+    print("Frequency counting of 1,000,000 values in seconds:")
+    for name, seconds in benchmark_frequency_counting(1_000_000).items():
+        print(f"{name:>30}{seconds:>10.3f}")
+    print()
+    print(f"Parallel load and report of 1,000,000 rows ({os.cpu_count()} cores):")
+    print(f"{'Workers':>10}{'Seconds':>12}{'Speedup':>10}")
+    for workers, seconds, speedup in benchmark_parallel_ingestion(1_000_000):
+        print(f"{workers:>10}{seconds:>12.3f}{speedup:>10.2f}")
+    print()
+    print("Report of 1,000,000 rows before and after a 1% append in seconds:")
+    for name, seconds in benchmark_incremental_append(1_000_000).items():
+        print(f"{name:>10}{seconds:>12.3f}")
+
+def main(arguments=None):
+    """
+    A function to run the benchmark suite, save the results and compare them with an earlier run
+
+    Parameters
+    ----------
+    arguments : list
+        The command line arguments, taken from sys.argv when not given.
+
+    Returns
+    -------
+    exit_code : int
+        Zero on success.
+
+    """
+    parser = ArgumentParser(description="Benchmarks for the 7kBooks analysis program.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in BENCHMARK_SIZES), help="a comma separated list of numbers of rows")
+    parser.add_argument("--repeats", type=int, default=3, help="the number of times to call each function, keeping the fastest")
+    parser.add_argument("--output", default="benchmark_results.json", help="the JSON file to save the results to")
+    parser.add_argument("--compare", help="a JSON file saved by an earlier run to compare the results with")
+    parser.add_argument("--extra", action="store_true", help="also run the memory, frequency, parallel and incremental benchmarks")
+    options = parser.parse_args(arguments)
+
+    sizes = [int(size) for size in options.sizes.split(",")]
+    results = benchmark_suite(sizes, options.repeats)
+    names = list(results[str(sizes[0])])
+    print(f"{'Function':>30}" + "".join(f"{size:>12}" for size in sizes))
+    for name in names:
+        print(f"{name:>30}" + "".join(f"{results[str(size)][name]:>12.4f}" for size in sizes))
+    save_benchmark_results(results, options.output, options.repeats)
+    print()
+    print("Results saved to", options.output)
+
+    if options.compare:
+        with open(options.compare, encoding="utf8") as old_file:
+            old_results = json.load(old_file)["results"]
+        print()
+        print(f"{'Rows':>10}{'Function':>30}{'Old':>10}{'New':>10}{'Ratio':>8}")
+        for size, name, old_seconds, new_seconds, ratio in compare_benchmark_results(old_results, results):
+            #flag anything more than 10% slower than before
+            print(f"{size:>10}{name:>30}{old_seconds:>10.4f}{new_seconds:>10.4f}{ratio:>8.2f}" + ("  slower" if ratio > 1.1 else ""))
+
+    if options.extra:
+        print()
+        print_extra_benchmarks()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
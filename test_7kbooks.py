@@ -2,12 +2,25 @@
 print("This program tests functions in assignment part 3 using pytest")
 print()
 
-from pytest import approx
+from pytest import approx, raises
+from math import inf, isfinite
+import json
+import os
+import subprocess
+import sys
+import numpy as np
 from asl_assignment_part3_7kbooks import calculate_mean
 from asl_assignment_part3_7kbooks import calculate_standard_deviation
 from asl_assignment_part3_7kbooks import calculate_median
 from asl_assignment_part3_7kbooks import calculate_mode
 from asl_assignment_part3_7kbooks import calculate_correlation
+from asl_assignment_part3_7kbooks import calculate_correlation_matrix
+from asl_assignment_part3_7kbooks import get_ranks
+from asl_assignment_part3_7kbooks import bootstrap_book_statistics
+from asl_assignment_part3_7kbooks import bootstrap_batch
+from asl_assignment_part3_7kbooks import set_bootstrap_worker_columns
+from asl_assignment_part3_7kbooks import describe_books
+from asl_assignment_part3_7kbooks import describe_correlation
 from asl_assignment_part3_7kbooks import convert_list_of_strings_to_floats
 from asl_assignment_part3_7kbooks import convert_dictionary_values_to_int_from_string
 from asl_assignment_part3_7kbooks import count_of_unique_items_in_list
@@ -19,6 +32,50 @@ from asl_assignment_part3_7kbooks import get_fewest_pages_excluding_zero
 from asl_assignment_part3_7kbooks import get_most_recent_year
 from asl_assignment_part3_7kbooks import get_total_number_of_records_in_list
 from asl_assignment_part3_7kbooks import get_number_of_items_with_missing_information
+from asl_assignment_part3_7kbooks import get_data
+from asl_assignment_part3_7kbooks import get_oldest_year
+from asl_assignment_part3_7kbooks import get_total_of_records
+from asl_assignment_part3_7kbooks import BookTable
+from asl_assignment_part3_7kbooks import load_book_table
+from asl_assignment_part3_7kbooks import get_cache_filename
+from asl_assignment_part3_7kbooks import build_report
+from asl_assignment_part3_7kbooks import format_report
+from asl_assignment_part3_7kbooks import write_results_file
+from asl_assignment_part3_7kbooks import main
+from asl_assignment_part3_7kbooks import split_file_into_ranges
+from asl_assignment_part3_7kbooks import aggregate_books_in_parallel
+from asl_assignment_part3_7kbooks import build_report_from_aggregates
+from asl_assignment_part3_7kbooks import load_book_aggregates
+from asl_assignment_part3_7kbooks import get_aggregate_state_filename
+from asl_assignment_part3_7kbooks import get_visualizations
+from asl_assignment_part3_7kbooks import render_visualizations
+from asl_assignment_part3_7kbooks import get_density_grid
+from asl_assignment_part3_7kbooks import display_density_plot
+from asl_assignment_part3_7kbooks import get_chart_key
+from asl_assignment_part3_7kbooks import display_published_years
+from asl_assignment_part3_7kbooks import profile_stage
+from asl_assignment_part3_7kbooks import is_headless
+from asl_assignment_part3_7kbooks import RunningMoments
+from asl_assignment_part3_7kbooks import describe
+from asl_assignment_part3_7kbooks import TDigest
+from asl_assignment_part3_7kbooks import summarize_books_out_of_core
+from asl_assignment_part3_7kbooks import get_frequency_table
+from asl_assignment_part3_7kbooks import get_most_common_items
+from asl_assignment_part3_7kbooks import top_k
+from asl_assignment_part3_7kbooks import StageProfiler
+from asl_assignment_part3_7kbooks import AnalysisSession
+from asl_assignment_part3_7kbooks import TitleIndex
+from asl_assignment_part3_7kbooks import PageIndex
+from asl_assignment_part3_7kbooks import BookFilter
+from asl_assignment_part3_7kbooks import parse_book_filter
+from asl_assignment_part3_7kbooks import get_titles_with_same_number_pages_as_mean
+from asl_assignment_part3_7kbooks import SearchIndex
+from asl_assignment_part3_7kbooks import load_search_index
+from asl_assignment_part3_7kbooks import tokenize
+from asl_assignment_part3_7kbooks import group_books
+
+#a test csv file header used in multiple tests below
+test_header = "isbn13,isbn10,title,subtitle,authors,categories,thumbnail,description,published_year,average_rating,num_pages,ratings_count\n"
 
 #a test dictionary used in multiple tests below
 test_dict = {"Book 1": 123, "Book 2": 153, "Book 3": 103, "Book 4": 236, "Book 5": 341, "Book 6": 384,
@@ -40,12 +97,415 @@ def test_calculate_median():
 def test_calculate_mode():
     assert calculate_mode([23, 67, 54, 54, 90, 6, 32, 54, 1, 2, 3, 67]) == 54
 
+def test_calculations_on_arrays():
+    assert calculate_mean(np.array([1, 3, 5, 7, 9], dtype=np.int32)) == 5
+    assert calculate_standard_deviation(np.array([1.0, 3, 5, 7, 9])) == approx((2.828), 0.001)
+    assert calculate_median(np.array([1, 2, 4, 3])) == 2.5
+    assert calculate_mode(np.array([0, 0, 0, 67, 54, 54, 90, 54, 67])) == 54
+    assert calculate_correlation(np.array([1, 4, 6, 3, 16]), np.array([31, 24, 4, 14, 36])) == approx((0.3785), 0.001)
+
 def test_calculate_correlation():
     list_one = [1, 4, 6, 3, 16]
     list_two = [31, 24, 4, 14, 36]
     assert calculate_correlation(list_one, list_two) == approx((0.3785), 0.001)
     
+def test_calculate_correlation_matrix():
+    x = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    y = np.array([2.0, 1.0, 4.0, 3.0, 7.0, 5.0])
+    z = np.array([5.0, 5.0, 5.0, 1.0, 9.0, 5.0])
+    missing = [np.zeros(6, dtype=bool), np.array([False, False, True, False, False, False]), np.zeros(6, dtype=bool)]
+    correlation_matrix = calculate_correlation_matrix([x, y, z], missing, chunk_rows=4)
+    #each pair only uses the rows where both values are present
+    present = ~missing[1]
+    assert correlation_matrix[0, 1] == approx(calculate_correlation(x[present], y[present]))
+    assert correlation_matrix[1, 2] == approx(calculate_correlation(y[present], z[present]))
+    assert correlation_matrix[0, 2] == approx(calculate_correlation(x, z))
+    assert np.diag(correlation_matrix).tolist() == [1.0, 1.0, 1.0]
+    assert calculate_correlation_matrix([x, np.exp(x)], method="spearman")[0, 1] == approx(1.0)
+    assert np.isnan(calculate_correlation_matrix([x, np.ones(6)])[0, 1])
+    assert get_ranks(np.array([30, 10, 20, 10]), np.array([False, False, False, True])).tolist() == [3.0, 1.0, 2.0, 0.0]
+    assert get_ranks(np.array([5, 1, 5, 2])).tolist() == [3.5, 1.0, 3.5, 2.0]
+
+def test_bootstrap_batch():
+    random_numbers = np.random.default_rng(3)
+    columns = {"pages": random_numbers.integers(0, 500, 41), "average_rating": random_numbers.integers(0, 50, 41) / 10,
+               "number_of_ratings": random_numbers.integers(0, 9, 41)}
+    set_bootstrap_worker_columns(columns)
+    statistics = bootstrap_batch(np.random.SeedSequence(5), 3)
+    #the counting shortcuts give the same statistics as describing each resample
+    rows = np.random.default_rng(np.random.SeedSequence(5)).integers(0, 41, size=(3, 41), dtype=np.int32)
+    for resample in range(3):
+        expected = describe_books(*(columns[name][rows[resample]] for name in columns))
+        for name in columns:
+            for statistic in ("mean", "median", "standard_deviation"):
+                assert statistics[name][statistic][resample] == approx(expected[name][statistic])
+        assert statistics["correlation"][resample] == approx(expected["correlation"])
+
+def test_bootstrap_book_statistics(monkeypatch):
+    book_table = BookTable(pages=np.arange(1, 101) * 3, years=np.full(100, 2000), average_ratings=np.linspace(3, 5, 100) ** 2,
+                           number_of_ratings=np.arange(100) % 7 + 1, title_codes=np.arange(100), titles=[str(i) for i in range(100)])
+    #small batches so the resamples are spread over several batches
+    monkeypatch.setattr("asl_assignment_part3_7kbooks.BOOTSTRAP_BATCH_VALUES", 3000)
+    intervals = bootstrap_book_statistics(book_table, resamples=200, seed=11, workers=1)
+    assert intervals == bootstrap_book_statistics(book_table, resamples=200, seed=11, workers=2)
+    book_statistics = describe_books(book_table.pages, book_table.average_ratings, book_table.number_of_ratings)
+    for name in ("pages", "average_rating", "number_of_ratings"):
+        for statistic in ("mean", "median", "standard_deviation"):
+            lower, upper = intervals[name][statistic]
+            assert lower <= book_statistics[name][statistic] <= upper
+    assert intervals["correlation"][0] <= book_statistics["correlation"] <= intervals["correlation"][1]
+    #no books leaves nothing to resample
+    no_books = BookTable([], [], [], [], [], [])
+    assert bootstrap_book_statistics(no_books, resamples=10, seed=1, workers=2)["pages"]["mean"] == [None, None]
+
+def test_describe_correlation():
+    assert describe_correlation(0.22) == "a weak positive correlation"
+    assert describe_correlation(-0.6) == "a strong negative correlation"
+    assert describe_correlation(0.22, [-0.01, 0.4]) == "no clear correlation"
+
+def test_load_book_table_cache(tmp_path, monkeypatch):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header +
+                          "1,1,Book 1,,A,Fiction,,Text,2004,3.85,247,361\n"
+                          "2,2,Book+ 2,,B,Fiction,,Text,,,,\n", encoding="utf8")
+    first_load = load_book_table(books_file)
+    assert (tmp_path / "books.csv.cache").exists() and get_cache_filename(books_file).endswith("books.csv.cache")
+    #a load from the cache only compares the size and modification time, without hashing the csv file
+    with monkeypatch.context() as patch:
+        patch.setattr("hashlib.file_digest", lambda *arguments: 1 / 0)
+        cached_load = load_book_table(books_file)
+    assert cached_load.pages.tolist() == first_load.pages.tolist()
+    assert cached_load.average_ratings_missing.tolist() == [False, True]
+    assert cached_load.titles == ["Book 1", "Book, 2"]
+    #changing the file must rebuild the cache
+    with open(books_file, "a", encoding="utf8") as books:
+        books.write("3,3,Book 3,,C,Fiction,,Text,1999,4.5,120,12\n")
+    assert load_book_table(books_file).pages.tolist() == [247, 0, 120]
+    #a file with no books is cached too
+    books_file.write_text(test_header, encoding="utf8")
+    load_book_table(books_file)
+    assert len(load_book_table(books_file)) == 0
+
+def test_build_report():
+    book_table = BookTable([100, 300, 0], [2004, 0, 1999], [4.0, 3.0, 0.0], [10, 0, 5], [0, 1, 2], ["Book 1", "Book 2", "Book 3"])
+    report = build_report(book_table, ["book", "additional"])
+    assert list(report) == ["book", "additional"]
+    assert report["book"]["total_pages"] == 400
+    assert report["book"]["oldest_year"] == 1999
+    assert report["additional"]["book_with_most_pages"] == "Book 2"
+    assert report["additional"]["top_ten_longest_books"] == [[300, "Book 2"], [100, "Book 1"], [0, "Book 3"]]
+    assert "book,total_books,3" in format_report(report, "csv")
+    assert "book.books_with_no_reviews: 1" in format_report(report, "text")
+    correlation = build_report(book_table, ["correlation"])["correlation"]
+    assert correlation["pearson"]["pages"]["average_rating"] == approx(-1.0)
+    #only the first book has both pages and a year
+    assert correlation["spearman"]["pages"]["year"] is None
+
+def test_main_report(tmp_path):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header +
+                          "1,1,Book 1,,A,Fiction,,Text,2004,3.85,247,361\n"
+                          "2,2,Book 2,,B,Fiction,,Text,1999,4.5,120,12\n", encoding="utf8")
+    results_file = tmp_path / "results.json"
+    assert main(["report", "--input", str(books_file), "--format", "json", "--sections", "stats", "--output", str(results_file)]) == 0
+    report = json.loads(results_file.read_text())
+    assert list(report) == ["stats"]
+    assert report["stats"]["pages"]["mean"] == approx(183.5)
+
+def reject_json_constant(constant):
+    raise ValueError(f"{constant} is not valid JSON")
+
+def test_main_report_with_no_books(tmp_path):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header, encoding="utf8")
+    results_file = tmp_path / "results.json"
+    #the saved aggregates and the columns must both give valid JSON, with null where there is nothing to work out
+    for options in ([], ["--no-cache", "--sections", "book,stats,additional,correlation"]):
+        assert main(["report", "--input", str(books_file), "--format", "json", "--output", str(results_file)] + options) == 0
+        report = json.loads(results_file.read_text(), parse_constant=reject_json_constant)
+        assert report["book"]["total_books"] == 0
+        assert report["stats"]["pages"]["mean"] is None and report["stats"]["correlation"] is None
+        assert report["additional"]["book_with_most_pages"] is None
+
+def test_report_writers(tmp_path):
+    book_table = BookTable([100, 300, 0], [2004, 0, 1999], [4.0, 3.0, 0.0], [10, 0, 5], [0, 1, 2], ["Book 1", "Book | 2", "Book 3"])
+    report = build_report(book_table)
+    markdown = format_report(report, "markdown")
+    assert "## stats\n\n| Name | Value |\n| --- | --- |\n| pages.count | 3 |\n" in markdown
+    assert "| book_with_most_pages | Book \\| 2 |" in markdown
+    results = format_report(report, "results")
+    assert results.startswith("          Statistical Analysis Results\n" + "=" * 48 + "\n\nBook Page Number Statistics:\n")
+    assert "Mean of book pages: 133\n" in results
+    assert "Mean of average rating: 2.33\n" in results
+    assert results.endswith("------------------------------------------------\nThe original source file can be found here:\n\n"
+                            "https://www.kaggle.com/dylanjcastillo/7k-books-with-metadata")
+    #the results file is the results layout written in one go, with no temporary file left behind
+    results_file = tmp_path / "7kBooks_Results.txt"
+    write_results_file(report["stats"], str(results_file))
+    assert results_file.read_text(encoding="utf8") == results
+    assert os.listdir(tmp_path) == ["7kBooks_Results.txt"]
+
+def test_analysis_session():
+    book_table = BookTable([100, 300, 0], [2004, 0, 1999], [4.0, 3.0, 0.0], [10, 0, 5], [0, 1, 2], ["Book 1", "Book 2", "Book 3"])
+    session = AnalysisSession(book_table)
+    report = build_report(book_table)
+    assert session.book_information == report["book"]
+    assert session.additional_analysis == report["additional"]
+    #results are only worked out once
+    assert session.book_statistics is session.book_statistics
+    assert session.top_ten_longest_books == {"Book 2": 300, "Book 1": 100, "Book 3": 0}
+    #and the books they came from cannot be changed
+    with raises((TypeError, ValueError)):
+        session.title_and_pages["Book 1"] = 5
+    with raises(ValueError):
+        session.book_table.pages[0] = 5
+    #while the table the session was given is left alone
+    assert book_table.pages.flags.writeable
+    book_table.pages[2] = 5
+
+def test_title_index():
+    title_index = TitleIndex(["Gilead", "The One Tree", "the one  tree", "The Ones"], [0, 1, 2, 0, 3, 1])
+    assert title_index.find("Gilead", case_sensitive=True) == [0, 3]
+    assert title_index.find("gilead", case_sensitive=True) == []
+    assert title_index.find("THE ONE TREE") == [1, 2, 5]
+    assert title_index.complete("the one") == ["The One Tree", "the one  tree", "The Ones"]
+    assert title_index.complete("the one", limit=1) == ["The One Tree"]
+    assert title_index.complete("x") == []
+
+def test_page_index():
+    title_and_pages = {"A": "300", "B": "", "C": 120, "D": "300", "E": "450"}
+    page_index = PageIndex(title_and_pages)
+    assert page_index.find(300) == [0, 3]
+    assert page_index.find(301) == []
+    assert page_index.find_nearest(200) == (120, [2])
+    #the smaller number of pages is chosen when two are equally close
+    assert page_index.find_nearest(375) == (300, [0, 3])
+    assert page_index.find_nearest(1000) == (450, [4])
+    assert page_index.find_range(100, 300) == [2, 0, 3]
+    assert page_index.find_range(500, 400) == []
+    #the index gives the same titles as checking every title
+    assert (get_titles_with_same_number_pages_as_mean(None, title_and_pages, 299.6, page_index) ==
+            get_titles_with_same_number_pages_as_mean(None, title_and_pages, 299.6) == [["300", "A"], ["300", "D"]])
+
+def test_book_filter(monkeypatch):
+    book_table = BookTable(pages=[100, 250, 0, 300, 380], years=[1995, 1991, 2000, 0, 2001], average_ratings=[4.0, 3.5, 3.0, 4.5, 2.0],
+                           number_of_ratings=[500, 50, 120, 900, 300], title_codes=[0, 1, 2, 1, 3], titles=["A", "B", "C", "D"])
+    book_filter = BookFilter().where("years", 1990, 2000).where("pages", 200)
+    #empty values are never inside a range
+    assert book_filter.get_rows(book_table).tolist() == [1]
+    assert (book_filter & BookFilter({"number_of_ratings": (100, None)})).get_rows(book_table).tolist() == []
+    assert parse_book_filter("years=:2001, pages=200:400").ranges == {"years": (None, 2001.0), "pages": (200.0, 400.0)}
+    #the sorted indexes give the same rows as the masks, using them for every range however wide
+    monkeypatch.setattr("asl_assignment_part3_7kbooks.INDEX_SELECTIVITY", 1.01)
+    for lowest, highest in ((0, 1000), (120, 120), (301, 1000), (50.5, 299.5), (-inf, inf), (inf, None), (None, -inf), (1e300, None)):
+        range_filter = BookFilter().where("number_of_ratings", lowest, highest).where("average_ratings", 2.5)
+        with_indexes = range_filter.get_rows(book_table, use_indexes=True).tolist()
+        assert with_indexes == range_filter.get_rows(book_table).tolist()
+        assert book_table.get_column_index("number_of_ratings").find_range(lowest, highest).tolist() == \
+            np.flatnonzero((book_table.number_of_ratings >= (-inf if lowest is None else lowest)) &
+                           (book_table.number_of_ratings <= (inf if highest is None else highest))).tolist()
+    #the filtered table can be used like any other
+    filtered_table = BookFilter().where("pages", 200, 400).apply(book_table)
+    assert calculate_mean(filtered_table.pages) == approx(310)
+    assert filtered_table.title_page_dict() == {"B": 250, "D": 380}
+    assert filtered_table.titles is book_table.titles
+    with raises(ValueError):
+        parse_book_filter("colour=1:2")
+    assert parse_book_filter("pages=-inf:inf").get_rows(book_table, use_indexes=True).tolist() == [0, 1, 3, 4]
+    with raises(ValueError):
+        parse_book_filter("pages=nan:")
+
+def test_tokenize():
+    assert tokenize("A NOVEL+ of Love") == ["a", "novel", "of", "love"]
+
+def test_search_index(tmp_path, monkeypatch):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header +
+                          "1,1,Dragon Tales,,A,Fiction,,A story about a dragon+ a dragon and magic,2004,3.85,247,361\n"
+                          "2,2,Gardens,A Guide,B,Garden,,Growing roses in a small garden,1999,4.5,120,12\n"
+                          "3,3,Magic,,C,Fiction,,The magic of dragon riders in a long long long long long story,2001,4.1,300,50\n", encoding="utf8")
+    search_index = load_search_index(books_file)
+    assert [search_index.get_title(document) for document, score in search_index.search("dragon")] == ["Dragon Tales", "Magic"]
+    assert search_index.search("roses")[0][0] == 1
+    assert search_index.search("unicorn") == []
+    #the saved index gives the same results
+    assert os.path.exists(str(books_file) + ".search")
+    with monkeypatch.context() as patch:
+        patch.setattr("hashlib.file_digest", lambda *arguments: 1 / 0)
+        assert load_search_index(books_file).search("dragon magic") == search_index.search("dragon magic")
+
+def test_search_index_postings():
+    #gaps of up to 255, 65535 and above are stored in 1, 2 and 4 bytes
+    documents = np.array([0, 5, 9, 300, 70000, 3, 1000], dtype=np.int64)
+    search_index = SearchIndex.from_postings(["a", "b", "c"], np.array([0, 3, 5, 7]), documents, np.ones(7, dtype=np.uint8),
+                                             np.ones(100001, dtype=np.uint32), np.zeros(100001, dtype=np.int32), ["Book"])
+    assert search_index.gap_widths.tolist() == [1, 4, 2]
+    assert search_index.get_postings(0)[0].tolist() == [0, 5, 9]
+    assert search_index.get_postings(1)[0].tolist() == [300, 70000]
+    assert search_index.get_postings(2)[0].tolist() == [3, 1000]
+    #an index whose books have no length still ranks every match with a finite score
+    search_index = SearchIndex.from_postings(["a"], np.array([0, 2]), np.array([0, 1]), np.ones(2, dtype=np.uint8),
+                                             np.zeros(2, dtype=np.uint32), np.zeros(2, dtype=np.int32), ["Book"])
+    results = search_index.search("a")
+    assert [document for document, score in results] == [0, 1] and all(isfinite(score) for document, score in results)
+
+def test_group_books(tmp_path):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header +
+                          "1,1,A,,Ann Lee;Bob Ray,Fiction,,Text,2004,4.0,100,10\n"
+                          "2,2,B,,Bob Ray,Fiction,,Text,2004,3.0,200,20\n"
+                          "3,3,C,,Bob Ray;Bob Ray,History,,Text,2004,,50,\n"
+                          "4,4,D,,,Arts+ Crafts,,Text,2004,5.0,,5\n", encoding="utf8")
+    for chunk_rows in (1, 100):
+        groups = group_books(books_file, chunk_rows=chunk_rows)
+        authors = groups["authors"]
+        assert authors.names == ["Ann Lee", "Bob Ray", "Unknown"]
+        #a book with several authors counts once for each author
+        assert authors.describe(1) == {"books": 3, "rated_books": 2, "mean_rating": approx(3.5), "rating_standard_deviation": approx(0.5),
+                                       "total_pages": 350, "total_ratings": 30}
+        assert groups["categories"].names == ["Fiction", "History", "Arts, Crafts"]
+        assert groups["categories"].describe(1)["mean_rating"] is None
+    assert list(authors.get_top_groups(2)) == ["Bob Ray", "Ann Lee"]
+    assert list(authors.get_top_groups(2, sort_by="mean_rating")) == ["Unknown", "Ann Lee"]
+    assert list(authors.get_top_groups(5, sort_by="mean_rating", min_books=2)) == ["Bob Ray"]
+
+def test_split_file_into_ranges(tmp_path):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header + "".join(f"{i},{i},Book {i},,A,Fiction,,Text,2004,3.85,{i},361\n" for i in range(50)), encoding="utf8")
+    ranges = split_file_into_ranges(books_file, 4)
+    assert ranges[0][0] == len(test_header) and ranges[-1][1] == books_file.stat().st_size
+    contents = books_file.read_bytes()
+    for start, end in ranges:
+        assert contents[start - 1:start] == b"\n"
+    assert all(first[1] == second[0] for first, second in zip(ranges, ranges[1:]))
+
+def test_aggregate_books_in_parallel(tmp_path):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header + "".join(f"{i},{i},Book {i % 7},,A,Fiction,,Text,{1990 + i % 5},{i % 5}.5,{(i * 37) % 101},{i * 3}\n"
+                                                for i in range(60)), encoding="utf8")
+    expected = build_report(BookTable.from_csv(books_file))
+    for workers in (1, 3):
+        report = build_report_from_aggregates(aggregate_books_in_parallel(books_file, workers, chunk_rows=7))
+        assert report["book"] == expected["book"]
+        assert report["additional"] == expected["additional"]
+        for name in ("pages", "average_rating", "number_of_ratings"):
+            assert report["stats"][name] == approx(expected["stats"][name])
+        assert report["stats"]["correlation"] == approx(expected["stats"]["correlation"])
+    #a file with no books has no largest page number
+    books_file.write_text(test_header, encoding="utf8")
+    assert build_report_from_aggregates(aggregate_books_in_parallel(books_file, 1), ["book"])["book"]["most_pages"] == 0
+
+def test_load_book_aggregates_after_append(tmp_path, monkeypatch):
+    books_file = tmp_path / "books.csv"
+    rows = [f"{i},{i},Book {i % 9},,A,Fiction,,Text,{1990 + i % 5},{i % 5}.5,{(i * 37) % 101},{i * 3}\n" for i in range(40)]
+    books_file.write_text(test_header + "".join(rows[:30]), encoding="utf8")
+    load_book_aggregates(books_file)
+    assert os.path.exists(get_aggregate_state_filename(books_file))
+    #appended rows are merged into the saved aggregates
+    with open(books_file, "a", encoding="utf8") as books:
+        books.write("".join(rows[30:]))
+    expected = build_report(BookTable.from_csv(books_file))
+    aggregates = load_book_aggregates(books_file)
+    #the saved titles are only read when they are needed
+    assert aggregates.saved_titles is not None
+    report = build_report_from_aggregates(aggregates)
+    assert report["book"] == expected["book"] and report["additional"] == expected["additional"]
+    #titles added to the log by a run that stopped before saving its aggregates are left out
+    with open(books_file.with_name("books.csv.titles"), "ab") as titles_file:
+        titles_file.write(b"Book Y\n\0\0\0\0\0\0\0\0")
+    assert load_book_aggregates(books_file).title_and_pages == BookTable.from_csv(books_file).title_page_dict()
+    with open(books_file, "a", encoding="utf8") as books:
+        books.write("99,99,Book Z,,A,Fiction,,Text,2001,4.5,10,3\n")
+    assert load_book_aggregates(books_file).title_and_pages == BookTable.from_csv(books_file).title_page_dict()
+    assert report["stats"]["pages"] == approx(expected["stats"]["pages"])
+    assert report["stats"]["correlation"] == approx(expected["stats"]["correlation"])
+    #changing an earlier row means the whole file is read again
+    books_file.write_text(test_header + rows[0].replace("Book 0", "Book X") + "".join(rows[1:]), encoding="utf8")
+    assert "Book X" in load_book_aggregates(books_file).title_and_pages
+    #including a row in the middle, well away from the first and last block that is hashed
+    monkeypatch.setattr("asl_assignment_part3_7kbooks.AGGREGATE_CHECK_BYTES", 64)
+    load_book_aggregates(books_file)
+    books_file.write_text(test_header + "".join(rows[:20]) + rows[20].replace("Book 2", "Book W") + "".join(rows[21:]), encoding="utf8")
+    assert "Book W" in load_book_aggregates(books_file).title_and_pages
+    #so does shortening the file
+    books_file.write_text(test_header + "".join(rows[:5]), encoding="utf8")
+    assert load_book_aggregates(books_file).rows == 5
+
+def test_describe():
+    statistics = describe([0, 23, 67, 54, 54, 90, 6, 32, 54, 1, 2, 3, 67])
+    assert statistics["count"] == 13
+    assert statistics["missing"] == 1
+    assert statistics["mean"] == approx(calculate_mean([0, 23, 67, 54, 54, 90, 6, 32, 54, 1, 2, 3, 67]))
+    assert statistics["standard_deviation"] == approx(calculate_standard_deviation([0, 23, 67, 54, 54, 90, 6, 32, 54, 1, 2, 3, 67]))
+    assert statistics["mode"] == 54
+    assert statistics["median"] == 32
+    assert statistics["min"] == 0 and statistics["max"] == 90
+    assert describe([1, 2, 4, 3])["median"] == 2.5
+
+def test_running_moments_merge():
+    first = RunningMoments()
+    for value in [1, 3, 5]:
+        first.update(value)
+    second = RunningMoments()
+    second.update_array(np.array([7, 9]))
+    first.merge(second)
+    assert first.count == 5
+    assert first.mean == approx(5)
+    assert first.standard_deviation == approx((2.828), 0.001)
+    assert first.minimum == 1 and first.maximum == 9
+
+def test_tdigest_quantiles():
+    values = np.random.default_rng(1).permutation(np.arange(100_001, dtype=np.float64))
+    first = TDigest(compression=100)
+    second = TDigest(compression=100)
+    for chunk in np.array_split(values, 20):
+        first.update_array(chunk[: len(chunk) // 2])
+        second.update_array(chunk[len(chunk) // 2:])
+    first.merge(second)
+    assert first.count == 100_001
+    assert len(first.means) <= 110
+    assert first.quantile(0.5) == approx(50_000, rel=0.01)
+    assert first.quantile(0.99) == approx(99_000, rel=0.01)
+    assert first.quantile(0) == 0 and first.quantile(1) == 100_000
+
+def test_summarize_books_out_of_core(tmp_path):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header +
+                          "1,1,Book 1,,A,Fiction,,Text,2004,3.85,247,361\n"
+                          "2,2,Book 2,,B,Fiction,,Text,,,,\n"
+                          "3,3,Book 3,,C,Fiction,,Text,1999,4.5,120,12\n", encoding="utf8")
+    summary = summarize_books_out_of_core(books_file, chunk_rows=2)
+    statistics = describe([247, 0, 120])
+    for name in ("count", "missing", "mean", "standard_deviation", "min", "max"):
+        assert summary["pages"][name] == approx(statistics[name])
+    assert summary["number_of_ratings"]["max"] == 361
+
 #tests for functions used in processing data
+
+def test_get_data(tmp_path):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header +
+                          "1,1,Book 1,,A,Fiction,,Text,2004,3.85,247,361\n"
+                          "2,2,Book+ 2,,B,Fiction,,Text,,,,\n", encoding="utf8")
+    assert get_data(books_file) == ([247.0, 0.0], ["2004", "Unknown"], [3.85, 0.0], [361.0, 0.0],
+                                    {"Book 1": "247", "Book, 2": ""})
+
+def test_book_table_from_csv(tmp_path):
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header +
+                          "1,1,Book 1,,A,Fiction,,Text,2004,3.85,247,361\n"
+                          "2,2,Book+ 2,,B,Fiction,,Text,,,,\n"
+                          "3,3,Book 1,,C,Fiction,,Text,1999,4.5,0,12\n", encoding="utf8")
+    book_table = BookTable.from_csv(books_file)
+    assert len(book_table) == 3
+    assert book_table.pages.dtype == np.int32 and book_table.average_ratings.dtype == np.float64
+    assert book_table.pages.tolist() == [247, 0, 0]
+    assert book_table.years.tolist() == [2004, 0, 1999]
+    assert book_table.years_missing.tolist() == [False, True, False]
+    #a zero in the file is a value, only empty fields are missing
+    assert book_table.pages_missing.tolist() == [False, True, False]
+    assert book_table.title_codes.tolist() == [0, 1, 0]
+    assert book_table.title_page_dict() == {"Book 1": 247, "Book, 2": 0}
     
 def test_convert_dictionary_values_to_int_from_string():
     test_dict = {"Book 1": "247", "Book 2": "123", "Book 3": "354"}
@@ -57,6 +517,13 @@ def test_convert_list_of_strings_to_floats():
 def test_count_of_unique_items_in_list():
     assert count_of_unique_items_in_list([1, 1, 3, 5, 5, 3, 2, 4, 5, 4]) == [[1, 2], [3, 2], [5, 3], [2, 1], [4, 2]]
 
+def test_get_frequency_table():
+    assert get_frequency_table(["2004", "Unknown", "2004", "1999"]) == {"2004": 2, "Unknown": 1, "1999": 1}
+    assert list(get_frequency_table(np.array([5, 1, 5]))) == [5, 1]
+
+def test_get_most_common_items():
+    assert get_most_common_items([1, 1, 3, 5, 5, 3, 2, 4, 5, 4], 3) == [[5, 3], [1, 2], [3, 2]]
+
 #tests for functions specific to getting information on books and titles
 
 def test_get_max_value():
@@ -71,25 +538,168 @@ def test_get_fewest_pages_excluding_zero():
 def test_get_most_recent_year():
     assert get_most_recent_year([1990, 1987, 1986, 2019, 2014, 2007, 1965, 1987, 1912]) == 2019
 
+def test_get_oldest_year():
+    assert get_oldest_year(["1990", "Unknown", "1912", "2019"]) == 1912
+    assert get_oldest_year(np.array([1990, 0, 1912, 2019])) == 1912
+
+def test_get_total_of_records():
+    assert get_total_of_records(np.array([2_000_000_000, 2_000_000_000], dtype=np.int32)) == 4_000_000_000
+
+def test_helpers_on_arrays():
+    assert get_max_value(np.array([1, 4, 5, 8, 6, 2, 3, 7])) == 8
+    assert get_fewest_pages_excluding_zero(np.array([120, 101, 0, 0, 145])) == 101
+    assert get_most_recent_year(np.array([1990, 0, 2019, 1912])) == 2019
+    assert get_number_of_items_with_missing_information(np.array([0, 2, 5, 0, 43])) == 2
+    assert count_of_unique_items_in_list(np.array([1, 1, 3, 5, 5, 3, 2, 4, 5, 4])) == [[1, 2], [3, 2], [5, 3], [2, 1], [4, 2]]
+
 def test_get_top_ten_longest_books():
     assert get_top_ten_longest_books(test_dict) == {"Book 15": 1123, "Book 17": 653, "Book 10": 563, "Book 9": 524,
                                          "Book 13": 423, "Book 6": 384, "Book 14": 342, "Book 5": 341, 
                                          "Book 8": 244, "Book 4": 236}
     
+def test_top_k():
+    assert top_k([5, 9, 1, 9, 3], 3) == [(1, 9), (3, 9), (0, 5)]
+    assert top_k([5, 9, 1, 9, 3], 2, ascending=True) == [(2, 1), (4, 3)]
+    assert top_k(np.array([5, 9, 1, 9, 3]), 3) == [(1, 9), (3, 9), (0, 5)]
+    assert top_k(np.array([4.5, 3.2, 4.5, 1.0]), 2, ascending=True) == [(3, 1.0), (1, 3.2)]
+    assert top_k({"Book 1": "90", "Book 2": "100", "Book 3": ""}, 2, key=lambda pages: int(pages or 0)) == [("Book 2", "100"), ("Book 1", "90")]
+
 def test_get_book_with_fewest_pages():
     assert get_book_with_fewest_pages(test_dict) == "Book 7"
+    #the last of the tied titles is chosen, and none when no book has any pages
+    assert get_book_with_fewest_pages({"a": "5", "b": "5", "c": "9"}) == "B"
+    assert get_book_with_fewest_pages({"a": "0", "b": ""}) is None
     
 def test_get_book_with_most_pages():
     assert get_book_with_most_pages(test_dict) == "Book 15"
     
+def test_page_lookups_leave_dictionary_unchanged():
+    title_and_pages = {"book a": "120", "book b": "", "book c": "95"}
+    assert get_book_with_most_pages(title_and_pages) == "book a"
+    assert get_book_with_fewest_pages(title_and_pages) == "Book C"
+    assert title_and_pages == {"book a": "120", "book b": "", "book c": "95"}
+
 def test_get_number_of_items_with_missing_information():
     assert get_number_of_items_with_missing_information([0, 2, 5, 67, 22, 0, 5, 7, 0, 0, 43]) == 4
-    
 
- 
+#tests for drawing the visualizations
 
-    
-    
+def test_render_visualizations(tmp_path):
+    book_table = BookTable([100, 300, 0, 250], [2004, 0, 1999, 2004], [4.0, 3.0, 0.0, 3.5], [10, 0, 5, 7], [0, 1, 2, 3],
+                           ["Book 1", "Book 2", "Book 3", "Book 4"])
+    visualizations = get_visualizations(book_table.years, book_table.pages, book_table.average_ratings,
+                                        book_table.number_of_ratings, book_table.title_page_dict())
+    chart_seconds = render_visualizations(visualizations, tmp_path, workers=2)
+    assert list(chart_seconds) == [name for name, display_function, arguments in visualizations]
+    for name in chart_seconds:
+        assert (tmp_path / name).stat().st_size > 0
 
-    
+def test_render_cache(tmp_path):
+    book_table = BookTable([100, 300, 0, 250], [2004, 0, 1999, 2004], [4.0, 3.0, 0.0, 3.5], [10, 0, 5, 7], [0, 1, 2, 3],
+                           ["Book 1", "Book 2", "Book 3", "Book 4"])
+    visualizations = get_visualizations(book_table.years, book_table.pages, book_table.average_ratings,
+                                        book_table.number_of_ratings, book_table.get_longest_titles())
+    render_visualizations(visualizations, tmp_path, workers=1)
+    #unchanged charts are not drawn again
+    assert set(render_visualizations(visualizations, tmp_path, workers=1).values()) == {None}
+    #only the charts whose data changed, or whose png file was changed, are drawn again
+    visualizations[1][2] = (book_table.pages + 1,)
+    (tmp_path / visualizations[5][0]).write_bytes(b"")
+    chart_seconds = render_visualizations(visualizations, tmp_path, workers=1)
+    assert [name for name, seconds in chart_seconds.items() if seconds is not None] == [visualizations[1][0], visualizations[5][0]]
+    assert (tmp_path / visualizations[5][0]).stat().st_size > 0
+    assert get_chart_key(visualizations[0][1], (book_table.years.copy(),)) == get_chart_key(*visualizations[0][1:])
+    assert get_chart_key(visualizations[0][1], (book_table.years[::-1],)) != get_chart_key(*visualizations[0][1:])
+
+def get_test_chart_text():
+    return "old"
+
+def get_new_test_chart_text():
+    return "new"
+
+@profile_stage
+def draw_test_chart(filename, show):
+    #a stand-in for a display function that draws what a helper gives it
+    with open(filename, "w", encoding="utf8") as chart:
+        chart.write(get_test_chart_text())
+
+def test_render_cache_after_chart_change(tmp_path, monkeypatch):
+    visualizations = [["test_chart.png", draw_test_chart, ()]]
+    render_visualizations(visualizations, tmp_path, workers=1)
+    assert render_visualizations(visualizations, tmp_path, workers=1)["test_chart.png"] is None
+    #changing a function the chart calls must draw the chart again
+    monkeypatch.setattr(sys.modules[__name__], "get_test_chart_text", get_new_test_chart_text)
+    assert render_visualizations(visualizations, tmp_path, workers=1)["test_chart.png"] is not None
+    assert (tmp_path / "test_chart.png").read_text(encoding="utf8") == "new"
+    #the same goes for the helpers the real charts call
+    key = get_chart_key(display_published_years, (np.array([2004, 2004, 1999]),))
+    monkeypatch.setattr("asl_assignment_part3_7kbooks.get_most_common_items", get_new_test_chart_text)
+    assert get_chart_key(display_published_years, (np.array([2004, 2004, 1999]),)) != key
+
+def test_get_density_grid():
+    random_numbers = np.random.default_rng(2)
+    pages = random_numbers.integers(0, 1200, 5000)
+    ratings = np.round(random_numbers.uniform(0, 5, 5000), 2)
+    counts, x_edges, y_edges = get_density_grid(pages, ratings, bins=(40, 20))
+    expected_counts, expected_x_edges, expected_y_edges = np.histogram2d(pages, ratings, bins=(40, 20))
+    assert counts.tolist() == expected_counts.T.astype(int).tolist()
+    assert x_edges == approx(expected_x_edges) and y_edges == approx(expected_y_edges)
+    assert get_density_grid([5, 5], [3.0, 3.0], bins=(4, 2))[0].sum() == 2
+
+def test_density_scatter_chart(tmp_path):
+    pages = np.arange(50) * 10
+    ratings = np.linspace(1, 5, 50)
+    #above the point limit the scatter chart is counted into a grid before it is drawn
+    name, display_function, arguments = get_visualizations([2004] * 50, pages, ratings, pages, {"Book": 10}, max_points=10)[4]
+    assert display_function is display_density_plot and arguments[0][0].sum() == 50
+    render_visualizations([[name, display_function, arguments]], tmp_path, workers=1)
+    assert (tmp_path / name).stat().st_size > 0
+
+def test_stage_profiler(tmp_path):
+    profiler = StageProfiler()
+    profiler.enable(trace_memory=True)
+    def outer():
+        return profiler.run_stage("inner", lambda size: bytearray(size), (2 ** 20,), {})
+    for i in range(2):
+        profiler.run_stage("outer", outer, (), {})
+    stages = profiler.summary()["stages"]
+    assert stages["outer"]["calls"] == 2 and stages["inner"]["calls"] == 2
+    assert stages["outer"]["wall_seconds"] >= stages["inner"]["wall_seconds"]
+    assert stages["inner"]["peak_bytes"] >= 2 ** 20 and stages["outer"]["peak_bytes"] >= 2 ** 20
+    profiler.save_trace(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert [event["name"] for event in trace["traceEvents"]] == ["inner", "outer", "inner", "outer"]
+
+def test_main_profile(tmp_path, capsys, monkeypatch):
+    #use a new profiler so the one shared by the other tests stays off
+    monkeypatch.setattr("asl_assignment_part3_7kbooks.PROFILER", StageProfiler())
+    books_file = tmp_path / "books.csv"
+    books_file.write_text(test_header +
+                          "1,1,Book 1,,A,Fiction,,Text,2004,3.85,247,361\n"
+                          "2,2,Book 2,,B,Fiction,,Text,1999,4.5,120,12\n", encoding="utf8")
+    assert main(["--profile-trace", str(tmp_path / "trace.json"), "report", "--input", str(books_file), "--no-cache"]) == 0
+    assert "describe_books" in capsys.readouterr().err
+    assert "BookTable.from_csv" in json.loads((tmp_path / "trace.json").read_text())["stages"]
+
+def test_is_headless(monkeypatch):
+    monkeypatch.setenv("MPLBACKEND", "Agg")
+    assert is_headless()
+
+#tests for the time taken to import the program
+
+#the longest a cold import of the program may take in seconds
+IMPORT_TIME_BUDGET = 0.5
 
+def test_import_is_fast_and_quiet():
+    program = os.path.join(os.path.dirname(os.path.abspath(__file__)), "7kbooks.py")
+    import_script = ("import importlib.util, sys, time\n"
+                     "start = time.perf_counter()\n"
+                     f"spec = importlib.util.spec_from_file_location('books', {program!r})\n"
+                     "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+                     "sys.stderr.write(f\"{time.perf_counter() - start} {'matplotlib' in sys.modules}\")\n")
+    result = subprocess.run([sys.executable, "-c", import_script], capture_output=True, text=True, check=True)
+    import_seconds, plotting_imported = result.stderr.split()
+    #nothing should be printed and plotting should only be imported when a chart is drawn
+    assert result.stdout == ""
+    assert plotting_imported == "False"
+    assert float(import_seconds) < IMPORT_TIME_BUDGET